@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
 
-from .parser import beautify			# noqa
+from .parser import beautify, check, escape, unescape, Limits	# noqa
 from .flags import Color, Fill, Style	# noqa
+from .cache import Cache				# noqa
+from .printer import Printer			# noqa
+from .theme import Theme				# noqa
+from .styles import StyleSet			# noqa
+from .text import StyledText			# noqa
+from .template import Template			# noqa
+from .lazy import BeautifiedString		# noqa
+from .formatting import Formatter		# noqa
 
 __title__ = 'ecstasy'
 __version__ = '0.1.3'
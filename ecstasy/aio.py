@@ -0,0 +1,239 @@
+"""
+Asynchronous (asyncio) writing of beautified strings.
+"""
+
+import copy
+import asyncio
+import inspect
+
+import ecstasy.errors as errors
+
+class AsyncWriter(object):
+	"""
+	Beautifies strings and writes them to an asynchronous sink.
+
+	The sink is anything with a write() method, which may or may not be a
+	coroutine, and optionally a drain() coroutine -- most notably an
+	asyncio.StreamWriter. Beautified strings are not written one by one
+	but collected in a buffer that is handed to the sink once it holds at
+	least 'threshold' characters, 'interval' seconds after the first
+	string was buffered (so that a trickle of small writes isn't held
+	back indefinitely), or when flush() is called, after which the sink
+	is drained to respect its backpressure. Strings of at least
+	'offload' characters are beautified in an executor rather than on the
+	event loop, so that large renders don't stall other tasks.
+
+	Attributes:
+		sink: The asynchronous sink to write to.
+		parser (Parser): The parser used to beautify strings.
+		encoding (str): The encoding used to turn strings into bytes before
+						they are written, or None to write strings.
+		threshold (int): The number of buffered characters at which the
+						 buffer is flushed.
+		interval (float): The number of seconds after which buffered
+						  strings are flushed, or None to flush only by
+						  size.
+		offload (int): The length from which strings are beautified in the
+					   executor, or None to never offload.
+		executor: The executor to offload to (None for the loop's default).
+		buffer (list): The beautified strings not yet written.
+		size (int): The number of characters in the buffer.
+		timer (asyncio.TimerHandle): The scheduled interval flush, if any.
+		task (asyncio.Task): The last interval flush, if any.
+	"""
+
+	def __init__(self,
+				 sink,
+				 parser,
+				 encoding="utf-8",
+				 threshold=4096,
+				 interval=None,
+				 offload=65536,
+				 executor=None):
+		"""
+		Initializes an AsyncWriter instance.
+
+		Arguments:
+			sink: The asynchronous sink to write to.
+			parser (Parser): The (pre-configured) parser to beautify with.
+			encoding (str): The encoding for the sink, or None for strings.
+			threshold (int): The buffer size (in characters) to flush at.
+			interval (float): The number of seconds to flush after.
+			offload (int): The string length to offload rendering from, or
+						   None to always render on the event loop.
+			executor: The executor to offload to.
+		"""
+
+		self.sink = sink
+		self.parser = parser
+
+		self.encoding = encoding
+
+		self.threshold = threshold
+		self.interval = interval
+		self.offload = offload
+		self.executor = executor
+
+		self.buffer = []
+		self.size = 0
+
+		self.timer = None
+		self.task = None
+
+	async def render(self, string):
+		"""
+		Beautifies a string, offloading large ones to the executor.
+
+		Arguments:
+			string (str): The string to beautify.
+
+		Returns:
+			The beautified string.
+		"""
+
+		if self.offload is None or len(string) < self.offload:
+			return self.parser.beautify(string)
+
+		loop = asyncio.get_running_loop()
+
+		return await loop.run_in_executor(self.executor,
+										  self.fork().beautify,
+										  string)
+
+	def fork(self):
+		"""
+		Copies the parser for a render in the executor.
+
+		The copy shares nothing that parsing or rendering changes with
+		self.parser (the positional counter, the diagnostics, the cache of
+		escape-codes and the 'always' arguments), so that it can be used
+		in another thread while renders continue on the event loop. Its
+		diagnostics start out empty and are not merged back.
+
+		Returns:
+			An independent copy of self.parser.
+		"""
+
+		parser = copy.copy(self.parser)
+
+		parser.diagnostics = errors.Diagnostics(self.parser.diagnostics.mode)
+
+		parser.codes = dict(self.parser.codes)
+
+		if self.parser.always is not None:
+			parser.always = dict(self.parser.always)
+
+		return parser
+
+	async def write(self, string):
+		"""
+		Beautifies a string and buffers it for writing.
+
+		Arguments:
+			string (str): The string to beautify.
+		"""
+
+		beauty = await self.render(string)
+
+		self.buffer.append(beauty)
+		self.size += len(beauty)
+
+		if self.size >= self.threshold:
+			await self.flush()
+
+		elif self.interval is not None and self.timer is None:
+			loop = asyncio.get_running_loop()
+			self.timer = loop.call_later(self.interval, self.expire)
+
+	def expire(self):
+		"""
+		Flushes the buffer in a task (called by the event loop once the
+		interval has passed since the first buffered string).
+		"""
+
+		self.timer = None
+		self.task = asyncio.ensure_future(self.flush())
+
+	async def writeline(self, string):
+		"""
+		Same as write(), but appends a newline to the string.
+
+		Arguments:
+			string (str): The string to beautify.
+		"""
+
+		await self.write(string + "\n")
+
+	async def writelines(self, strings):
+		"""
+		Calls writeline() for every string in an iterable.
+
+		Arguments:
+			strings (iterable): The strings to beautify.
+		"""
+
+		for string in strings:
+			await self.writeline(string)
+
+	async def flush(self):
+		"""
+		Writes the buffer to the sink and waits for the sink to drain.
+
+		Waits for an interval flush in progress first, so that the sink
+		receives everything in order.
+		"""
+
+		if self.timer is not None:
+			self.timer.cancel()
+			self.timer = None
+
+		task, self.task = self.task, None
+
+		if task is not None and task is not asyncio.current_task():
+			await task
+
+		if not self.buffer:
+			return
+
+		data = "".join(self.buffer)
+
+		self.buffer = []
+		self.size = 0
+
+		if self.encoding:
+			data = data.encode(self.encoding)
+
+		result = self.sink.write(data)
+
+		if inspect.isawaitable(result):
+			await result
+
+		drain = getattr(self.sink, "drain", None)
+
+		if drain is not None:
+			await drain()
+
+	async def close(self):
+		"""
+		Flushes the buffer and closes the sink (if it can be closed).
+		"""
+
+		await self.flush()
+
+		close = getattr(self.sink, "close", None)
+
+		if close is not None:
+			result = close()
+			if inspect.isawaitable(result):
+				await result
+
+		wait_closed = getattr(self.sink, "wait_closed", None)
+
+		if wait_closed is not None:
+			await wait_closed()
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *exception):
+		await self.flush()
@@ -0,0 +1,261 @@
+"""
+Serialization and persistent caching of parsed strings (templates).
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+
+from array import array
+
+import ecstasy
+import ecstasy.parser
+import ecstasy.terminal
+import ecstasy.tree as tree
+
+# Bumped whenever the layout of serialized trees changes
+FORMAT = 2
+
+ARRAYS = ("opening",
+		  "closing",
+		  "parent",
+		  "style",
+		  "options",
+		  "offsets",
+		  "arguments")
+
+def digest(string):
+	"""
+	Computes the content hash of a string as used to validate cache entries.
+
+	Arguments:
+		string (str): The (unparsed) string.
+
+	Returns:
+		A hexadecimal SHA-1 digest of the UTF-8 encoded string.
+	"""
+
+	return hashlib.sha1(string.encode("utf-8")).hexdigest()
+
+def dumps(string, phrases, source):
+	"""
+	Serializes the result of Parser.parse().
+
+	Arguments:
+		string (str): The escaped string returned by Parser.parse().
+		phrases (list): The list of phrases returned by Parser.parse().
+		source (str): The original string that was parsed.
+
+	Returns:
+		A JSON document holding the flattened phrase tree, the ecstasy
+		version and the content hash of the source string.
+	"""
+
+	return serialize(tree.PhraseTree.compact(string, phrases), source)
+
+def serialize(compact, source):
+	"""
+	Serializes a phrase tree (see dumps()).
+
+	Arguments:
+		compact (tree.PhraseTree): The phrase tree.
+		source (str): The original string that was parsed.
+
+	Returns:
+		The JSON document.
+	"""
+
+	document = {
+		"format": FORMAT,
+		"version": ecstasy.__version__,
+		"hash": digest(source),
+		"string": compact.string
+	}
+
+	for name in ARRAYS:
+		document[name] = getattr(compact, name).tolist()
+
+	# JSON objects only have string keys
+	document["names"] = sorted(compact.names.items())
+
+	return json.dumps(document, separators=(",", ":"))
+
+def loads(data, source):
+	"""
+	Deserializes a phrase tree serialized with dumps().
+
+	Arguments:
+		data (str): The serialized document.
+		source (str): The original string the document is expected to hold.
+
+	Returns:
+		A tree.PhraseTree, or None if the document is malformed, was
+		written by a different version of ecstasy or for a different
+		source string.
+	"""
+
+	try:
+		document = json.loads(data)
+	except ValueError:
+		return None
+
+	if (not isinstance(document, dict) 						or
+		document.get("format") != FORMAT 					or
+		document.get("version") != ecstasy.__version__ 		or
+		document.get("hash") != digest(source)):
+		return None
+
+	# Fields may still be missing or of the wrong type (e.g. if the
+	# file was truncated or edited), which is no reason to fail parsing
+	try:
+		compact = tree.PhraseTree(document["string"])
+
+		for name in ARRAYS:
+			typecode = getattr(compact, name).typecode
+			setattr(compact, name, array(typecode, document[name]))
+
+		compact.names = dict((index, name)
+							 for index, name in document["names"])
+	except (KeyError, TypeError, ValueError, OverflowError):
+		return None
+
+	return compact
+
+class Cache(object):
+	"""
+	Caches parsed strings in memory and, optionally, on disk.
+
+	Short-lived processes that beautify the same strings on every
+	invocation can use a cache directory to skip Parser.parse()
+	entirely: the first process stores the parsed phrase trees,
+	subsequent processes load them. Entries are keyed and validated by
+	the content hash of the string and by the ecstasy version, so stale
+	entries are simply re-parsed and overwritten.
+
+	Attributes:
+		directory (str): The cache directory, or None for an in-memory cache.
+		parser (Parser): The parser used for strings not yet in the cache.
+		trees (dict): The phrase trees loaded by this process, by hash.
+	"""
+
+	def __init__(self, directory=None, parser=None):
+		"""
+		Initializes a Cache instance.
+
+		Arguments:
+			directory (str): An optional cache directory, which is
+							 created if it does not exist yet.
+			parser (Parser): The parser to parse uncached strings with.
+		"""
+
+		self.directory = directory
+
+		if directory and not os.path.isdir(directory):
+			os.makedirs(directory)
+
+		self.parser = parser if parser else ecstasy.parser.Parser(None, {})
+
+		self.trees = {}
+
+	def path(self, key):
+		"""
+		Arguments:
+			key (str): The content hash of a string.
+
+		Returns:
+			The path of the cache file for the hash.
+		"""
+
+		return os.path.join(self.directory, key + ".json")
+
+	def load(self, string):
+		"""
+		Retrieves the phrase tree for a string, parsing it if necessary.
+
+		Arguments:
+			string (str): The (unparsed) string.
+
+		Returns:
+			A tree.PhraseTree for the string.
+		"""
+
+		key = digest(string)
+
+		compact = self.trees.get(key)
+
+		if compact is not None:
+			return compact
+
+		if self.directory:
+			try:
+				with open(self.path(key)) as cached:
+					compact = loads(cached.read(), string)
+			except (IOError, OSError):
+				compact = None
+
+		if compact is None:
+			escaped, phrases = self.parser.parse(string)
+
+			compact = tree.PhraseTree.compact(escaped, phrases)
+
+			if self.directory:
+				self.store(key, serialize(compact, string))
+
+		self.trees[key] = compact
+
+		return compact
+
+	def store(self, key, data):
+		"""
+		Atomically writes a serialized tree to the cache directory.
+
+		Arguments:
+			key (str): The content hash of the string.
+			data (str): The serialized tree.
+		"""
+
+		descriptor, temporary = tempfile.mkstemp(dir=self.directory)
+
+		try:
+			with os.fdopen(descriptor, "w") as destination:
+				destination.write(data)
+			getattr(os, "replace", os.rename)(temporary, self.path(key))
+		except (IOError, OSError):
+			# A cache that can't be written is only a missed optimization
+			if os.path.exists(temporary):
+				os.remove(temporary)
+
+	def parse(self, string):
+		"""
+		Drop-in replacement for Parser.parse() backed by the cache.
+
+		Arguments:
+			string (str): The string to parse.
+
+		Returns:
+			The escaped string and the list of phrases.
+		"""
+
+		compact = self.load(string)
+
+		return compact.string, compact.phrases()
+
+	def beautify(self, string, *args, **kwargs):
+		"""
+		Same as the package-level beautify(), but backed by the cache.
+
+		Arguments:
+			string (str): The string to beautify with ecstasy.
+			args (list): The positional arguments.
+			kwargs (dict): The keyword ('always') arguments.
+		"""
+
+		if not string:
+			return string
+
+		color = ecstasy.terminal.capabilities().color
+
+		beautifier = ecstasy.parser.Parser(args, kwargs, color=color)
+
+		return beautifier.render(*self.parse(string))
@@ -2,7 +2,17 @@
 Custom error classes and helper functions for descriptive error-messages.
 """
 
+import bisect
 import warnings
+import collections
+
+from array import array
+
+# Diagnostics modes (see Diagnostics)
+SILENT = "silent"
+WARN = "warn"
+COLLECT = "collect"
+STRICT = "strict"
 
 class EcstasyError(Exception):
 	"""
@@ -44,33 +54,65 @@ class ParseError(EcstasyError):
 	Raised when the string passed to the beautify()
 	method is ill-formed and includes some syntactic
 	badness such as missing closing tags.
+
+	Attributes:
+		position (str): The line:column position of the error in the
+						original string, if known.
 	"""
 
-	def __init__(self, what):
+	def __init__(self, what, position=None):
 		"""
 		Initializes the EcstasyError super-class.
 
 		Arguments:
 			what (str): A descriptive string regarding the cause of the error.
+			position (str): The line:column position of the error.
 		"""
 
+		self.position = position
+
 		super(ParseError, self).__init__(what)
 
+class LimitError(ParseError):
+	"""
+	Raised when a string exceeds one of the limits (parser.Limits) on the
+	work done to parse it, such as its size or the nesting depth of its
+	phrases.
+	"""
+
+	def __init__(self, what, position=None):
+		"""
+		Initializes the ParseError super-class.
+
+		Arguments:
+			what (str): A descriptive string regarding the cause of the error.
+			position (str): The line:column position of the error.
+		"""
+
+		super(LimitError, self).__init__(what, position)
+
 class ArgumentError(EcstasyError):
 	"""
 	Raised when the positional argument for a phrase
 	is out-of-range (i.e. there were fewer positional
 	arguments passed to beautify() than requested in the argument).
+
+	Attributes:
+		position (str): The line:column position of the offending phrase in
+						the original string, if known.
 	"""
 
-	def __init__(self, what):
+	def __init__(self, what, position=None):
 		"""
 		Initializes the EcstasyError super-class.
 
 		Arguments:
 			what (str): A descriptive string regarding the cause of the error.
+			position (str): The line:column position of the phrase.
 		"""
 
+		self.position = position
+
 		super(ArgumentError, self).__init__(what)
 
 class InternalError(EcstasyError):
@@ -90,11 +132,171 @@ class InternalError(EcstasyError):
 		"""
 		super(InternalError, self).__init__(what)
 
+Diagnostic = collections.namedtuple("Diagnostic", "what, index, position")
+
+class Diagnostics(object):
+	"""
+	Handles diagnostics (i.e. un-escaped meta-characters) found while parsing.
+
+	Depending on the mode, diagnostics are:
+
+	* SILENT: Only counted (the count is the only cost per diagnostic).
+	* WARN: Emitted as warnings via the warnings module (the default).
+	* COLLECT: Collected into a list of Diagnostic(what, index, position)
+	  tuples, where index is the index in the original string and position
+	  its line:column description.
+	* STRICT: Raised as ParseErrors.
+
+	Attributes:
+		mode (str): One of SILENT, WARN, COLLECT and STRICT.
+		count (int): The number of diagnostics since the last reset().
+		entries (list): The collected diagnostics (in COLLECT mode).
+	"""
+
+	def __init__(self, mode=WARN):
+		"""
+		Initializes a Diagnostics instance.
+
+		Arguments:
+			mode (str): One of SILENT, WARN, COLLECT and STRICT.
+
+		Raises:
+			EcstasyError if the mode is invalid.
+		"""
+
+		if mode not in (SILENT, WARN, COLLECT, STRICT):
+			raise EcstasyError("Invalid diagnostics mode '{0}'!".format(mode))
+
+		self.mode = mode
+
+		self.count = 0
+
+		self.entries = []
+
+	def reset(self):
+		"""
+		Resets the count and the collected diagnostics.
+		"""
+
+		self.count = 0
+
+		self.entries = []
+
+	def report(self, what, index, pos):
+		"""
+		Handles a diagnostic according to the mode.
+
+		Note that this method does not increment the count (so that it
+		need not be called at all in SILENT mode).
+
+		Arguments:
+			what (str): A description of the diagnostic.
+			index (int): The index of the offending character in the
+						 original string.
+			pos (str): The line:column position of the character.
+
+		Raises:
+			ParseError in STRICT mode.
+		"""
+
+		if self.mode == COLLECT:
+			self.entries.append(Diagnostic(what, index, pos))
+
+		elif self.mode == STRICT:
+			raise ParseError(located(what, pos), pos)
+
+		elif self.mode == WARN:
+			warnings.warn(located(what, pos), Warning)
+
+class Lines(object):
+	"""
+	An index of the line offsets in a string, for line:column lookups.
+
+	The index is computed lazily (on the first lookup) and each lookup is
+	then a binary search, so that reporting many positions in a large
+	string does not mean splitting and walking the string every time.
+
+	Attributes:
+		string (str): The string to which indices refer.
+		offsets (array): The index at which each line starts, or None
+						 if not computed yet.
+	"""
+
+	__slots__ = ("string", "offsets")
+
+	def __init__(self, string):
+		"""
+		Initializes a Lines instance.
+
+		Arguments:
+			string (str): The string to which indices refer.
+		"""
+
+		self.string = string
+
+		self.offsets = None
+
+	def index(self):
+		"""
+		Returns:
+			The (possibly freshly computed) array of line offsets.
+		"""
+
+		if self.offsets is None:
+			offsets = array("l", [0])
+
+			find = self.string.find
+
+			newline = find("\n")
+			while newline != -1:
+				offsets.append(newline + 1)
+				newline = find("\n", newline + 1)
+
+			self.offsets = offsets
+
+		return self.offsets
+
+	def position(self, index):
+		"""
+		Describes an index as a position in the string (see position()).
+
+		Arguments:
+			index (int): The index of the character in question.
+
+		Returns:
+			A string with the format line:column, or just the column
+			if the string consists of only one line.
+
+		Raises:
+			InternalError if the index is out-of-range.
+		"""
+
+		if not self.string:
+			return None
+
+		if index < 0 or index >= len(self.string):
+			raise InternalError("Out-of-range index passed to errors.position!")
+
+		offsets = self.index()
+
+		# If there only is one single line the
+		# line:index format wouldn't be so intuitive
+		if len(offsets) == 1:
+			return str(index)
+
+		line = bisect.bisect_right(offsets, index) - 1
+
+		# index - offsets[line] to have only
+		# the index within the relevant line
+		return "{0}:{1}".format(line, index - offsets[line])
+
 def position(string, index):
 	"""
 	Returns a helpful position description for an index in a
 	(multi-line) string using the format line:column.
 
+	For repeated lookups in the same string, use a Lines instance.
+
 	Arguments:
 		string (str): The string to which the index refers.
 		index (int): The index of the character in question.
@@ -106,36 +308,24 @@ def position(string, index):
 		(relative to) that  line.
 	"""
 
-	if not string:
-		return None
+	return Lines(string).position(index)
 
-	if index < 0 or index >= len(string):
-		raise InternalError("Out-of-range index passed to errors.position!")
-
-	lines = string.split("\n")
+def located(what, where):
+	"""
+	Appends a position to a description, if there is one.
 
-	# If there only is one single line the
-	# line:index format wouldn't be so intuitive
-	if len(lines) == 1:
-		return str(index)
+	Arguments:
+		what (str): A description (without punctuation at the end).
+		where (str): A line:column position or None.
 
-	before = n = 0
+	Returns:
+		The description with the position (if any) and an exclamation mark.
+	"""
 
-	for n, line in enumerate(lines):
-		future = before + len(line) + 1 # \n
-		# Note that we really want > and not
-		# >= because the length is 1-indexed
-		# while the index is not, i.e. the
-		# value of 'before' already includes the
-		# first character of the next line when
-		# speaking of its 0-indexed index
-		if future > index:
-			break
-		before = future
+	if where is None:
+		return what + "!"
 
-	# index - before to have only the
-	# index within the relevant line
-	return "{0}:{1}".format(n, index - before)
+	return "{0} at position {1}!".format(what, where)
 
 def number(digit):
 	"""
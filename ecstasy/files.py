@@ -0,0 +1,223 @@
+"""
+Beautification of (arbitrarily large) files through memory-mapping.
+"""
+
+import re
+import mmap
+import codecs
+import copy
+
+import ecstasy.parser as parser
+import ecstasy.terminal as terminal
+
+# Matches the tags that open and close phrases (escapes are checked
+# separately) in the mapped bytes of a file
+TAGS = re.compile(b"[<>]")
+
+def escaped(data, index):
+	"""
+	Checks if the tag at an index is escaped, as in Parser.parse().
+
+	A tag preceded by exactly one escape character is escaped, while a
+	tag preceded by two (or more) is a real tag (one escape character is
+	kept as text).
+
+	Arguments:
+		data (mmap): The mapped bytes.
+		index (int): The index of the tag.
+
+	Returns:
+		True if the tag is escaped, else False.
+	"""
+
+	if index < 1 or data[index - 1 : index] != b"\\":
+		return False
+
+	return index < 2 or data[index - 2 : index - 1] != b"\\"
+
+def boundaries(data, size):
+	"""
+	Finds the offsets at which to split mapped bytes into chunks.
+
+	Chunks end after a newline outside of any phrase, once they are at
+	least 'size' bytes long. At such a point, the parser holds no state
+	other than the positional counter, so the chunks can be parsed one
+	after the other with the same result as the whole. A chunk within a
+	phrase spanning many lines grows until the phrase is closed. Only the
+	tags are visited (in place, by the regular expression engine) to
+	track the nesting depth, while newlines are only searched for once a
+	chunk is long enough.
+
+	Arguments:
+		data (mmap): The mapped bytes.
+		size (int): The minimum size of a chunk (except the last).
+
+	Returns:
+		A generator of the end offsets of all chunks (the last of which
+		is the length of the data).
+	"""
+
+	depth = 0
+
+	# The offset since which the depth has been zero
+	zero = 0
+
+	target = size
+
+	for tag in TAGS.finditer(data):
+		index = tag.start()
+
+		while depth == 0 and index >= target:
+			newline = data.find(b"\n", max(zero, target - 1), index)
+
+			if newline == -1:
+				break
+
+			yield newline + 1
+
+			target = newline + 1 + size
+
+		if escaped(data, index):
+			continue
+
+		if tag.group() == b"<":
+			depth += 1
+		elif depth > 0:
+			depth -= 1
+			if depth == 0:
+				zero = index + 1
+
+	end = len(data)
+
+	while depth == 0 and target < end:
+		newline = data.find(b"\n", max(zero, target - 1))
+
+		if newline == -1 or newline + 1 >= end:
+			break
+
+		yield newline + 1
+
+		target = newline + 1 + size
+
+	yield end
+
+def beautify(path,
+			 destination,
+			 styles=None,
+			 always=None,
+			 size=1 << 20,
+			 color=None):
+	"""
+	Beautifies a file into a binary stream, chunk by chunk.
+
+	The file is memory-mapped and scanned for tags in place, then split
+	into chunks of roughly 'size' bytes at newlines outside of phrases
+	(see boundaries()). Each chunk is beautified as bytes (see
+	Parser.beautify_bytes()) and written to the destination before the
+	next one is read, with the positional counter continuing from chunk
+	to chunk, so that the output is the same as for the whole file while
+	memory use stays bounded by the size of a chunk (and of the longest
+	phrase).
+
+	Note:
+		Since chunks are parsed separately, the positions of errors are
+		relative to the chunk in which they occur. Chunks written before
+		an error remain written.
+
+	Arguments:
+		path: The path of the file, or a file object opened for reading in
+			  binary mode.
+		destination: The binary stream to write to (e.g. sys.stdout.buffer).
+		styles: The positional styles, in any form accepted by
+				beautify(), or a pre-configured Parser.
+		always (dict): The 'always' styles (if styles is no Parser).
+		size (int): The approximate size of the chunks, in bytes.
+		color (bool): Whether to render escape-codes. By default, this is
+					  determined by terminal.capabilities(destination).
+
+	Returns:
+		The number of bytes written.
+
+	Raises:
+		errors.ParseError: If a chunk of the file is ill-formed.
+
+		errors.ArgumentError: If not enough styles were supplied.
+	"""
+
+	if isinstance(styles, parser.Parser):
+		# The parser's 'always' arguments are replaced below
+		beautifier = copy.copy(styles)
+	else:
+		if color is None:
+			color = terminal.capabilities(destination).color
+
+		if styles is None:
+			styles = []
+		elif not isinstance(styles, (list, tuple)):
+			styles = [styles]
+
+		beautifier = parser.Parser(styles,
+								   dict(always) if always else {},
+								   color=color)
+
+	if beautifier.always:
+		beautifier.always = dict((parser.latin(k), v)
+								 for k, v in beautifier.always.items())
+
+	if hasattr(path, "fileno"):
+		return _beautify(path, destination, beautifier, size)
+
+	with open(path, "rb") as source:
+		return _beautify(source, destination, beautifier, size)
+
+def _beautify(source, destination, beautifier, size):
+	"""
+	Beautifies an open file with a prepared parser (see beautify()).
+
+	Arguments:
+		source: The file, opened for reading in binary mode.
+		destination: The binary stream to write to.
+		beautifier (Parser): The parser, with latin-1 'always' keys.
+		size (int): The approximate size of the chunks, in bytes.
+
+	Returns:
+		The number of bytes written.
+	"""
+
+	try:
+		data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+	except ValueError:
+		# Empty files cannot be mapped
+		return 0
+
+	written = 0
+
+	counter = 0
+
+	try:
+		start = 0
+
+		for end in boundaries(data, size):
+			text = codecs.latin_1_decode(data[start:end])[0]
+
+			string, phrases = beautifier.parse(text)
+
+			output = beautifier.render(string,
+									   phrases,
+									   beautifier.source,
+									   counter=counter)
+
+			if phrases:
+				counter = beautifier.counter
+
+			output = output.encode("latin-1")
+
+			destination.write(output)
+
+			written += len(output)
+
+			start = end
+	finally:
+		data.close()
+
+	return written
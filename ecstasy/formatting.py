@@ -0,0 +1,277 @@
+"""
+Formatting of values into beautified strings, in a single pass.
+"""
+
+import string
+import collections
+
+import ecstasy.parser as parser
+import ecstasy.template as template
+import ecstasy.terminal as terminal
+
+class Formatter(string.Formatter):
+	"""
+	A string.Formatter that beautifies its format strings.
+
+	Formatting a string with str.format() and beautifying the result scans
+	it twice, and values containing meta-characters must be escaped first
+	(else they are taken for tags, or at least warned about). A Formatter
+	instead parses every format string only once (see template.Template),
+	including its replacement fields, and generates a function rendering
+	it, which formats the values through the usual string.Formatter hooks
+	(get_field(), convert_field() and format_field(), which subclasses may
+	override) and inserts them as plain text. Values are thus never parsed
+	and need no escaping.
+
+	Note:
+		Phrases are styled by the text of the format string (e.g. for
+		'always' arguments), not by the values formatted into them.
+		Meta-characters in format specifications must be escaped like
+		anywhere else (e.g. "{0:\\<8}").
+
+	Attributes:
+		size (int): The maximum number of entries of each cache (beyond
+					which the least recently used entry is dropped).
+		parser (Parser): The parser with the styles, escape-codes and color
+						 setting to use.
+		templates (OrderedDict): The parsed format strings.
+		functions (OrderedDict): The generated render functions, by format
+								 string, color setting and 'always' keys.
+	"""
+
+	size = 256
+
+	def __init__(self, *args, **kwargs):
+		"""
+		Initializes a Formatter instance.
+
+		Whether escape-codes are rendered is determined by the (cached)
+		capabilities of sys.stdout (see terminal.capabilities()).
+
+		Arguments:
+			args (list): The positional arguments, as for beautify().
+			kwargs (dict): The keyword ('always') arguments.
+		"""
+
+		color = terminal.capabilities().color
+
+		self.parser = parser.Parser(args, kwargs, color=color)
+
+		self.templates = collections.OrderedDict()
+
+		self.functions = collections.OrderedDict()
+
+	def vformat(self, format_string, args, kwargs):
+		"""
+		Formats and beautifies a string (called by self.format()).
+
+		Arguments:
+			format_string (str): The string with phrases and replacement
+								 fields.
+			args (tuple): The positional values.
+			kwargs (dict): The keyword values.
+
+		Returns:
+			The beautified string.
+
+		Raises:
+			errors.ParseError: If the format string is ill-formed.
+
+			errors.ArgumentError: If the styles don't suffice for the
+								  format string (see Parser.render()).
+
+			ValueError: If a replacement field is malformed.
+
+			KeyError, IndexError: If a value is missing (as for str.format()).
+		"""
+
+		compiled = self.lookup(self.templates, format_string)
+
+		if compiled is None:
+			compiled = template.Template(format_string, self.parser)
+			self.store(self.templates, format_string, compiled)
+
+		beautifier = self.parser
+
+		always = beautifier.always or {}
+
+		key = (format_string,
+			   beautifier.color,
+			   tuple(sorted(k for k in compiled.keys if k in always)))
+
+		function = self.lookup(self.functions, key)
+
+		if function is None:
+			if compiled.phrases and not beautifier.color:
+				# Without escape-codes, the function looks up no styles,
+				# so resolve them once to fail as with color
+				beautifier.render(compiled.string,
+								  compiled.phrases,
+								  compiled.source)
+
+			function = self.compile(compiled, *key[1:])
+			self.store(self.functions, key, function)
+
+		try:
+			return function(beautifier.positional,
+							always,
+							beautifier.names,
+							beautifier.code,
+							args,
+							kwargs,
+							self)
+		except (IndexError, KeyError):
+			if compiled.phrases and beautifier.color:
+				# Let the parser raise missing styles, with their position
+				beautifier.render(compiled.string,
+								  compiled.phrases,
+								  compiled.source)
+			raise
+
+	def lookup(self, cache, key):
+		"""
+		Gets an entry of a cache, marking it as the most recently used.
+
+		Arguments:
+			cache (OrderedDict): The cache.
+			key: The key of the entry.
+
+		Returns:
+			The entry, or None if it is not cached.
+		"""
+
+		entry = cache.pop(key, None)
+
+		if entry is not None:
+			cache[key] = entry
+
+		return entry
+
+	def store(self, cache, key, entry):
+		"""
+		Adds an entry to a cache, dropping the least recently used entry
+		if the cache holds more than self.size entries.
+
+		Arguments:
+			cache (OrderedDict): The cache.
+			key: The key of the entry.
+			entry: The entry.
+		"""
+
+		cache[key] = entry
+
+		if len(cache) > self.size:
+			cache.popitem(last=False)
+
+	def compile(self, compiled, color, always):
+		"""
+		Generates the render function of a format string.
+
+		Arguments:
+			compiled (template.Template): The parsed format string.
+			color (bool): Whether to render escape-codes.
+			always (iterable): The 'always' keys (of compiled.keys) in effect.
+
+		Returns:
+			A function of the positional and 'always' arguments, the named
+			styles, a function codifying flag-combinations (Parser.code()),
+			the positional and keyword values and the formatter.
+		"""
+
+		generator = Fields(set(always), color)
+
+		pieces = generator.generate(compiled.string,
+									 compiled.phrases,
+									 repr("\033[0;m") if color else None)
+
+		lines = ["def render(positional, always, names, code, args, kwargs, "
+				 "formatter):",
+				 "\tget_field = formatter.get_field",
+				 "\tconvert_field = formatter.convert_field",
+				 "\tformat_field = formatter.format_field"]
+
+		lines += ["\t" + line for line in generator.lines]
+
+		lines.append("\treturn ''.join(({0}))".format("".join(piece + ", "
+															   for piece
+															   in pieces)))
+
+		namespace = {}
+
+		exec(compile("\n".join(lines), "<ecstasy format>", "exec"), namespace)
+
+		return namespace["render"]
+
+class Fields(template.Generator):
+	"""
+	Generates the body of a function formatting values into a string.
+
+	Replacement fields are numbered and looked up as by
+	string.Formatter.vformat(), through the formatter's get_field(),
+	convert_field() and format_field() methods.
+
+	Attributes:
+		automatic (int): The index of the next automatically numbered field,
+						 or False once fields were numbered manually.
+	"""
+
+	def __init__(self, always, color=True):
+		"""
+		Initializes a Fields instance.
+
+		Arguments:
+			always (set): The 'always' keys in effect.
+			color (bool): Whether to generate escape-codes.
+		"""
+
+		super(Fields, self).__init__(always, color)
+
+		self.automatic = 0
+
+	def literal(self, text):
+		return template.interpolate(text, self.field)
+
+	def field(self, name, conversion, spec):
+		"""
+		Arguments:
+			name (str): The name of a replacement field (may be empty).
+			conversion (str): The conversion of the field ("r", "s", "a"),
+							  if any.
+			spec (str): The format specification of the field.
+
+		Returns:
+			The expression of the formatted value of the field.
+
+		Raises:
+			ValueError: If automatic and manual numbering are mixed.
+		"""
+
+		if name == "":
+			if self.automatic is False:
+				raise ValueError("cannot switch from manual field "
+								 "specification to automatic field "
+								 "numbering")
+			name = str(self.automatic)
+			self.automatic += 1
+
+		elif name.isdigit():
+			if self.automatic:
+				raise ValueError("cannot switch from manual field "
+								 "specification to automatic field "
+								 "numbering")
+			self.automatic = False
+
+		value = "get_field({0!r}, args, kwargs)[0]".format(name)
+
+		if conversion:
+			value = "convert_field({0}, {1!r})".format(value, conversion)
+
+		if "{" in spec:
+			# Nested replacement fields (e.g. "{0:{1}}")
+			pieces = template.interpolate(spec, self.field)
+			spec = "''.join(({0}))".format("".join(piece + ", "
+												   for piece in pieces))
+		else:
+			spec = repr(spec)
+
+		return "format_field({0}, {1})".format(value, spec)
@@ -0,0 +1,89 @@
+"""
+Beautified strings that are only rendered once they are consumed.
+"""
+
+import ecstasy.parser as parser
+import ecstasy.terminal as terminal
+
+class BeautifiedString(object):
+	"""
+	A string to beautify, with its styles, rendered only on demand.
+
+	Beautifying a string costs the construction of a Parser (flattening
+	and validating its styles), parsing and stringifying, even if the
+	result is never shown (e.g. debug messages that are filtered out).
+	A BeautifiedString merely keeps the string and the styles until it is
+	converted with str() (e.g. by "%s" in a logging call that is actually
+	emitted), formatted or written to a stream, and then caches the result.
+	Errors are thus also only raised then.
+
+	Attributes:
+		string (str): The string to beautify.
+		args (tuple): The positional arguments.
+		kwargs (dict): The keyword ('always') arguments.
+		results (dict): The rendered strings so far, by color setting.
+	"""
+
+	__slots__ = ("string", "args", "kwargs", "results")
+
+	def __init__(self, string, *args, **kwargs):
+		"""
+		Initializes a BeautifiedString instance.
+
+		Arguments:
+			string (str): The string to beautify.
+			args (list): The positional arguments, as for beautify().
+			kwargs (dict): The keyword ('always') arguments.
+		"""
+
+		self.string = string
+		self.args = args
+		self.kwargs = kwargs
+		self.results = {}
+
+	def render(self, color=True):
+		"""
+		Beautifies the string, once for every color setting.
+
+		Arguments:
+			color (bool): Whether to render escape-codes.
+
+		Returns:
+			The beautified string.
+
+		Raises:
+			errors.ParseError: If the string is ill-formed.
+
+			errors.ArgumentError: If the styles don't suffice for the string.
+		"""
+
+		result = self.results.get(color)
+
+		if result is None:
+			# The parser adds 'always' arguments passed in dictionaries
+			beautifier = parser.Parser(self.args, dict(self.kwargs), color=color)
+			result = self.results[color] = beautifier.beautify(self.string)
+
+		return result
+
+	def write(self, stream):
+		"""
+		Writes the beautified string to a stream.
+
+		Whether escape-codes are rendered is determined by the capabilities
+		of the stream (see terminal.capabilities()).
+
+		Arguments:
+			stream: The stream to write to.
+		"""
+
+		stream.write(self.render(terminal.capabilities(stream).color))
+
+	def __str__(self):
+		return self.render(terminal.capabilities().color)
+
+	def __format__(self, spec):
+		return format(str(self), spec)
+
+	def __repr__(self):
+		return "BeautifiedString({0!r})".format(self.string)
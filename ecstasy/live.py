@@ -0,0 +1,313 @@
+"""
+Live-updating regions of beautified lines (progress bars, status panels).
+"""
+
+import re
+import sys
+
+import ecstasy.flags as flags
+import ecstasy.parser as parser
+import ecstasy.printer as printer
+import ecstasy.terminal as terminal
+
+# Matches the (SGR) escape-sequences ecstasy emits
+CODE = re.compile(r"\033\[([\d;]*)m")
+
+RESET = str(flags.Style.Reset)
+
+# Unchanged cells between two changed runs are rewritten rather than
+# skipped if there are at most this many (a cursor move costs as much)
+GAP = 4
+
+def cells(beauty):
+	"""
+	Splits a beautified string into rows of (style, character) cells.
+
+	The style of a cell is the semicolon-delimited sequence of codes in
+	effect for it, following the cascading semantics of the escape-codes
+	emitted by Parser.stringify(): a code starting with a reset replaces
+	the current style, any other code is added to it.
+
+	Arguments:
+		beauty (str): The beautified string.
+
+	Returns:
+		A list of rows, each a list of (style, character) tuples.
+	"""
+
+	rows = [[]]
+
+	style = ""
+
+	last = 0
+
+	for match in CODE.finditer(beauty):
+		for character in beauty[last : match.start()]:
+			if character == "\n":
+				rows.append([])
+			else:
+				rows[-1].append((style, character))
+
+		code = match.group(1)
+
+		if not code or code == RESET or code.startswith(RESET + ";"):
+			style = code[len(RESET) + 1:]
+		else:
+			style = style + ";" + code if style else code
+
+		last = match.end()
+
+	for character in beauty[last:]:
+		if character == "\n":
+			rows.append([])
+		else:
+			rows[-1].append((style, character))
+
+	return rows
+
+def paint(row, start, end):
+	"""
+	Renders a run of cells, positioned at its column.
+
+	Arguments:
+		row (list): The cells of a row.
+		start (int): The first column of the run.
+		end (int): One past the last column of the run.
+
+	Returns:
+		The escape-sequences and characters drawing the run.
+	"""
+
+	output = ["\033[{0}G".format(start + 1)]
+
+	current = ""
+
+	for style, character in row[start:end]:
+		if style != current:
+			output.append("\033[{0};{1}m".format(RESET, style))
+			current = style
+		output.append(character)
+
+	if current:
+		output.append("\033[{0}m".format(RESET))
+
+	return "".join(output)
+
+def diff(old, new):
+	"""
+	Determines the runs of cells that differ between two rows.
+
+	Arguments:
+		old (list): The cells of the row currently drawn.
+		new (list): The cells of the row to draw.
+
+	Returns:
+		A list of (start, end) column ranges to redraw.
+	"""
+
+	runs = []
+
+	for column in range(len(new)):
+		if column < len(old) and old[column] == new[column]:
+			continue
+
+		if runs and column - runs[-1][1] <= GAP:
+			runs[-1][1] = column + 1
+		else:
+			runs.append([column, column + 1])
+
+	return runs
+
+class Region(object):
+	"""
+	A region of lines at the bottom of a terminal that is redrawn in place.
+
+	Every update() renders a frame of ecstasy markup (one or more lines)
+	and compares it cell by cell to the frame currently displayed. Only
+	the cursor movements and the changed cells (with their escape-codes)
+	are written, along with erasures where lines became shorter or fewer.
+	Frames arriving faster than 'rate' per second are not drawn right away;
+	the latest one is drawn on the next update() after the interval has
+	passed, or on refresh() or close().
+
+	Note:
+		The cursor rests on the line below the region between frames, so
+		nothing else should be written to the stream while the region is
+		live.
+
+	Attributes:
+		stream: The stream (terminal) to draw to.
+		parser (Parser): The parser used to beautify frames.
+		rate (float): The maximum number of frames drawn per second,
+					  or None for no limit.
+		frame (list): The rows of cells currently displayed.
+		pending (list): The rows of the latest frame not yet drawn, if any.
+		last (float): The time at which the last frame was drawn.
+	"""
+
+	def __init__(self,
+				 stream=None,
+				 styles=None,
+				 always=None,
+				 rate=20,
+				 color=None):
+		"""
+		Initializes a Region instance.
+
+		Arguments:
+			stream: The stream to draw to (defaults to sys.stdout).
+			styles: The positional styles, in any form accepted by
+					beautify(), or a pre-configured Parser.
+			always (dict): The 'always' styles (if styles is no Parser).
+			rate (float): The maximum number of frames per second.
+			color (bool): Whether to render escape-codes. By default, this
+						  is determined by terminal.capabilities(stream).
+		"""
+
+		self.stream = sys.stdout if stream is None else stream
+
+		if isinstance(styles, parser.Parser):
+			self.parser = styles
+		else:
+			if color is None:
+				color = terminal.capabilities(self.stream).color
+
+			if styles is None:
+				styles = []
+			elif not isinstance(styles, (list, tuple)):
+				styles = [styles]
+
+			self.parser = parser.Parser(styles,
+										dict(always) if always else {},
+										color=color)
+
+		self.rate = rate
+
+		self.frame = []
+		self.pending = None
+
+		self.last = None
+
+	def update(self, string, force=False):
+		"""
+		Renders a new frame and draws it, unless frames are coming too fast.
+
+		Arguments:
+			string (str): The frame, in ecstasy markup (lines separated
+						  by newlines).
+			force (bool): Whether to draw regardless of the frame rate.
+
+		Returns:
+			True if the frame was drawn, else False.
+		"""
+
+		self.pending = cells(self.parser.beautify(string))
+
+		now = printer.clock()
+
+		if (force or self.last is None or not self.rate or
+			now - self.last >= 1.0 / self.rate):
+			self.refresh(now)
+			return True
+
+		return False
+
+	def refresh(self, now=None):
+		"""
+		Draws the pending frame, if there is one.
+
+		Arguments:
+			now (float): The current time, if already known.
+		"""
+
+		if self.pending is None:
+			return
+
+		frame, self.pending = self.pending, None
+
+		output = self.draw(frame)
+
+		if output:
+			self.stream.write(output)
+
+			flush = getattr(self.stream, "flush", None)
+			if flush is not None:
+				flush()
+
+		self.frame = frame
+
+		self.last = printer.clock() if now is None else now
+
+	def draw(self, frame):
+		"""
+		Computes the output transforming the current frame into a new one.
+
+		Arguments:
+			frame (list): The rows of cells to draw.
+
+		Returns:
+			The escape-sequences and characters to write.
+		"""
+
+		output = []
+
+		height = len(self.frame)
+
+		# The cursor rests on the line below the region
+		cursor = [height]
+
+		def move(row):
+			if row < cursor[0]:
+				output.append("\033[{0}A".format(cursor[0] - row))
+			elif row > cursor[0]:
+				output.append("\033[{0}B".format(row - cursor[0]))
+			cursor[0] = row
+
+		for row in range(min(height, len(frame))):
+			old, new = self.frame[row], frame[row]
+
+			runs = diff(old, new)
+
+			if not runs and len(new) >= len(old):
+				continue
+
+			move(row)
+
+			for start, end in runs:
+				output.append(paint(new, start, end))
+
+			if len(new) < len(old):
+				output.append("\033[{0}G\033[K".format(len(new) + 1))
+
+		if len(frame) > height:
+			move(height)
+			for row in frame[height:]:
+				output.append(paint(row, 0, len(row)) + "\n")
+			cursor[0] = len(frame)
+
+		elif len(frame) < height:
+			# Erase the surplus rows (and everything below them)
+			move(len(frame))
+			output.append("\r\033[J")
+
+		if not output:
+			return ""
+
+		move(len(frame))
+
+		output.append("\r")
+
+		return "".join(output)
+
+	def close(self):
+		"""
+		Draws the pending frame, if any, and leaves the region as it is.
+		"""
+
+		self.refresh()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
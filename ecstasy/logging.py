@@ -0,0 +1,185 @@
+"""
+Integration of ecstasy with the standard library's logging package.
+"""
+
+from __future__ import absolute_import
+
+import sys
+import bisect
+import logging
+
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+import ecstasy.parser as parser
+import ecstasy.terminal as terminal
+
+# The default styles for the standard log levels
+LEVELS = {
+	logging.DEBUG: flags.Style.Dim,
+	logging.INFO: flags.Color.Blue,
+	logging.WARNING: flags.Color.Yellow,
+	logging.ERROR: flags.Color.Red,
+	logging.CRITICAL: flags.Style.Bold | flags.Color.White | flags.Fill.Red
+}
+
+class Formatter(logging.Formatter):
+	"""
+	A logging.Formatter whose format string is written in ecstasy markup.
+
+	Simple phrases in the format string are styled according to the level
+	of the record, while phrases consisting of exactly one record field
+	(e.g. "<%(name)s>") can be given a fixed style via 'fields'. The
+	markup is rendered only once per level, into an ordinary format
+	string with the escape-codes already in place, so formatting a record
+	costs no more than with a plain logging.Formatter. Since logging only
+	formats records that passed all levels and filters, records that are
+	filtered out never cause any work here at all.
+
+	When 'color' is disabled (by default, if the stream does not support
+	color according to terminal.capabilities()), the markup is rendered
+	without escape-codes instead.
+
+	Attributes:
+		template (str): The format string, in ecstasy markup.
+		levels (dict): The style(s) for each level number. Records of other
+					   levels use the style of the closest lower level.
+		fields (dict): Styles for phrases holding a single record field,
+					   by field name.
+		color (bool): Whether escape-codes are rendered.
+		formatters (dict): The compiled logging.Formatter for each level.
+	"""
+
+	def __init__(self,
+				 fmt=None,
+				 datefmt=None,
+				 levels=None,
+				 fields=None,
+				 stream=None,
+				 color=None):
+		"""
+		Initializes a Formatter instance.
+
+		Arguments:
+			fmt (str): The format string (%-style), in ecstasy markup.
+					   Defaults to "<%(levelname)s>: %(message)s".
+			datefmt (str): The date format string (see logging.Formatter).
+			levels (dict): Styles by level number. A level may map to a
+						   single flag-combination or a list of positional
+						   styles. Defaults to LEVELS.
+			fields (dict): Styles by record field name.
+			stream: The stream the output is destined for (to determine
+					whether to render color). Defaults to sys.stderr.
+			color (bool): Forces color on or off (None to detect it).
+		"""
+
+		if fmt is None:
+			fmt = "<%(levelname)s>: %(message)s"
+
+		super(Formatter, self).__init__(fmt, datefmt)
+
+		self.template = fmt
+
+		self.levels = LEVELS if levels is None else levels
+		self.fields = fields if fields else {}
+
+		if color is None:
+			stream = sys.stderr if stream is None else stream
+			color = terminal.capabilities(stream).color
+
+		self.color = color
+
+		self.thresholds = sorted(self.levels)
+
+		self.formatters = {}
+
+	def style(self, level):
+		"""
+		Determines the style(s) for a level.
+
+		Arguments:
+			level (int): The level number.
+
+		Returns:
+			A list of positional styles (empty if no threshold applies).
+		"""
+
+		index = bisect.bisect_right(self.thresholds, level)
+
+		if not index:
+			return []
+
+		style = self.levels[self.thresholds[index - 1]]
+
+		if isinstance(style, (list, tuple)):
+			return list(style)
+
+		return [style]
+
+	def compile(self, level):
+		"""
+		Renders the markup format string for a level.
+
+		Arguments:
+			level (int): The level number.
+
+		Returns:
+			A logging.Formatter for records of that level.
+		"""
+
+		always = dict(("%({0})s".format(name), style)
+					  for name, style in self.fields.items())
+
+		# Levels below all thresholds are rendered with a plain reset
+		styles = self.style(level) or [flags.Style.Reset]
+
+		# The parentheses of the record fields ("%(name)s") are meant
+		# literally, so they are not reported as un-escaped
+		beautifier = parser.Parser(styles, always, errors.SILENT)
+
+		string, phrases = beautifier.parse(self.template)
+
+		if not self.color:
+			fmt = beautifier.strip(string, phrases)
+		else:
+			fmt = beautifier.render(string, phrases)
+
+		return logging.Formatter(fmt, self.datefmt)
+
+	def format(self, record):
+		"""
+		Formats a record with the format string compiled for its level.
+
+		Arguments:
+			record (logging.LogRecord): The record to format.
+
+		Returns:
+			The formatted record.
+		"""
+
+		formatter = self.formatters.get(record.levelno)
+
+		if formatter is None:
+			formatter = self.compile(record.levelno)
+			self.formatters[record.levelno] = formatter
+
+		return formatter.format(record)
+
+class StreamHandler(logging.StreamHandler):
+	"""
+	A logging.StreamHandler using an ecstasy Formatter for its stream.
+	"""
+
+	def __init__(self, stream=None, fmt=None, datefmt=None, **kwargs):
+		"""
+		Initializes a StreamHandler instance.
+
+		Arguments:
+			stream: The stream to log to (defaults to sys.stderr).
+			fmt (str): The format string, in ecstasy markup.
+			datefmt (str): The date format string.
+			kwargs (dict): Further arguments to the Formatter.
+		"""
+
+		super(StreamHandler, self).__init__(stream)
+
+		self.setFormatter(Formatter(fmt, datefmt, stream=self.stream, **kwargs))
@@ -5,25 +5,220 @@ The heart of the ecstasy package, containing the main *Parser* class.
 """
 
 import re
-import warnings
+import codecs
 import collections
 
 import ecstasy.flags as flags
 import ecstasy.errors as errors
+import ecstasy.source as source
+import ecstasy.styles as styles
+import ecstasy.terminal as terminal
 
 def beautify(string, *args, **kwargs):
 	"""
 		Convenient interface to the ecstasy package.
 
+		Whether escape-codes are rendered at all is determined by the
+		(cached) capabilities of sys.stdout (see terminal.capabilities()).
+
 		Arguments:
 			string (str): The string to beautify with ecstasy.
 			args (list): The positional arguments.
 			kwargs (dict): The keyword ('always') arguments.
 	"""
 
-	parser = Parser(args, kwargs)
+	color = terminal.capabilities().color
+
+	parser = Parser(args, kwargs, color=color)
 	return parser.beautify(string)
 
+def check(string, always=None):
+	"""
+		Validates a string without beautifying it.
+
+		Arguments:
+			string (str): The string to check.
+			always (iterable): The keys of the 'always' arguments the
+							   string will be beautified with, if any.
+
+		Returns:
+			A Summary of the string (see Parser.check()).
+	"""
+
+	parser = Parser(None, dict.fromkeys(always or ()), errors.COLLECT)
+	return parser.check(string)
+
+# Escape characters before escaped tags, which would make them real tags
+TAGGING = re.compile(r"\\+(?=\\[<>])")
+TAGGING_BYTES = re.compile(br"\\+(?=\\[<>])")
+
+def escape(text):
+	"""
+		Escapes all meta-characters in text, such that it is parsed as is.
+
+		Every '<', '>', '(' and ')' is preceded by an escape character, as
+		expected by Parser.parse(), so that escaped text neither forms
+		phrases nor causes diagnostics (e.g. when untrusted text is embedded
+		in markup). All other characters, including escape characters, are
+		kept. Binary text (bytes, bytearray or memoryview) is escaped into
+		bytes. Each meta-character is replaced in bulk by str.replace(),
+		which is faster than str.translate() (whose replacements of one
+		character by two take a slow path) and works for bytes alike.
+
+		Note:
+			Escape characters directly before a tag make it a real tag (see
+			Parser.parse()), so an escape character in the text directly
+			before a '<' or '>' cannot be expressed. Such escape characters
+			are removed (rather than letting the text open or close phrases).
+			A trailing escape character would escape a tag directly
+			following the text in markup, so another one is appended (one
+			escape character before a real tag is removed). Text ending in
+			an escape character is thus meant to be followed by a tag (e.g.
+			at the end of a phrase), else both escape characters are kept.
+
+		Arguments:
+			text (str): The text to escape.
+
+		Returns:
+			The escaped text.
+	"""
+
+	if isinstance(text, BINARY):
+		text = bytes(text)
+		character = b"\\"
+		metas = (b"(", b")", b"<", b">")
+		tagging, nothing = TAGGING_BYTES, b""
+	else:
+		character = "\\"
+		metas = ("(", ")", "<", ">")
+		tagging, nothing = TAGGING, ""
+
+	for meta in metas:
+		text = text.replace(meta, character + meta)
+
+	# Only when needed, since it costs another pass
+	if character + character in text:
+		text = tagging.sub(nothing, text)
+
+	if text.endswith(character):
+		text += character
+
+	return text
+
+def unescape(text):
+	"""
+		Removes the escape characters of escaped meta-characters.
+
+		This is the inverse of escape() (apart from the escape characters
+		escape() removes), i.e. it removes one escape character before every
+		'<', '>', '(' and ')', as Parser.parse() does for text without
+		phrases, and the one escape() appends to a trailing escape character.
+		Binary text is unescaped into bytes.
+
+		Arguments:
+			text (str): The text to unescape.
+
+		Returns:
+			The unescaped text.
+	"""
+
+	if isinstance(text, BINARY):
+		text = bytes(text)
+		character = b"\\"
+		metas = (b"<", b">", b"(", b")")
+	else:
+		character = "\\"
+		metas = ("<", ">", "(", ")")
+
+	for meta in metas:
+		text = text.replace(character + meta, meta)
+
+	if text.endswith(character + character):
+		text = text[:-1]
+
+	return text
+
+# Binary strings accepted by Parser.beautify() (on Python 2, str is bytes
+# and keeps being treated as text)
+BINARY = (bytearray, memoryview) if bytes is str else (bytes,
+													   bytearray,
+													   memoryview)
+
+def latin(key):
+	"""
+		Translates an 'always' key to the form it has in binary input.
+
+		Binary input is parsed as latin-1 text (see Parser.beautify_bytes()),
+		in which every byte is one character, so text keys must be matched
+		by the latin-1 reading of their UTF-8 encoding.
+
+		Arguments:
+			key (str): The key (text or bytes).
+
+		Returns:
+			The key as it appears in binary input parsed as latin-1.
+	"""
+
+	if isinstance(key, (bytes, bytearray, memoryview)):
+		return codecs.latin_1_decode(key)[0]
+
+	return key.encode("utf-8").decode("latin-1")
+
+Summary = collections.namedtuple("Summary", ["positionals",
+											 "indices",
+											 "overrides",
+											 "increments",
+											 "phrases",
+											 "required",
+											 "errors",
+											 "diagnostics",
+											 "names"])
+
+class Limits(object):
+	"""
+	Upper bounds on the work Parser.parse() does for a single string.
+
+	Parsing is linear in the length of the string, but markup supplied by
+	untrusted users can still be large, have many phrases or be deeply
+	nested (which costs recursion when rendering). Each limit is checked
+	as the string is scanned, at the point where it is exceeded, and an
+	errors.LimitError is raised. A limit of None disables the check.
+
+	Attributes:
+		size (int): The maximum length of a string.
+		depth (int): The maximum nesting depth of phrases.
+		phrases (int): The maximum total number of phrases.
+		arguments (int): The maximum length of an argument sequence
+						 (between the parantheses).
+	"""
+
+	__slots__ = ("size", "depth", "phrases", "arguments")
+
+	def __init__(self, size=None, depth=256, phrases=None, arguments=None):
+		"""
+		Initializes a Limits instance.
+
+		Arguments:
+			size (int): The maximum length of a string.
+			depth (int): The maximum nesting depth of phrases. Limited by
+						 default to stay well within the recursion limit
+						 when rendering.
+			phrases (int): The maximum total number of phrases.
+			arguments (int): The maximum length of an argument sequence.
+		"""
+
+		self.size = size
+		self.depth = depth
+		self.phrases = phrases
+		self.arguments = arguments
+
+	def __repr__(self):
+		return "Limits(size={0}, depth={1}, phrases={2}, "\
+			   "arguments={3})".format(self.size,
+									   self.depth,
+									   self.phrases,
+									   self.arguments)
+
 class Phrase(object):
 	"""
 	Class describing a single parsed phrase.
@@ -42,8 +237,24 @@ class Phrase(object):
 		style (int): The formatting/style flag-combination of the phrase.
 		nested (list): A list of nested Phrase objects (children).
 		override (bool): The phrase's override specification.
+		increment (bool): The phrase's increment specification.
+		name (str): The name of the phrase's style, if given in place of
+					positional arguments (see Parser.resolve()).
 	"""
 
+	# Phrases are created in the hundreds of thousands for large
+	# documents, so we don't want a __dict__ for every single one
+	__slots__ = ("_string",
+				 "_span",
+				 "opening",
+				 "closing",
+				 "style",
+				 "arguments",
+				 "nested",
+				 "override",
+				 "increment",
+				 "name")
+
 	def __init__(self,
 				 opening=None,
 				 closing=None,
@@ -52,9 +263,11 @@ class Phrase(object):
 				 args=None,
 				 nested=None,
 				 override=False,
-				 increment=False):
+				 increment=False,
+				 name=None):
 
-		self.string = string
+		self._string = string
+		self._span = None
 
 		self.opening = opening
 		self.closing = closing
@@ -69,18 +282,160 @@ class Phrase(object):
 
 		self.increment = increment
 
+		self.name = name
+
+	@property
+	def string(self):
+		"""
+		Returns:
+			The text of the phrase. For parsed phrases, it is only sliced
+			out of the escaped string when first accessed, since the texts
+			of nested phrases overlap (and would take quadratic time and
+			memory in the nesting depth to build while parsing).
+		"""
+
+		if self._span is not None:
+			escaped, start, end = self._span
+			self._string = escaped.string[start:end]
+			self._span = None
+
+		return self._string
+
+	@string.setter
+	def string(self, string):
+		self._string = string
+		self._span = None
+
+	def span(self, escaped, start, end):
+		"""
+		Sets the text of the phrase to a slice of an escaped string.
+
+		Arguments:
+			escaped (Escaped): The escaped string (whose 'string' attribute
+							   is set once it is complete).
+			start (int): The index at which the text starts.
+			end (int): The index at which the text ends.
+		"""
+
+		self._string = None
+		self._span = (escaped, start, end)
+
 	def __str__(self):
 		return self.string
 
+	def __repr__(self):
+		return "Phrase({0}, {1}, {2!r})".format(self.opening,
+												self.closing,
+												self.string)
+
 	def __eq__(self, other):
-		return (self.string == other.string			and
-				self.opening == other.opening 		and
+		if not isinstance(other, Phrase):
+			return NotImplemented
+
+		# Compare the cheap scalar attributes before the
+		# string and especially before the nested phrases,
+		# which recurse into this method for every child
+		return (self.opening == other.opening 		and
 				self.closing == other.closing 		and
+				self.override == other.override		and
+				self.increment == other.increment	and
 				self.style == other.style 			and
 				self.arguments == other.arguments 	and
-				self.nested == other.nested			and
-				self.override == other.override		and
-				self.increment == other.increment)
+				self.name == other.name				and
+				self.string == other.string			and
+				self.nested == other.nested)
+
+	def __ne__(self, other):
+		equal = self.__eq__(other)
+		return equal if equal is NotImplemented else not equal
+
+	# Phrases are mutable, so they must not be hashable
+	__hash__ = None
+
+class Escaped(object):
+	"""
+	The escaped string built by Parser.parse(), in chunks.
+
+	Escape characters are only ever removed directly before the meta
+	character currently being parsed, i.e. from the end of the string
+	built so far, so the string can be built by appending chunks of the
+	original string (instead of re-slicing the whole string for every
+	removal, which is quadratic for many escapes or phrases).
+
+	Attributes:
+		chunks (list): The (non-empty) pieces of the escaped string.
+		length (int): The total length of all chunks.
+		string (str): The whole escaped string, once it is complete (see
+					  Phrase.span()).
+	"""
+
+	__slots__ = ("chunks", "length", "string")
+
+	def __init__(self):
+		"""
+		Initializes an empty Escaped instance.
+		"""
+
+		self.chunks = []
+		self.length = 0
+		self.string = None
+
+	def append(self, text):
+		"""
+		Appends text to the escaped string.
+
+		Arguments:
+			text (str): The text to append (may be empty).
+		"""
+
+		if text:
+			self.chunks.append(text)
+			self.length += len(text)
+
+	def escaped(self, start):
+		"""
+		Checks if the escaped string ends with an escape character.
+
+		Arguments:
+			start (int): The index at which the current scope starts
+						 (characters before it do not escape anything).
+
+		Returns:
+			True if the last character is an escape character ('\')
+			within the current scope, else False.
+		"""
+
+		return self.length > start and self.chunks[-1][-1] == "\\"
+
+	def unescape(self):
+		"""
+		Removes the last character (an escape character).
+
+		Returns:
+			The index of the removed character.
+		"""
+
+		last = self.chunks.pop()
+
+		if len(last) > 1:
+			self.chunks.append(last[:-1])
+
+		self.length -= 1
+
+		return self.length
+
+	def join(self, chunk=0):
+		"""
+		Joins the chunks of the escaped string.
+
+		Arguments:
+			chunk (int): The index of the first chunk to join.
+
+		Returns:
+			The escaped string from the given chunk on.
+		"""
+
+		return "".join(self.chunks[chunk:])
 
 class Parser(object):
 	"""
@@ -100,25 +455,92 @@ class Parser(object):
 
 	Attributes:
 		always: The list of 'always' (keyword) arguments.
+		names (dict): The named styles, by name (see styles.split()),
+					  which apply only to phrases naming them.
 		positional: The list of positional arguments.
 		tags: A compiled regex matching opening or closing tags.
 		argument: A compiled regex matching well-formed phrase arguments.
+		named: A compiled regex matching style names (in place of arguments).
 		counter: A counter for positional arguments.
+		diagnostics (errors.Diagnostics): Handles un-escaped meta-characters.
+		source (source.Source): The original string of the current parse.
+		offset (int): The index at which the scope currently being stringified
+					  starts within the (escaped) string.
+		color (bool): Whether escape-codes are rendered (else phrases are
+					  rendered via self.strip()).
+		sourcemap (source.SourceMap): The map being recorded while rendering.
+		cursor (int): The index at which the output of the scope currently
+					  being stringified starts within the beautified string.
+		limits (Limits): The limits on the work done by self.parse().
+		codes (dict): The escape-codes of each flag-combination used so far
+					  (shared with the theme, if any).
 	"""
 
-	def __init__(self, args, kwargs):
+	def __init__(self,
+				 args,
+				 kwargs,
+				 diagnostics=None,
+				 color=True,
+				 limits=None,
+				 theme=None):
 
 		"""
 		Initializes a Parser instance.
 
 		Arguments:
-			args (list): The positional arguments.
-			kwargs (dict): The 'always' (keyword) arguments.
+			args (list): The positional arguments, or a styles.StyleSet.
+			kwargs (dict): The 'always' (keyword) arguments, including
+						   named styles (keyed by their name in
+						   parantheses, e.g. "(error)").
+			diagnostics (str): How to handle un-escaped meta-characters, one
+							   of errors.WARN (the default), errors.SILENT,
+							   errors.COLLECT or errors.STRICT. May also
+							   be an errors.Diagnostics instance.
+			color (bool): Whether to render escape-codes. If False, tags are
+						  merely removed (e.g. for output that does not go
+						  to a terminal, see terminal.capabilities()).
+			limits (Limits): The limits on the work done by self.parse()
+							 (defaults to Limits()).
+			theme (theme.Theme): A theme whose (already validated) styles
+								 and escape-codes to use, extended by any
+								 positional and 'always' arguments.
 		"""
 
-		self.always = kwargs
+		# A single StyleSet (e.g. passed on from beautify()) is used as it is
+		if (isinstance(args, (list, tuple)) and len(args) == 1 and
+			isinstance(args[0], styles.StyleSet)):
+			args = args[0]
+
+		if isinstance(args, styles.StyleSet) and (kwargs or theme):
+			# Extended like any other argument below
+			args = [args]
+
+		if isinstance(args, styles.StyleSet):
+			self.always = args.always
+			self.names = args.names
+			self.positional = args.positional
+			self.codes = {}
+		elif theme is None:
+			self.always = kwargs
+			self.positional = self.get_flags(args) if args else []
+			self.always, self.names = styles.split(self.always)
+			self.codes = {}
+		else:
+			if args or kwargs:
+				# Extend a copy of the theme's styles
+				self.always = dict(theme.always)
+				self.always.update(kwargs or {})
+				self.positional = list(theme.positional)
+				self.positional += self.get_flags(args) if args else []
+				self.always, names = styles.split(self.always)
+				self.names = dict(theme.names)
+				self.names.update(names)
+			else:
+				self.always = theme.always
+				self.names = theme.names
+				self.positional = theme.positional
 
-		self.positional = self.get_flags(args) if args else []
+			self.codes = theme.codes
 
 		self.meta = re.compile(r"[()<>]")
 
@@ -126,10 +548,27 @@ class Parser(object):
 			 		 			    r"^!?(-?\d,?)+$|"
 			 					    r"^(!\+?|\+!?)$")
 
+		self.named = re.compile(r"^[A-Za-z_]\w*$")
+
 		# Used in self.stringify to auto-increment
 		# positional argument positions
 		self.counter = 0
 
+		if not isinstance(diagnostics, errors.Diagnostics):
+			diagnostics = errors.Diagnostics(diagnostics or errors.WARN)
+
+		self.diagnostics = diagnostics
+
+		self.color = color
+
+		self.source = None
+		self.offset = 0
+
+		self.sourcemap = None
+		self.cursor = 0
+
+		self.limits = Limits() if limits is None else limits
+
 	def get_flags(self, args):
 
 		"""
@@ -176,62 +615,21 @@ class Parser(object):
 
 		"""
 
-		positional = []
-
-		for argument in args:
-			# A flag is an instance of a subclass of
-			# flags.Flags if it was passed alone
-			if isinstance(argument, flags.Flags):
-				positional.append(argument)
-
-			# or is an integer if it was (bitwise) OR'd
-			# with another flag (a "flag combination")
-			elif isinstance(argument, int):
-				if argument < 0 or argument >= flags.LIMIT:
-					raise errors.FlagError("Flag value '{0}' is out of range "
-										   "!".format(argument))
-				positional.append(argument)
-
-			# Dictionaries store 'always'-arguments
-			elif isinstance(argument, dict):
-				for key, value in argument.items():
-					# Simple 'always'-argument where one string
-					# is mapped to one formatting flag-combination
-					if isinstance(key, str):
-						self.always[key] = value
-
-					# Complex 'always'-argument with a
-					# tuple containing strings, each with the same
-					# flag-combination (same value)
-					elif isinstance(key, tuple):
-						for i in key:
-							self.always[i] = value
-					else:
-						raise errors.EcstasyError("Key '{0}' in dictionary "
-												  "argument passed is neither "
-												  "a string nor a tuple "
-												  "of strings!".format(key))
-
-			elif isinstance(argument, collections.Iterable):
-				positional += self.get_flags(argument)
-
-			else:
-				raise errors.EcstasyError("Argument '{0}' is neither a flag, a "
-										  "(bitwise) OR'd flag-combination, a "
-										  "dictionary nor an  iterable of "
-										  "positional arguments "
-										  "!".format(argument))
-
-		return positional
+		return styles.flatten(args, self.always)
 
-	def beautify(self, string):
+	def beautify(self, string, sourcemap=None):
 		"""
 		Wraps together all actions needed to beautify a string, i.e.
 		parse the string and then stringify the phrases (replace tags
 		with formatting codes).
 
+		Binary strings (bytes, bytearray or memoryview) are beautified
+		by self.beautify_bytes().
+
 		Arguments:
 			string (str): The string to beautify/parse.
+			sourcemap (source.SourceMap): An optional, empty source map to
+										  record offsets into.
 
 		Returns:
 			The parsed, stringified and ultimately beautified string.
@@ -241,294 +639,458 @@ class Parser(object):
 			(flag combination) was supplied.
 		"""
 
+		if isinstance(string, BINARY):
+			return self.beautify_bytes(string, sourcemap)
+
 		if not string:
 			return string
 
 		# string may differ because of escaped characters
 		string, phrases = self.parse(string)
 
+		return self.render(string, phrases, self.source, sourcemap)
+
+	def beautify_bytes(self, data, sourcemap=None):
+		"""
+		Beautifies binary data, e.g. UTF-8 encoded text, into bytes.
+
+		All meta characters, escape characters and escape-codes are ASCII,
+		so the data need not be decoded from its actual encoding. Instead,
+		it is read as latin-1, which maps every byte to the character of
+		the same value (in a single copy), and the result is written back
+		the same way. Multi-byte characters thus pass through untouched,
+		as long as the encoding is ASCII-compatible (like UTF-8). The
+		'always' keys are matched against their UTF-8 encoding, and error
+		positions and source map offsets count bytes.
+
+		Arguments:
+			data (bytes): The data to beautify (bytes, bytearray or
+						  memoryview).
+			sourcemap (source.SourceMap): An optional, empty source map to
+										  record (byte) offsets into.
+
+		Returns:
+			The beautified data, as bytes.
+
+		Raises:
+			errors.ArgumentError if phrases were found, but not a single style
+			(flag combination) was supplied.
+		"""
+
+		text = codecs.latin_1_decode(data)[0]
+
+		always = self.always
+
+		if always:
+			self.always = dict((latin(k), v) for k, v in always.items())
+
+		try:
+			return self.beautify(text, sourcemap).encode("latin-1")
+		finally:
+			self.always = always
+
+	def render(self, string, phrases, origin=None, sourcemap=None, counter=0):
+		"""
+		Stringifies the result of a previous call to self.parse().
+
+		As opposed to self.stringify(), this method resets the positional
+		counter before stringifying, such that the same parsed string (e.g.
+		one loaded from a cache.Cache) can be rendered any number of times.
+		Pieces of a larger string can instead continue counting where the
+		previous piece left off by passing its final self.counter.
+
+		Arguments:
+			string (str): The escaped string returned by self.parse().
+			phrases (list): The list of phrases returned by self.parse().
+			origin (source.Source): The source (self.source) of the parse,
+									if known, to report error positions
+									relative to the original string.
+			sourcemap (source.SourceMap): An optional, empty source map to
+										  record offsets into. Offsets refer
+										  to the original string if the
+										  origin is known and else to the
+										  escaped string. Offsets are only
+										  recorded if self.color is set.
+			counter (int): The value to start the positional counter at.
+
+		Returns:
+			The beautified string.
+
+		Raises:
+			errors.ArgumentError if phrases were found, but not a single style
+			(flag combination) was supplied, or too few (whether or not
+			self.color is set).
+		"""
+
 		if not phrases:
+			if sourcemap is not None:
+				sourcemap.add(0, 0, len(string), origin)
 			return string
 
-		if not self.positional and not self.always:
+		if not (self.positional or self.always or self.names):
 			raise errors.ArgumentError("Found phrases, but no styles "
 									   "were supplied!")
 
-		return self.stringify(string, phrases)
+		self.counter = counter
+
+		self.source = origin
+		self.offset = 0
+
+		if not self.color:
+			# Without escape-codes, the styles are still resolved,
+			# so that the same markup fails regardless of the output
+			self.validate(phrases)
+			return self.strip(string, phrases)
 
-	def parse(self, string, root=None):
+		self.sourcemap = sourcemap
+		self.cursor = 0
+
+		try:
+			return self.stringify(string, phrases)
+		finally:
+			self.sourcemap = None
+
+	def parse(self, string):
 
 		"""
 		Parses a string to handle escaped tags and retrieve phrases.
 
-		This method works recursively to parse nested tags. When escaped
-		tags are found, those are removed from the string. Also argument
-		sequences are removed from the string. The string returned can
-		thus be quite different from the string passed.
+		The string is scanned once, from left to right. When escaped
+		tags are found, the escape characters are removed from the string.
+		Also argument sequences are removed from the string. The string
+		returned can thus be quite different from the string passed.
+		Nested phrases are tracked on an explicit stack of open scopes
+		rather than by recursion, so that neither deep nesting nor long
+		strings cost more than linear time in the length of the string
+		(apart from the strings of the phrases themselves). The work done
+		can be bounded further with self.limits.
 
 		Arguments:
 			string (str): The string to parse.
-			root (Phrase): If in a recursive call, the root/parent phrase.
 
 		Returns:
 			For one, the escaped string (without escape characters and
-			phrase arguments). For the other, it depends on the stack-depth.
-			If this is the lowest recursion depth/level (i.e. the stack
-			call resulting from the first function call in self.beautify()),
-			it will return a list of phrases. For higher stack levels (
-			i.e. resulting from recursive function calls from with
-			self.parse(), for nested phrases), it returns exactly one
-			Phrase instance.
+			phrase arguments). For the other, the list of (top-level)
+			phrases, each with its nested phrases.
 
 		Raises:
-			errors.ParseError: If no closing tag could be
-							   found for an opening tag.
+			errors.ParseError: If no closing tag could be found for an
+							   opening tag or an argument sequence is
+							   invalid.
+
+			errors.LimitError: If the string exceeds one of self.limits.
 		"""
 
+		self.source = source.Source(string)
+		self.offset = 0
+		self.diagnostics.reset()
+
+		limits = self.limits
+
+		if limits.size is not None and len(string) > limits.size:
+			what = "String of length {0} exceeds the size limit of {1}"
+			raise errors.LimitError(what.format(len(string), limits.size))
+
+		escaped = Escaped()
+
+		# The open phrases, each with the index of its first chunk
+		# and the index at which its scope starts in the escaped string
+		scopes = []
+
 		phrases = []
 
-		meta = self.meta.search(string)
+		count = 0
+
+		search = self.meta.search
+
+		last = 0
+
+		meta = search(string)
 
 		while meta:
 
-			# Save some function calls
 			pos = meta.start()
 
+			escaped.append(string[last:pos])
+
+			last = pos + 1
+
+			if scopes:
+				root, chunk, start = scopes[-1]
+			else:
+				root, start = None, 0
+
 			if meta.group() == "<":
-				string, child, meta = self.open_phrase(string, pos)
+				child = self.open_phrase(escaped, start)
 
-				if child and root:
-					root.nested.append(child)
-				elif child:
-					phrases.append(child)
+				# else it was escaped
+				if child:
+					if limits.depth is not None and len(scopes) >= limits.depth:
+						self.raise_limit("Phrases are nested deeper than the "
+										 "depth limit of {0}".format(limits.depth),
+										 escaped.length - 1)
 
-				# else it was escaped (+ new meta)
-				continue
+					count += 1
+
+					if limits.phrases is not None and count > limits.phrases:
+						self.raise_limit("Number of phrases exceeds the limit "
+										 "of {0}".format(limits.phrases),
+										 escaped.length - 1)
 
-			elif root:
+					if root:
+						root.nested.append(child)
+					else:
+						phrases.append(child)
+
+					scopes.append((child, len(escaped.chunks), escaped.length))
 
-				if meta.group() == "(":
-					meta = self.meta.search(string, pos + 1)
-					if meta.group() == ")":
-						string, root, meta = self.handle_arguments(string,
-																   root,
-																   pos,
-																   meta.start())
-						continue
+			# Arguments must be at the very start of a phrase
+			elif root and meta.group() == "(" and escaped.length == start:
+				closing = search(string, last)
 
-				elif meta.group() == ">":
-					string, phrase, meta = self.close_phrase(string,
-															 root,
-															 pos)
-					if phrase:
-						return string, phrase
+				if closing and closing.group() == ")":
+					self.handle_arguments(string[pos + 1 : closing.start()],
+										  root,
+										  start)
+					last = closing.end()
+				else:
+					self.escape_meta(escaped, "(", start)
 
-					# else was escaped (+ new meta)
-					continue
+			elif root and meta.group() == ">":
+				if self.close_phrase(escaped, root, start):
+					scopes.pop()
 
-			string, meta = self.escape_meta(string, pos)
+				# else it was escaped
 
-		if not root:
-			return string, phrases
+			else:
+				self.escape_meta(escaped, meta.group(), start)
 
-		# If this is not the first stack-depth the function should
-		# have returned upon finding a closing tag,
-		# i.e. we should never have gotten here.
-		word = re.search(r"([\w\s]+)(?![\d]*>[\w\s]+>)", string)
+			meta = search(string, last)
+
+		escaped.append(string[last:])
+
+		if not scopes:
+			escaped.string = escaped.join()
+
+			# Phrases keep the escaped string for their texts, not its chunks
+			escaped.chunks = []
+
+			return escaped.string, phrases
+
+		# The innermost phrase was not closed before the end of the string
+		root, chunk, start = scopes[-1]
+
+		word = re.search(r"([\w\s]+)(?![\d]*>[\w\s]+>)", escaped.join(chunk))
 
 		what = "No closing tag found for opening tag"
 
 		if word:
 			what += " after expression '{0}'".format(word.group())
 
-		raise errors.ParseError(what + "!")
+		# The opening tag directly precedes the scope
+		where = self.locate(start - 1)
+
+		raise errors.ParseError(errors.located(what, where), where)
+
+	def locate(self, index):
+
+		"""
+		Describes an index in the escaped string as a position in the
+		original string.
+
+		Arguments:
+			index (int): The index in the escaped string.
+
+		Returns:
+			The line:column position in the original string, or None if
+			the original string is not known (e.g. for cached phrases).
+		"""
+
+		if self.source is None or not self.source.text:
+			return None
+
+		return self.source.position(index)
 
-	def escape_meta(self, string, pos):
+	def raise_limit(self, what, index):
+
+		"""
+		Raises an errors.LimitError located at an index.
+
+		Arguments:
+			what (str): A descriptive string regarding the limit exceeded.
+			index (int): The index in the escaped string at which the
+						 limit was exceeded.
+
+		Raises:
+			errors.LimitError with the position of the index.
+		"""
+
+		where = self.locate(index)
+
+		raise errors.LimitError(errors.located(what, where), where)
+
+	def escape_meta(self, escaped, character, start):
 
 		"""
 		Checks if a meta character is escaped or else warns about it.
 
 		If the meta character has an escape character ('\') preceding it,
-		the meta character is escaped. If it does not, a warning is emitted
-		that the user should escape it.
+		the meta character is escaped. If it does not, it is reported to
+		self.diagnostics (which, by default, emits a warning that the user
+		should escape it). Either way, the character is appended to the
+		escaped string.
 
 		Arguments:
-			string (str): The relevant string in which the character was found.
-			pos (int): The index of the meta character within the string.
-
-		Returns:
-			The possibly escaped string and the next meta match.
+			escaped (Escaped): The escaped string so far.
+			character (str): The meta character.
+			start (int): The index at which the current scope starts.
 		"""
 
-		# Replace escape character
-		if pos > 0 and string[pos - 1] == "\\":
-			string = string[:pos - 1] + string[pos:]
+		# Remove the escape character
+		if escaped.escaped(start):
+			self.source.remove(escaped.unescape())
 		else:
-			warnings.warn("Un-escaped meta-character: '{0}' (Escape"
-						  " it with a '\\')".format(string[pos]),
-						  Warning)
-			pos += 1
+			# Silent diagnostics only count, so don't
+			# bother computing positions or messages
+			self.diagnostics.count += 1
 
-		meta = self.meta.search(string, pos)
+			if self.diagnostics.mode != errors.SILENT:
+				what = "Un-escaped meta-character: '{0}' (Escape"\
+					   " it with a '\\')".format(character)
+				index = self.source.original(escaped.length)
+				where = self.source.lines.position(index)
+				self.diagnostics.report(what, index, where)
 
-		return string, meta
+		escaped.append(character)
 
-
-	def open_phrase(self, string, pos):
+	def open_phrase(self, escaped, start):
 
 		"""
 		Helper function of self.parse() handling opening tags.
 
 		Arguments:
-			string (str): The string being parsed.
-			pos (int): The index/position of the opening tag in the string.
+			escaped (Escaped): The escaped string up to the opening tag.
+			start (int): The index at which the current scope starts.
 
 		Returns:
-			The (possibly) escaped string, a child phrase if the opening tag
-			was not escaped and otherwise None, and a new tag match, either
-			starting at one index passed the escaped tag or one index passed
-			the closing tag of the child.
+			A new phrase if the opening tag was not escaped, else None.
+			Either way, the tag is appended to the escaped string.
 		"""
 
 		# Check for escaping
-		if string[pos - 1] == "\\":
+		if escaped.escaped(start):
 			# Remove the escape character
-			string = string[:pos - 1] + string[pos:]
-
-			# When removing the escape character, the
-			# pos tag index is pushed one back
-			pos -= 1
+			self.source.remove(escaped.unescape())
 
 			# If the escape character was not itself (double)
-			# escaped we can look for the next tag
-			if pos == 0 or string[pos - 1] != "\\":
-				tag = self.meta.search(string, pos + 1)
-
-				return string, None, tag
-
-		child = Phrase(pos)
-
-		escaped, child = self.parse(string[pos + 1:], child)
+			# escaped, the tag is just a character
+			if not escaped.escaped(start):
+				escaped.append("<")
+				return None
 
-		string = string[:pos + 1] + escaped
+		# The phrase's positions are relative to the scope of its parent
+		child = Phrase(escaped.length - start)
 
-		tag = self.meta.search(string, child.closing + 1)
+		escaped.append("<")
 
-		return string, child, tag
+		return child
 
-	def close_phrase(self, string, root, pos):
+	def close_phrase(self, escaped, root, start):
 
 		"""
 		Helper function of self.parse() handling closing tags.
 
 		Arguments:
-			string (str): The string being parsed.
+			escaped (Escaped): The escaped string up to the closing tag.
 			root (Phrase): The current root phrase.
-			pos (int): The index/position of the closing tag in the string.
+			start (int): The index at which the root's scope starts.
 
 		Returns:
-			Always the (possibly) escaped string, then either the fully
-			formed phrase if the closing tag was not escaped (with its
-			'closing' and 'string' attributes set) and otherwise None,
-			and lastly the next tag if the closing tag was indeed escaped
-			and otherwise None -- i.e. either the tuple
-			(string, phrase, None) or (string, None, tag).
+			True if the closing tag was not escaped, in which case the root
+			phrase is fully formed (with its 'closing' and 'string'
+			attributes set), else False. Either way, the tag is appended
+			to the escaped string.
 		"""
 
-		# Whatever is between the opening tag and this closing tag
-		substring = string[:pos]
-
 		# Escape-character to escape the closing tag (/>)
-		if substring.endswith("\\"):
+		if escaped.escaped(start):
 
 			# Get rid of the escape character either way
-			string = string[:pos - 1] + string[pos:]
-
-			# Check if not double-escaped
-			if not substring[:-1].endswith("\\"):
-				# pos is now one index passed the closing tag
-				tag = self.meta.search(string, pos)
+			self.source.remove(escaped.unescape())
 
-				return string, None, tag
+			# Check if not double-escaped, else this is really
+			# supposed to be a closing tag and the phrase is done
+			if not escaped.escaped(start):
+				escaped.append(">")
+				return False
 
-			# Double-escape means this is really supposed to be a
-			# closing tag and thus we can return the phrase.
-			else:
-				# The closing position should be in the same scope
-				# as the scope of the opening position (scope in
-				# the sense of to which phrase the positions are
-				# relative to). -1 due to the escaped character but
-				# + 1 because index 0 is phrase.opening + 1
-				root.closing = root.opening + pos
-				root.string = string[:pos - 1]
-		else:
-			root.closing = root.opening + 1 + pos
-			root.string = string[:pos]
+		# The closing position should be in the same scope
+		# as the scope of the opening position (scope in
+		# the sense of to which phrase the positions are
+		# relative to), + 1 because index 0 is phrase.opening + 1
+		root.closing = root.opening + 1 + escaped.length - start
+		root.span(escaped, start, escaped.length)
 
-		return string, root, None
+		escaped.append(">")
 
+		return True
 
-	def handle_arguments(self, string, root, opening, closing):
+	def handle_arguments(self, sequence, root, start):
 
 		"""
 		Handles phrase-arguments.
 
-		Sets the override and increment flags if found. Also makes
-		sure that the argument sequence is at the start of the phrase
-		and else warns about the unescaped meta characters. If the
-		arguments are indeed at the start but do not match the arguments
-		regular expression, an error is raised.
+		Sets the override and increment flags if found, or the name of the
+		phrase's style if the sequence is a name (an identifier). The
+		argument sequence must be at the start of the phrase (else
+		self.parse() treats the parantheses as ordinary meta characters)
+		and must match the arguments regular expression or be a name,
+		else an error is raised.
+		The sequence (including parantheses) is not part of the escaped
+		string.
 
 		Arguments:
-			string (str): The string being parsed.
-			root (str): The current root phrase.
-			opening (int): The index of the opening paranthese.
-			closing (int): The index of the closing paranthese.
-
-		Returns:
-			The (possibly escaped) string, the root phrase (if no escaping,
-			then with arguments and flags) and the next meta match.
+			sequence (str): The text between the parantheses.
+			root (Phrase): The current root phrase.
+			start (int): The index at which the root's scope starts.
 
 		Raises:
 			errors.ParseError: If the arguments are invalid.
-		"""
-
-		# The actual argument string (ignore whitespace)
-		args = string[opening + 1 : closing].replace(" ", "")
 
-		# The argument sequence must be at the start of the phrase
-		# and must match the allowed argument regular expression
-		if opening > 0 or not self.arguments.match(args):
+			errors.LimitError: If the sequence is longer than allowed by
+							   self.limits.
+		"""
 
-			if opening == 0:
-				raise errors.ParseError("Invalid argument sequence!")
+		limit = self.limits.arguments
 
-			# If escape_meta does indeed escape a character and removes
-			# a backward slash, the positions 'opening' and 'closing' are no
-			# longer valid. escape_meta does a search for the next meta
-			# character though, which is then the closing parantheses,
-			# so we can use its index value (in the now escaped string)
-			string, meta = self.escape_meta(string, opening)
-			string, meta = self.escape_meta(string, meta.start())
+		if limit is not None and len(sequence) > limit:
+			self.raise_limit("Argument sequence exceeds the length limit "
+							 "of {0}".format(limit), start)
 
-			return string, root, meta
+		# The actual argument string (ignore whitespace)
+		args = sequence.replace(" ", "")
 
-		if "!" in args:
-			root.override = True
-			args = args.replace("!", "")
+		if self.named.match(args):
+			root.name = args
 
-		if "+" in args:
-			root.increment = True
-			args = args.replace("+", "")
+		elif not self.arguments.match(args):
+			where = self.locate(start)
+			what = errors.located("Invalid argument sequence", where)
+			raise errors.ParseError(what, where)
 
-		root.arguments = [int(i) for i in args.split(",") if i]
+		else:
+			if "!" in args:
+				root.override = True
+				args = args.replace("!", "")
 
-		# Remove the argument string including parantheses
-		string = string[closing + 1:]
+			if "+" in args:
+				root.increment = True
+				args = args.replace("+", "")
 
-		meta = self.meta.search(string)
+			root.arguments = [int(i) for i in args.split(",") if i]
 
-		return string, root, meta
+		# Record the removal of the sequence including parantheses
+		self.source.remove(start, len(sequence) + 2)
 
 	def stringify(self, string, phrases, parent=None):
 
@@ -539,15 +1101,14 @@ class Parser(object):
 		escaped string and the list of phrases returned by self.parse() and
 		replaces the original phrases (with tags) with the Phrase-objects in
 		the list and adds the appropriate flag-combinations as determined by
-		the string or the position of the phrase (the string if it's in
-		self.always, i.e. an 'always' argument). This method also works
-		recursively to handle nested phrases (and resetting of parent-phrase
-		styles).
+		self.resolve(). This method also works recursively to handle nested
+		phrases (and resetting of parent-phrase styles). The phrases
+		themselves are not modified, so they may be stringified again.
 
 		Arguments:
 			string (str): The escaped string returned by self.parse().
 			phrases (list): The list of Phrase-objects returned by self.parse().
-			parent (Phrase): For recursive calls, the current parent Phrase.
+			parent (str): For recursive calls, the style code of the parent.
 
 		Returns:
 			The finished, beautifully beautified string.
@@ -561,59 +1122,309 @@ class Parser(object):
 
 		beauty = ""
 
+		# After a nested phrase is over, we reset the style to the
+		# parent style, this gives the notion of nested styles.
+		reset = "\033[0;{0}m".format(parent if parent else "")
+
+		sourcemap = self.sourcemap
+		cursor = self.cursor
+
 		for phrase in phrases:
 
+			if sourcemap is not None:
+				sourcemap.add(cursor + len(beauty),
+							  self.offset + last_tag,
+							  phrase.opening - last_tag,
+							  self.source)
+
 			beauty += string[last_tag : phrase.opening]
 
-			if phrase.string in self.always and not phrase.override:
-				phrase.style = self.always[phrase.string]
+			style = self.code(self.resolve(phrase))
 
-			if phrase.arguments:
-				combination = 0
-				for i in phrase.arguments:
-					try:
-						combination |= self.positional[i]
-					except IndexError:
-						raise errors.ArgumentError("Positional argument '{0}' "
-							 					   "is out of range"
-							 					   "!".format(i))
-
-				phrase.style |= combination
+			# \033[ signifies the start of a command-line escape-sequence
+			beauty += "\033[{0}m".format(style)
 
-			elif (phrase.string not in self.always or
-				  phrase.increment or phrase.override):
-				try:
-					combination = self.positional[self.counter]
+			text = phrase.string
 
-					if phrase.increment or not phrase.override:
-						self.counter += 1
-				except IndexError:
-					self.raise_not_enough_arguments(phrase.string)
+			if phrase.nested:
+				# Track the scope for error positions and the source map
+				self.offset += phrase.opening + 1
+				self.cursor = cursor + len(beauty)
 
-				phrase.style |= combination
+				text = self.stringify(text, phrase.nested, style)
 
-			phrase.style = flags.codify(phrase.style)
+				self.offset -= phrase.opening + 1
+				self.cursor = cursor
 
-			if phrase.nested:
-				phrase.string = self.stringify(phrase.string,
-											   phrase.nested,
-											   phrase)
+			elif sourcemap is not None:
+				sourcemap.add(cursor + len(beauty),
+							  self.offset + phrase.opening + 1,
+							  len(text),
+							  self.source)
 
-			# After a nested phrase is over, we reset the style to the
-			# parent style, this gives the notion of nested styles.
-			reset = parent.style if parent else ""
+			beauty += text + reset
 
-			# \033[ signifies the start of a command-line escape-sequence
-			beauty += "\033[{0}m{1}\033[0;{2}m".format(phrase.style,
-													   phrase,
-													   reset)
 			last_tag = phrase.closing + 1
 
+		if sourcemap is not None:
+			sourcemap.add(cursor + len(beauty),
+						  self.offset + last_tag,
+						  len(string) - last_tag,
+						  self.source)
+
 		beauty += string[last_tag:]
 
 		return beauty
 
-	def raise_not_enough_arguments(self, string):
+	def validate(self, phrases):
+
+		"""
+		Resolves the styles of phrases without stringifying them.
+
+		This is what self.stringify() does apart from building the string,
+		used by self.render() when no escape-codes are rendered.
+
+		Arguments:
+			phrases (list): The list of Phrase-objects returned by self.parse().
+
+		Raises:
+			errors.ArgumentError: If more positional arguments are requested
+								  than were supplied.
+		"""
+
+		for phrase in phrases:
+			self.resolve(phrase)
+
+			if phrase.nested:
+				# Track the scope for error positions
+				self.offset += phrase.opening + 1
+				self.validate(phrase.nested)
+				self.offset -= phrase.opening + 1
+
+	def strip(self, string, phrases):
+
+		"""
+		Removes the tags of parsed phrases without adding any formatting.
+
+		This is the plain counterpart to self.stringify(), used when output
+		is not meant for a terminal (and escape-codes would only be noise).
+
+		Arguments:
+			string (str): The escaped string returned by self.parse().
+			phrases (list): The list of Phrase-objects returned by self.parse().
+
+		Returns:
+			The string of all phrases, without tags or escape-codes.
+		"""
+
+		last_tag = 0
+
+		plain = ""
+
+		for phrase in phrases:
+
+			plain += string[last_tag : phrase.opening]
+
+			if phrase.nested:
+				plain += self.strip(phrase.string, phrase.nested)
+			else:
+				plain += phrase.string
+
+			last_tag = phrase.closing + 1
+
+		plain += string[last_tag:]
+
+		return plain
+
+	def code(self, combination):
+
+		"""
+		Gets the escape-codes of a flag-combination, codifying it only once.
+
+		Arguments:
+			combination (int): A flag or flag-combination.
+
+		Returns:
+			The escape-codes, as returned by flags.codify().
+
+		Raises:
+			errors.FlagError if the combination is out-of-range.
+		"""
+
+		key = int(combination)
+
+		code = self.codes.get(key)
+
+		if code is None:
+			code = self.codes[key] = flags.codify(combination)
+
+		return code
+
+	def resolve(self, phrase):
+
+		"""
+		Determines the style (flag-combination) of a single phrase.
+
+		The style of a named phrase (e.g. "<(error)text>") is the named
+		style of that name (in self.names), regardless of the phrase's
+		position or text (and without affecting self.counter). The named
+		styles never apply to phrases by their text, nor do 'always'
+		arguments apply to phrases by their name. Otherwise, the style is
+		determined by the string of the phrase if it's in self.always
+		(i.e. an 'always' argument) and not overriden, by the positional
+		arguments of the phrase if it has any, and else by the position of
+		the phrase (self.counter), which is incremented for simple phrases.
+
+		Arguments:
+			phrase (Phrase): The phrase to determine the style for.
+
+		Returns:
+			The flag-combination of the phrase.
+
+		Raises:
+			errors.ArgumentError: If more positional arguments are requested
+								  than were supplied or there is no style
+								  of a phrase's name.
+		"""
+
+		style = phrase.style
+
+		if phrase.name is not None:
+			if phrase.name not in self.names:
+				where = self.locate(self.offset + phrase.opening)
+				what = "No style named '{0}'".format(phrase.name)
+				raise errors.ArgumentError(errors.located(what, where), where)
+
+			return style | self.names[phrase.name]
+
+		if phrase.string in self.always and not phrase.override:
+			style = self.always[phrase.string]
+
+		if phrase.arguments:
+			combination = 0
+			for i in phrase.arguments:
+				try:
+					combination |= self.positional[i]
+				except IndexError:
+					where = self.locate(self.offset + phrase.opening)
+					what = "Positional argument '{0}' is out of range"
+					raise errors.ArgumentError(errors.located(what.format(i),
+															  where),
+											   where)
+
+			style |= combination
+
+		elif (phrase.string not in self.always or
+			  phrase.increment or phrase.override):
+			try:
+				combination = self.positional[self.counter]
+
+				if phrase.increment or not phrase.override:
+					self.counter += 1
+			except IndexError:
+				where = self.locate(self.offset + phrase.opening)
+				self.raise_not_enough_arguments(phrase.string, where)
+
+			style |= combination
+
+		return style
+
+	def check(self, string):
+
+		"""
+		Parses a string and summarizes its requirements without rendering.
+
+		The phrases are walked in the same order and with the same
+		positional-counter semantics as in self.stringify(), but instead of
+		resolving styles, the indices of the positional arguments that
+		would be used are recorded.
+
+		Arguments:
+			string (str): The string to check.
+
+		Returns:
+			A Summary, with the fields:
+
+			* positionals: The number of auto-incremented positional styles
+			  consumed by simple phrases.
+			* indices: The sorted, distinct explicit indices of all argument
+			  phrases (including negative ones).
+			* overrides: The number of phrases with an override ('!').
+			* increments: The number of phrases with an increment ('+').
+			* phrases: The strings of all phrases not overriding 'always'
+			  arguments, i.e. those that an 'always' key could match.
+			* required: The minimum number of positional styles needed to
+			  beautify the string (0 if it does not parse).
+			* errors: The errors.EcstasyError raised while parsing, if any.
+			* diagnostics: The errors.Diagnostic for each un-escaped
+			  meta-character (if self.diagnostics collects them).
+			* names: The sorted, distinct style names of named phrases,
+			  each of which must be a named style.
+		"""
+
+		summary = {
+			"names": set(),
+			"indices": set(),
+			"overrides": 0,
+			"increments": 0,
+			"phrases": [],
+			"required": 0
+		}
+
+		failures = []
+
+		self.counter = 0
+
+		try:
+			phrases = self.parse(string)[1]
+		except errors.EcstasyError as error:
+			failures.append(error)
+			phrases = []
+
+		stack = list(reversed(phrases))
+
+		while stack:
+			phrase = stack.pop()
+
+			stack.extend(reversed(phrase.nested))
+
+			if phrase.name is not None:
+				summary["names"].add(phrase.name)
+				continue
+
+			if phrase.override:
+				summary["overrides"] += 1
+			else:
+				summary["phrases"].append(phrase.string)
+
+			if phrase.increment:
+				summary["increments"] += 1
+
+			if phrase.arguments:
+				for i in phrase.arguments:
+					summary["indices"].add(i)
+					needed = -i if i < 0 else i + 1
+					summary["required"] = max(summary["required"], needed)
+
+			elif (phrase.string not in self.always or
+				  phrase.increment or phrase.override):
+				summary["required"] = max(summary["required"],
+										  self.counter + 1)
+
+				if phrase.increment or not phrase.override:
+					self.counter += 1
+
+		return Summary(self.counter,
+					   sorted(summary["indices"]),
+					   summary["overrides"],
+					   summary["increments"],
+					   summary["phrases"],
+					   summary["required"],
+					   failures,
+					   list(self.diagnostics.entries),
+					   sorted(summary["names"]))
+
+	def raise_not_enough_arguments(self, string, where=None):
 
 		"""
 		Raises an errors.ArgumentError if not enough arguments were supplied.
@@ -623,6 +1434,7 @@ class Parser(object):
 		Arguments:
 			string (str): The string of the phrase for which there weren't enough
 						  arguments.
+			where (str): The position of the phrase in the original string.
 
 		Raises:
 			errors.ArgumentError with a detailed error message.
@@ -634,9 +1446,13 @@ class Parser(object):
 
 		verb = "was" if number == 1 else "were"
 
-		what = "Requested {} formatting argument for "\
-			   "'{}' but only {} {} supplied!"
+		what = "Requested {0} formatting argument for '{1}'"
+
+		what = what.format(requested, string)
+
+		if where is not None:
+			what += " at position {0}".format(where)
 
-		what = what.format(requested, string, number, verb)
+		what += " but only {0} {1} supplied!".format(number, verb)
 
-		raise errors.ArgumentError(what)
+		raise errors.ArgumentError(what, where)
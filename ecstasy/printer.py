@@ -0,0 +1,156 @@
+"""
+Buffered printing of beautified strings.
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+import ecstasy.parser as parser
+import ecstasy.terminal as terminal
+
+# time.monotonic is not available before Python 3.3
+clock = getattr(time, "monotonic", time.time)
+
+class Printer(object):
+	"""
+	Beautifies strings and writes them to a stream in batches.
+
+	Rather than writing (and thus making one system call for) every
+	beautified line, a Printer renders lines into a buffer with one shared,
+	pre-configured Parser and writes the buffer to the stream once it holds
+	at least 'size' characters, once 'interval' seconds have passed since
+	the last write (checked whenever something is printed), or when
+	flush() is called. A Printer flushes on close() and when used as a
+	context manager.
+
+	Attributes:
+		stream: The stream written to.
+		parser (Parser): The parser used to beautify strings.
+		size (int): The number of buffered characters at which to flush.
+		interval (float): The number of seconds after which to flush,
+						  or None to flush only by size.
+		buffer (list): The beautified strings not yet written.
+		buffered (int): The number of characters in the buffer.
+		last (float): The time of the last flush.
+	"""
+
+	def __init__(self,
+				 stream=None,
+				 styles=None,
+				 always=None,
+				 size=8192,
+				 interval=None,
+				 color=None):
+		"""
+		Initializes a Printer instance.
+
+		Arguments:
+			stream: The stream to write to (defaults to sys.stdout).
+			styles: The positional styles, in any form accepted by
+					beautify(), or a pre-configured Parser.
+			always (dict): The 'always' styles (if styles is no Parser).
+			size (int): The number of buffered characters to flush at.
+			interval (float): The number of seconds to flush after.
+			color (bool): Whether to render escape-codes. By default, this
+						  is determined by terminal.capabilities(stream).
+		"""
+
+		self.stream = sys.stdout if stream is None else stream
+
+		if isinstance(styles, parser.Parser):
+			self.parser = styles
+		else:
+			if color is None:
+				color = terminal.capabilities(self.stream).color
+
+			if styles is None:
+				styles = []
+			elif not isinstance(styles, (list, tuple)):
+				styles = [styles]
+
+			self.parser = parser.Parser(styles,
+										dict(always) if always else {},
+										color=color)
+
+		self.size = size
+		self.interval = interval
+
+		self.buffer = []
+		self.buffered = 0
+
+		self.last = clock()
+
+	def write(self, string):
+		"""
+		Beautifies a string and buffers it.
+
+		Arguments:
+			string (str): The string to beautify.
+		"""
+
+		self.append(self.parser.beautify(string))
+
+	def print(self, string="", end="\n"):
+		"""
+		Beautifies a string and buffers it, followed by 'end'.
+
+		Arguments:
+			string (str): The string to beautify.
+			end (str): The string to append (not beautified).
+		"""
+
+		self.append(self.parser.beautify(string) + end)
+
+	def append(self, data):
+		"""
+		Buffers an already beautified string and flushes if necessary.
+
+		Arguments:
+			data (str): The string to buffer.
+		"""
+
+		self.buffer.append(data)
+		self.buffered += len(data)
+
+		if self.buffered >= self.size:
+			self.flush()
+
+		elif self.interval is not None and clock() - self.last >= self.interval:
+			self.flush()
+
+	def flush(self):
+		"""
+		Writes the buffer to the stream (in one call) and flushes the stream.
+		"""
+
+		self.last = clock()
+
+		if not self.buffer:
+			return
+
+		data = "".join(self.buffer)
+
+		self.buffer = []
+		self.buffered = 0
+
+		self.stream.write(data)
+
+		flush = getattr(self.stream, "flush", None)
+
+		if flush is not None:
+			flush()
+
+	def close(self):
+		"""
+		Flushes the buffer (the stream itself is not closed).
+		"""
+
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
@@ -0,0 +1,244 @@
+"""
+Tracking of positions in the original (unparsed) string.
+"""
+
+import bisect
+
+from array import array
+
+import ecstasy.errors as errors
+
+class Source(object):
+	"""
+	Maps positions in a partially or fully escaped string to the original.
+
+	While parsing, ecstasy removes escape characters and argument sequences
+	from the string, so that positions in the escaped string no longer
+	match positions in the string that was passed in. Since parsing works
+	from left to right, every removal happens at or after the previous
+	one, so it suffices to record the (escaped) index and the running
+	total of characters removed for each removal to map any index back to
+	the original string with a single binary search.
+
+	Attributes:
+		text (str): The original string.
+		removed (array): The escaped index of each removal, in order.
+		shifts (array): The total number of characters removed up to
+						and including each removal.
+		lines (errors.Lines): The (lazy) line index of the original string.
+	"""
+
+	__slots__ = ("text", "removed", "shifts", "lines")
+
+	def __init__(self, text):
+		"""
+		Initializes a Source instance.
+
+		Arguments:
+			text (str): The original string.
+		"""
+
+		self.text = text
+
+		self.removed = array("l")
+		self.shifts = array("l")
+
+		self.lines = errors.Lines(text)
+
+	def remove(self, index, count=1):
+		"""
+		Records the removal of characters from the escaped string.
+
+		Arguments:
+			index (int): The (escaped) index at which characters were removed.
+			count (int): The number of characters removed.
+		"""
+
+		total = self.shifts[-1] if self.shifts else 0
+
+		self.removed.append(index)
+		self.shifts.append(total + count)
+
+	def original(self, index):
+		"""
+		Maps an index in the escaped string to the original string.
+
+		Arguments:
+			index (int): The index in the escaped string.
+
+		Returns:
+			The index of the same character in the original string.
+		"""
+
+		removals = bisect.bisect_right(self.removed, index)
+
+		if not removals:
+			return index
+
+		return index + self.shifts[removals - 1]
+
+	def position(self, index):
+		"""
+		Describes an escaped index as a position in the original string.
+
+		Arguments:
+			index (int): The index in the escaped string.
+
+		Returns:
+			The line:column position (see errors.position()).
+		"""
+
+		original = min(self.original(index), len(self.text) - 1)
+
+		return self.lines.position(original)
+
+class SourceMap(object):
+	"""
+	Maps offsets in a beautified string to the original string and back.
+
+	A beautified string consists of runs of text copied verbatim from the
+	original string, interleaved with escape-codes (which have no source)
+	and missing tags, escape characters and argument sequences (which have
+	no output). A SourceMap stores one (output offset, input offset,
+	length) triple per run, in order, so that both directions of lookup
+	are a single binary search. Runs that are contiguous in both the
+	output and the input are merged.
+
+	Attributes:
+		output (array): The offset of each run in the beautified string.
+		input (array): The offset of each run in the original string.
+		length (array): The length of each run.
+	"""
+
+	__slots__ = ("output", "input", "length")
+
+	def __init__(self):
+		"""
+		Initializes an empty SourceMap.
+		"""
+
+		self.output = array("l")
+		self.input = array("l")
+		self.length = array("l")
+
+	def __len__(self):
+		return len(self.output)
+
+	def append(self, output, index, length):
+		"""
+		Appends a single run, merging it with the last run if possible.
+
+		Arguments:
+			output (int): The offset of the run in the beautified string.
+			index (int): The offset of the run in the original string.
+			length (int): The length of the run.
+		"""
+
+		if self.output:
+			end = self.output[-1] + self.length[-1]
+			if end == output and self.input[-1] + self.length[-1] == index:
+				self.length[-1] += length
+				return
+
+		self.output.append(output)
+		self.input.append(index)
+		self.length.append(length)
+
+	def add(self, output, index, length, origin=None):
+		"""
+		Records a run of text copied from the escaped string.
+
+		Because escape characters may have been removed from within the
+		run, it is split at every removal recorded by the origin.
+
+		Arguments:
+			output (int): The offset of the run in the beautified string.
+			index (int): The offset of the run in the escaped string.
+			length (int): The length of the run.
+			origin (Source): The source of the escaped string. If None,
+							 escaped offsets are recorded as they are.
+		"""
+
+		if length <= 0:
+			return
+
+		if origin is None:
+			self.append(output, index, length)
+			return
+
+		end = index + length
+
+		removed = origin.removed
+		removal = bisect.bisect_right(removed, index)
+
+		while index < end:
+			while removal < len(removed) and removed[removal] <= index:
+				removal += 1
+
+			if removal < len(removed) and removed[removal] < end:
+				stop = removed[removal]
+			else:
+				stop = end
+
+			self.append(output, origin.original(index), stop - index)
+
+			output += stop - index
+			index = stop
+
+	@staticmethod
+	def lookup(offsets, targets, lengths, offset):
+		"""
+		Maps an offset from one side of the map to the other.
+
+		Offsets that fall between runs (i.e. into escape-codes when mapping
+		output to input, or into removed characters when mapping input to
+		output) are mapped to the start of the following run.
+
+		Arguments:
+			offsets (array): The run offsets on the side being mapped from.
+			targets (array): The run offsets on the side being mapped to.
+			lengths (array): The run lengths.
+			offset (int): The offset to map.
+
+		Returns:
+			The mapped offset.
+		"""
+
+		run = bisect.bisect_right(offsets, offset) - 1
+
+		if run >= 0 and offset < offsets[run] + lengths[run]:
+			return targets[run] + offset - offsets[run]
+
+		if run + 1 < len(offsets):
+			return targets[run + 1]
+
+		if run >= 0:
+			return targets[run] + lengths[run]
+
+		return 0
+
+	def original(self, offset):
+		"""
+		Maps an offset in the beautified string to the original string.
+
+		Arguments:
+			offset (int): The offset in the beautified string.
+
+		Returns:
+			The offset of the corresponding character in the original string.
+		"""
+
+		return self.lookup(self.output, self.input, self.length, offset)
+
+	def rendered(self, index):
+		"""
+		Maps an offset in the original string to the beautified string.
+
+		Arguments:
+			index (int): The offset in the original string.
+
+		Returns:
+			The offset of the corresponding character in the beautified string.
+		"""
+
+		return self.lookup(self.input, self.output, self.length, index)
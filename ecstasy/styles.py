@@ -0,0 +1,240 @@
+"""
+Normalization of style arguments into positional, 'always' and named styles.
+"""
+
+import re
+
+try:
+	from collections.abc import Iterable
+except ImportError:
+	# Python 2
+	from collections import Iterable
+
+try:
+	from types import MappingProxyType
+except ImportError:
+	# Python 2 has no read-only dictionary views
+	MappingProxyType = dict
+
+import ecstasy.flags as flags
+import ecstasy.errors as errors
+
+# The key of a named style, i.e. its name in parantheses (as in "<(name)x>")
+NAME = re.compile(r"^\(\s*([A-Za-z_]\w*)\s*\)$")
+
+def flatten(args, always):
+	"""
+	Checks and retrieves positional and 'always' (keyword) flags from
+	the many ways in which they may be passed (see Parser.get_flags()).
+
+	Arguments:
+		args (iterable): The positional arguments.
+		always (dict): The dictionary to add 'always' arguments to.
+
+	Returns:
+		The list of positional arguments.
+
+	Raises:
+		errors.FlagError: If an invalid (out-of-range)
+						  flag combination was passed.
+
+		errors.EcstasyError: If one of the arguments is of invalid type.
+	"""
+
+	positional = []
+
+	for argument in args:
+		# A flag is an instance of a subclass of
+		# flags.Flags if it was passed alone
+		if isinstance(argument, flags.Flags):
+			positional.append(argument)
+
+		# or is an integer if it was (bitwise) OR'd
+		# with another flag (a "flag combination")
+		elif isinstance(argument, int):
+			check(argument)
+			positional.append(argument)
+
+		# Already normalized (and validated) styles
+		elif isinstance(argument, StyleSet):
+			positional += argument.positional
+			always.update(argument.always)
+			always.update(("({0})".format(name), style)
+						  for name, style in argument.names.items())
+
+		# Dictionaries store 'always'-arguments
+		elif isinstance(argument, dict):
+			for key, value in argument.items():
+				# Simple 'always'-argument where one string
+				# is mapped to one formatting flag-combination
+				if isinstance(key, str):
+					always[key] = value
+
+				# Complex 'always'-argument with a
+				# tuple containing strings, each with the same
+				# flag-combination (same value)
+				elif isinstance(key, tuple):
+					for i in key:
+						always[i] = value
+				else:
+					raise errors.EcstasyError("Key '{0}' in dictionary "
+											  "argument passed is neither "
+											  "a string nor a tuple "
+											  "of strings!".format(key))
+
+		# Strings are iterable too, but (endlessly) of strings
+		elif isinstance(argument, Iterable) and not isinstance(argument, str):
+			positional += flatten(argument, always)
+
+		else:
+			raise errors.EcstasyError("Argument '{0}' is neither a flag, a "
+									  "(bitwise) OR'd flag-combination, a "
+									  "dictionary nor an  iterable of "
+									  "positional arguments "
+									  "!".format(argument))
+
+	return positional
+
+def split(always):
+	"""
+	Separates the named styles from the 'always' styles.
+
+	Named styles are passed like 'always' styles, but with their name in
+	parantheses as key (e.g. {"(error)": flags.Color.Red} for the phrase
+	"<(error)text>"). They are kept apart so that they apply only to
+	phrases naming them, and never to phrases whose text is the name.
+
+	Arguments:
+		always (dict): The 'always' styles, including named styles.
+
+	Returns:
+		The 'always' styles without the named styles (the same dictionary
+		if there are none) and a dictionary of the named styles, by name.
+	"""
+
+	names = {}
+
+	if not always:
+		return always, names
+
+	for key, style in always.items():
+		if isinstance(key, str) and key.startswith("("):
+			match = NAME.match(key)
+			if match:
+				names[match.group(1)] = style
+
+	if names:
+		always = dict((key, style) for key, style in always.items()
+					  if not (isinstance(key, str) and NAME.match(key)))
+
+	return always, names
+
+def check(style):
+	"""
+	Checks that a style is a flag or an in-range flag-combination.
+
+	Arguments:
+		style: The style to check.
+
+	Raises:
+		errors.FlagError: If the style is an out-of-range combination.
+
+		errors.EcstasyError: If the style is neither a flag nor an integer.
+	"""
+
+	if isinstance(style, flags.Flags):
+		return
+
+	if not isinstance(style, int):
+		raise errors.EcstasyError("Style '{0}' is neither a flag nor a "
+								  "(bitwise) OR'd flag-combination "
+								  "!".format(style))
+
+	if style < 0 or style >= flags.LIMIT:
+		raise errors.FlagError("Flag value '{0}' is out of range "
+							   "!".format(style))
+
+class StyleSet(object):
+	"""
+	An immutable, hashable set of positional, 'always' and named styles.
+
+	A StyleSet is built once from any of the argument forms accepted by
+	beautify() (flags, flag-combinations, nested iterables, dictionaries
+	with string or tuple keys and keyword arguments), flattened and fully
+	validated (including the 'always' styles). Styles are stored as
+	integer flag-combinations, so equal styles compare (and hash) equal
+	however they were written. A StyleSet can be passed to Parser,
+	beautify() or anywhere else styles are accepted, where it is used
+	as it is instead of being flattened again, and it can serve as a
+	dictionary key (e.g. for caching parsers or rendered strings).
+
+	Attributes:
+		positional (tuple): The positional styles.
+		always (mapping): A read-only view of the 'always' styles.
+		names (mapping): A read-only view of the named styles, by name
+						 (see split()).
+	"""
+
+	__slots__ = ("positional", "always", "names", "items", "hash")
+
+	def __init__(self, *args, **kwargs):
+		"""
+		Initializes a StyleSet instance.
+
+		Arguments:
+			args (list): The positional styles, in any form accepted by
+						 beautify().
+			kwargs (dict): The 'always' (and named) styles.
+
+		Raises:
+			errors.FlagError: If a style is out of range.
+
+			errors.EcstasyError: If a style is of invalid type.
+		"""
+
+		always = dict(kwargs)
+
+		positional = tuple(int(i) for i in flatten(args, always))
+
+		for style in always.values():
+			check(style)
+
+		always = dict((key, int(style)) for key, style in always.items())
+
+		# Including named styles, under their keys
+		items = frozenset(always.items())
+
+		always, names = split(always)
+
+		assign = super(StyleSet, self).__setattr__
+
+		assign("positional", positional)
+		assign("always", MappingProxyType(always))
+		assign("names", MappingProxyType(names))
+		assign("items", items)
+		assign("hash", hash((positional, items)))
+
+	def __setattr__(self, name, value):
+		raise AttributeError("StyleSet objects are immutable")
+
+	def __delattr__(self, name):
+		raise AttributeError("StyleSet objects are immutable")
+
+	def __eq__(self, other):
+		if not isinstance(other, StyleSet):
+			return NotImplemented
+
+		return (self.hash == other.hash 				and
+				self.positional == other.positional 	and
+				self.items == other.items)
+
+	def __ne__(self, other):
+		equal = self.__eq__(other)
+		return equal if equal is NotImplemented else not equal
+
+	def __hash__(self):
+		return self.hash
+
+	def __repr__(self):
+		return "StyleSet({0}, {1})".format(list(self.positional),
+										   dict(self.items))
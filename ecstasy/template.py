@@ -0,0 +1,637 @@
+"""
+Templates compiled into specialized render functions.
+"""
+
+import string
+import collections
+
+from array import array
+
+try:
+	from collections.abc import Sequence
+except ImportError:
+	# Python 2
+	from collections import Sequence
+
+import ecstasy.parser
+import ecstasy.styles
+import ecstasy.terminal
+
+# Splits text into literal text and replacement fields (see Template.rows())
+FORMATTER = string.Formatter()
+
+# The functions of the conversions of replacement fields
+CONVERSIONS = {"r": "repr", "s": "str", "a": "ascii"}
+
+class Template(object):
+	"""
+	A string parsed once and compiled into Python code for rendering.
+
+	For a given string, which phrases take which positional arguments (by
+	the counter, override and increment specifications or explicit indices)
+	and which take 'always' arguments is known after parsing, except for
+	which 'always' arguments there are. A Template therefore generates,
+	once for every set of 'always' keys it is rendered with, a function
+	that looks up exactly the styles it needs, codifies them (through the
+	parser's cache of escape-codes) and joins them with the constant
+	pieces of text in a single str.join(). The counter, the phrase tree
+	and the resolution logic of Parser.resolve() are thus gone at render
+	time.
+
+	Errors (out-of-range positional arguments or missing named styles) are
+	reported by rendering the string with Parser.render() instead, so they
+	are the same as for Parser.beautify(), positions included.
+
+	Attributes:
+		string (str): The escaped string (as returned by Parser.parse()).
+		phrases (list): The phrases of the string.
+		source (source.Source): The source of the parse.
+		keys (set): The phrase strings that 'always' arguments may apply to.
+		functions (dict): The generated render functions, by the tuple of
+						  (sorted) 'always' keys they were generated for.
+		bulk (dict): The generated functions rendering rows (and the
+					 names of their replacement fields), by color setting
+					 and 'always' keys.
+	"""
+
+	def __init__(self, string, parser=None):
+		"""
+		Initializes a Template instance.
+
+		Arguments:
+			string (str): The string to parse.
+			parser (Parser): The parser to parse the string with (e.g. for
+							 its diagnostics and limits).
+
+		Raises:
+			errors.ParseError: If the string is ill-formed.
+		"""
+
+		if parser is None:
+			parser = ecstasy.parser.Parser(None, {})
+
+		self.string, self.phrases = parser.parse(string)
+
+		self.source = parser.source
+
+		self.keys = set()
+
+		stack = list(self.phrases)
+
+		while stack:
+			phrase = stack.pop()
+			if phrase.name is None:
+				self.keys.add(phrase.string)
+			stack.extend(phrase.nested)
+
+		self.functions = {}
+
+		self.bulk = {}
+
+	def render(self, beautifier):
+		"""
+		Renders the template with the styles of a parser.
+
+		Arguments:
+			beautifier (Parser): The parser whose styles, escape-codes and
+								 color setting to use.
+
+		Returns:
+			The beautified string, as returned by beautifier.render().
+
+		Raises:
+			errors.ArgumentError: If the styles don't suffice for the
+								  template (see Parser.render()).
+		"""
+
+		if not self.phrases:
+			return self.string
+
+		if not beautifier.color:
+			# Resolves the styles all the same
+			return beautifier.render(self.string, self.phrases, self.source)
+
+		always = beautifier.always or {}
+
+		key = tuple(sorted(k for k in self.keys if k in always))
+
+		function = self.functions.get(key)
+
+		if function is None:
+			function = self.functions[key] = self.compile(key)
+
+		try:
+			return function(beautifier.positional,
+							always,
+							beautifier.names,
+							beautifier.code)
+		except (IndexError, KeyError):
+			# Let the parser raise the error, with its position
+			return beautifier.render(self.string, self.phrases, self.source)
+
+	def beautify(self, *args, **kwargs):
+		"""
+		Same as the package-level beautify(), for the template's string.
+
+		Arguments:
+			args (list): The positional arguments.
+			kwargs (dict): The keyword ('always') arguments.
+
+		Returns:
+			The beautified string.
+		"""
+
+		color = ecstasy.terminal.capabilities().color
+
+		return self.render(ecstasy.parser.Parser(args, kwargs, color=color))
+
+	def compile(self, always):
+		"""
+		Generates the render function for a set of 'always' keys.
+
+		Arguments:
+			always (iterable): The 'always' keys (of self.keys) in effect.
+
+		Returns:
+			A function of the positional arguments, the 'always' arguments,
+			the named styles and a function codifying flag-combinations
+			(Parser.code()).
+		"""
+
+		generator = Generator(set(always))
+
+		pieces = generator.generate(self.string,
+									 self.phrases,
+									 repr("\033[0;m"))
+
+		lines = ["def render(positional, always, names, code):"]
+		lines += ["\t" + line for line in generator.lines]
+		lines.append("\treturn ''.join(({0},))".format(", ".join(pieces)))
+
+		namespace = {}
+
+		exec(compile("\n".join(lines), "<ecstasy template>", "exec"), namespace)
+
+		return namespace["render"]
+
+	def rows(self,
+			 positional=(),
+			 always=None,
+			 values=None,
+			 parser=None,
+			 output=None,
+			 end=""):
+		"""
+		Renders the template once for every row of columns of styles and values.
+
+		Every positional argument, 'always' argument and value is either a
+		column, i.e. a sequence (a list, tuple or array) holding one style or
+		value per row, or a single style or value shared by all rows. Values
+		are substituted for replacement fields in the text of the template
+		("{name}" or "{name!r:^8}", as for str.format(), with "{{" and "}}"
+		standing for braces, and meta-characters escaped as anywhere else),
+		as plain text (i.e. not parsed for phrases, so they need no
+		escaping). All rows are rendered by one generated
+		function (see self.compile()), which looks the styles and values up
+		in the columns and codifies the styles through the parser's cache
+		of escape-codes, so that rendering a row allocates little more than
+		the row itself.
+
+		Arguments:
+			positional (list): The positional arguments (or columns).
+			always (dict): The 'always' arguments (or columns), by key,
+						   including named styles (see styles.split()).
+			values (dict): The values (or columns) of the replacement fields,
+						   by name.
+			parser (Parser): A parser whose escape-codes (cache) and color
+							 setting to use (a new one, with the color
+							 setting of the output, by default).
+			output: A stream to write the rows to (else they are returned).
+			end (str): A string to append to every row (e.g. "\\n").
+
+		Returns:
+			The list of rendered rows, or None if they were written to the
+			output.
+
+		Raises:
+			ValueError: If the columns differ in length or there are none,
+						or a replacement field is malformed.
+
+			KeyError: If there is no value for a replacement field.
+
+			errors.ArgumentError: If the styles don't suffice for the
+								  template (see Parser.render()).
+		"""
+
+		if parser is None:
+			color = ecstasy.terminal.capabilities(output).color
+			parser = ecstasy.parser.Parser(None, {}, color=color)
+
+		always = always or {}
+		values = values or {}
+
+		columns = [c for c in positional if column(c)]
+		columns += [c for c in always.values() if column(c)]
+		columns += [c for c in values.values() if column(c)]
+
+		lengths = set(len(c) for c in columns)
+
+		if len(lengths) != 1:
+			raise ValueError("Rows need columns of the same length "
+							 "(found {0})".format(sorted(lengths)))
+
+		n = lengths.pop()
+
+		positional = [c if column(c) else [c] * n for c in positional]
+		always = dict((k, c if column(c) else [c] * n)
+					  for k, c in always.items())
+		values = dict((k, c if column(c) else [c] * n)
+					  for k, c in values.items())
+
+		styles, names = ecstasy.styles.split(always)
+
+		key = (parser.color, tuple(sorted(k for k in self.keys if k in styles)))
+
+		compiled = self.bulk.get(key)
+
+		if compiled is None:
+			compiled = self.bulk[key] = self.tabulate(*key)
+
+		function, fields = compiled
+
+		for field in sorted(fields):
+			if field not in values:
+				raise KeyError(field)
+
+		if n and self.phrases and not parser.color:
+			# Without escape-codes, the function looks up no styles, so
+			# resolve those of the first row (all rows have as many)
+			self.render(self.first(positional, always, color=False))
+
+		result = []
+
+		emit = result.append if output is None else output.write
+
+		try:
+			function(positional, styles, names, values, parser.code, n, emit, end)
+		except (IndexError, KeyError):
+			if not n:
+				raise
+
+			# Let the parser raise the error for the first row
+			self.render(self.first(positional, always))
+
+			raise
+
+		return result if output is None else None
+
+	def first(self, positional, always, color=True):
+		"""
+		Arguments:
+			positional (list): The columns of positional arguments.
+			always (dict): The columns of 'always' arguments (and named
+						   styles), by key.
+			color (bool): Whether the parser renders escape-codes.
+
+		Returns:
+			A parser with the styles of the first row (see self.rows()).
+		"""
+
+		return ecstasy.parser.Parser([c[0] for c in positional],
+									 dict((k, c[0]) for k, c in always.items()),
+									 color=color)
+
+	def tabulate(self, color, always):
+		"""
+		Generates the function rendering rows (see self.rows()).
+
+		Arguments:
+			color (bool): Whether to render escape-codes.
+			always (iterable): The 'always' keys (of self.keys) in effect.
+
+		Returns:
+			The function and the set of the names of all replacement fields.
+		"""
+
+		generator = Columns(set(always), color)
+
+		pieces = generator.generate(self.string,
+									 self.phrases,
+									 repr("\033[0;m") if color else None)
+
+		pieces.append("end")
+
+		lines = ["def rows(positional, always, names, values, code, n, emit, end):"]
+
+		lines += ["\t{0} = {1}".format(name, expression)
+				  for expression, name in generator.bindings.items()]
+
+		lines.append("\tfor r in range(n):")
+		lines += ["\t\t" + line for line in generator.lines]
+		lines.append("\t\temit(''.join(({0},)))".format(", ".join(pieces)))
+
+		namespace = {}
+
+		exec(compile("\n".join(lines), "<ecstasy template>", "exec"), namespace)
+
+		return namespace["rows"], generator.fields
+
+def column(argument):
+	"""
+	Arguments:
+		argument: A style or value passed to Template.rows().
+
+	Returns:
+		True if the argument is a column (a sequence, such as a list, tuple
+		or array, other than a string).
+	"""
+
+	return (isinstance(argument, (Sequence, array)) and
+			not isinstance(argument, (str, bytes)))
+
+def interpolate(text, field):
+	"""
+	Generates the pieces of text with replacement fields, for generators
+	substituting values (as str.format() does) in their literal() method.
+
+	Arguments:
+		text (str): Constant text of the string.
+		field (function): Generates the expression of the formatted value
+						  of a replacement field from its name, conversion
+						  ("r", "s", "a" or None) and format specification.
+
+	Returns:
+		A list of expressions, whose values joined form the text with
+		every replacement field replaced.
+
+	Raises:
+		ValueError: If a replacement field is malformed.
+	"""
+
+	pieces = []
+
+	for literal, name, spec, conversion in FORMATTER.parse(text):
+		if literal:
+			pieces.append(repr(literal))
+
+		if name is not None:
+			pieces.append(field(name, conversion, spec or ""))
+
+	return pieces
+
+class Generator(object):
+	"""
+	Generates the body of a render function (see Template.compile()).
+
+	Phrases are visited in the same order as by Parser.stringify(), and
+	the positional counter is followed as in Parser.resolve(), such that
+	every phrase is assigned the same arguments. How styles and text are
+	looked up is left to self.positional(), self.named(), self.name() and
+	self.literal(), which subclasses may generate differently.
+
+	Attributes:
+		always (set): The 'always' keys in effect.
+		color (bool): Whether to generate escape-codes.
+		counter (int): The positional counter.
+		lines (list): The statements of the function, which compute the
+					  escape-codes of all phrases.
+	"""
+
+	def __init__(self, always, color=True):
+		"""
+		Initializes a Generator instance.
+
+		Arguments:
+			always (set): The 'always' keys in effect.
+			color (bool): Whether to generate escape-codes (else only the
+						  text is generated).
+		"""
+
+		self.always = always
+		self.color = color
+		self.counter = 0
+		self.lines = []
+
+	def generate(self, string, phrases, reset):
+		"""
+		Generates the pieces of the output of a scope.
+
+		Arguments:
+			string (str): The escaped string (of the scope).
+			phrases (list): The phrases in the string.
+			reset (str): The expression of the escape-code that restores
+						 the style of the scope after a phrase.
+
+		Returns:
+			A list of expressions, whose values joined form the output.
+		"""
+
+		pieces = []
+		constant = []
+
+		last_tag = 0
+
+		for phrase in phrases:
+			constant.append(string[last_tag : phrase.opening])
+
+			if self.color:
+				n = len(self.lines)
+
+				self.lines.append("c{0} = code({1})".format(n,
+															self.style(phrase)))
+
+				pieces += self.literal("".join(constant))
+				constant = []
+
+				pieces += ["'\\033['", "c{0}".format(n), "'m'"]
+
+			if phrase.nested:
+				pieces += self.literal("".join(constant))
+				constant = []
+
+				pieces += self.generate(phrase.string,
+										phrase.nested,
+										"'\\033[0;' + c{0} + 'm'".format(n)
+										if self.color else None)
+			else:
+				constant.append(phrase.string)
+
+			if self.color:
+				pieces += self.literal("".join(constant))
+				constant = []
+
+				pieces.append(reset)
+
+			last_tag = phrase.closing + 1
+
+		constant.append(string[last_tag:])
+
+		return pieces + self.literal("".join(constant))
+
+	def style(self, phrase):
+		"""
+		Generates the expression of a phrase's style (see Parser.resolve()).
+
+		Arguments:
+			phrase (Phrase): The phrase.
+
+		Returns:
+			The expression, in terms of self.positional(), self.named() and
+			self.name().
+		"""
+
+		terms = []
+
+		if phrase.style:
+			terms.append(str(int(phrase.style)))
+
+		if phrase.name is not None:
+			terms.append(self.name(phrase.name))
+
+			return " | ".join(terms)
+
+		always = phrase.string in self.always
+
+		if always and not phrase.override:
+			terms = [self.named(phrase.string)]
+
+		if phrase.arguments:
+			terms += [self.positional(i) for i in phrase.arguments]
+
+		elif not always or phrase.increment or phrase.override:
+			terms.append(self.positional(self.counter))
+
+			if phrase.increment or not phrase.override:
+				self.counter += 1
+
+		return " | ".join(terms) if terms else "0"
+
+	def positional(self, index):
+		"""
+		Arguments:
+			index (int): The index of a positional argument.
+
+		Returns:
+			The expression of the positional argument.
+		"""
+
+		return "positional[{0}]".format(index)
+
+	def named(self, key):
+		"""
+		Arguments:
+			key (str): The key of an 'always' argument.
+
+		Returns:
+			The expression of the 'always' argument.
+		"""
+
+		return "always[{0!r}]".format(key)
+
+	def name(self, name):
+		"""
+		Arguments:
+			name (str): The name of a named style.
+
+		Returns:
+			The expression of the named style.
+		"""
+
+		return "names[{0!r}]".format(name)
+
+	def literal(self, text):
+		"""
+		Arguments:
+			text (str): Constant text of the string.
+
+		Returns:
+			A list of expressions, whose values joined form the text.
+		"""
+
+		return [repr(text)] if text else []
+
+class Columns(Generator):
+	"""
+	Generates the body of a function rendering rows (see Template.rows()).
+
+	Styles and values are looked up in the current row (r) of columns,
+	which are bound to local variables before the loop over the rows.
+	Replacement fields in the text are formatted with their values, like
+	str.format() (but without attribute or index lookups).
+
+	Attributes:
+		bindings (dict): The local variable of each bound column, by the
+						 expression of the column.
+		fields (set): The names of all replacement fields.
+	"""
+
+	def __init__(self, always, color=True):
+		"""
+		Initializes a Columns instance.
+
+		Arguments:
+			always (set): The 'always' keys (with columns) in effect.
+			color (bool): Whether to generate escape-codes.
+		"""
+
+		super(Columns, self).__init__(always, color)
+
+		self.bindings = collections.OrderedDict()
+
+		self.fields = set()
+
+	def bind(self, expression):
+		"""
+		Arguments:
+			expression (str): The expression of a column.
+
+		Returns:
+			The expression of the column's value in the current row.
+		"""
+
+		name = self.bindings.get(expression)
+
+		if name is None:
+			name = self.bindings[expression] = "k{0}".format(len(self.bindings))
+
+		return "{0}[r]".format(name)
+
+	def positional(self, index):
+		return self.bind("positional[{0}]".format(index))
+
+	def named(self, key):
+		return self.bind("always[{0!r}]".format(key))
+
+	def name(self, name):
+		return self.bind("names[{0!r}]".format(name))
+
+	def literal(self, text):
+		return interpolate(text, self.field)
+
+	def field(self, name, conversion, spec):
+		"""
+		Arguments:
+			name (str): The name of a replacement field.
+			conversion (str): The conversion of the field ("r", "s", "a"),
+							  if any.
+			spec (str): The format specification of the field.
+
+		Returns:
+			The expression of the formatted value of the field.
+
+		Raises:
+			ValueError: If the field is not named.
+		"""
+
+		if not name:
+			raise ValueError("Replacement fields of templates "
+							 "must be named")
+
+		self.fields.add(name)
+
+		value = self.bind("values[{0!r}]".format(name))
+
+		if conversion:
+			value = "{0}({1})".format(CONVERSIONS[conversion], value)
+
+		return "format({0}, {1!r})".format(value, spec)
@@ -0,0 +1,136 @@
+"""
+Detection of terminal capabilities (whether and how to render color).
+"""
+
+import os
+import sys
+import weakref
+import collections
+
+# Color depths (in bits) as reported by Capabilities.depth
+NONE = 0
+BASIC = 4
+EXTENDED = 8
+TRUECOLOR = 24
+
+# Capabilities of streams with file descriptors, by stream (descriptors
+# are reused once closed, and entries go away with their streams)
+CACHE = weakref.WeakKeyDictionary()
+
+class Capabilities(collections.namedtuple("Capabilities", "tty, depth")):
+	"""
+	The capabilities of an output stream.
+
+	Attributes:
+		tty (bool): Whether the stream is connected to a terminal.
+		depth (int): The supported color depth: NONE (no color),
+					 BASIC (16 colors), EXTENDED (256 colors)
+					 or TRUECOLOR (24 bit).
+	"""
+
+	__slots__ = ()
+
+	@property
+	def color(self):
+		"""
+		Returns:
+			Whether escape-codes should be rendered at all.
+		"""
+
+		return self.depth > NONE
+
+def probe(stream=None, environ=None):
+	"""
+	Determines the capabilities of a stream (without any caching).
+
+	The FORCE_COLOR environment variable takes precedence over everything
+	else ("0" or "false" disable color, "1", "2" and "3" force BASIC,
+	EXTENDED and TRUECOLOR respectively, any other value forces BASIC).
+	Otherwise, color is disabled if NO_COLOR is set (to anything but the
+	empty string), if the stream is not a TTY or if TERM is "dumb".
+	Lastly, the depth is determined by COLORTERM and TERM.
+
+	Arguments:
+		stream: The stream to probe (defaults to sys.stdout).
+		environ (dict): The environment (defaults to os.environ).
+
+	Returns:
+		A Capabilities instance.
+	"""
+
+	stream = sys.stdout if stream is None else stream
+	environ = os.environ if environ is None else environ
+
+	try:
+		tty = bool(stream.isatty())
+	except (AttributeError, ValueError):
+		tty = False
+
+	force = environ.get("FORCE_COLOR")
+
+	if force is not None:
+		force = force.strip().lower()
+
+		if force in ("0", "false"):
+			return Capabilities(tty, NONE)
+
+		depths = {"2": EXTENDED, "3": TRUECOLOR}
+
+		return Capabilities(tty, depths.get(force, BASIC))
+
+	if environ.get("NO_COLOR") or not tty:
+		return Capabilities(tty, NONE)
+
+	term = environ.get("TERM", "")
+
+	if term == "dumb":
+		return Capabilities(tty, NONE)
+
+	if environ.get("COLORTERM", "").lower() in ("truecolor", "24bit"):
+		return Capabilities(tty, TRUECOLOR)
+
+	if term.endswith("256color"):
+		return Capabilities(tty, EXTENDED)
+
+	return Capabilities(tty, BASIC)
+
+def capabilities(stream=None):
+	"""
+	Determines the capabilities of a stream, once per process.
+
+	The capabilities of streams backed by a file descriptor are cached by
+	stream, so that repeated calls cost neither an isatty() system call
+	nor environment lookups. Other streams (e.g. io.StringIO), as well as
+	streams that cannot be referenced weakly, are probed every time.
+
+	Arguments:
+		stream: The stream to probe (defaults to sys.stdout).
+
+	Returns:
+		A Capabilities instance.
+	"""
+
+	stream = sys.stdout if stream is None else stream
+
+	try:
+		stream.fileno()
+	except (AttributeError, ValueError, IOError, OSError):
+		return probe(stream)
+
+	try:
+		cached = CACHE.get(stream)
+	except TypeError:
+		# Not weakly referenceable (or hashable)
+		return probe(stream)
+
+	if cached is None:
+		cached = CACHE[stream] = probe(stream)
+
+	return cached
+
+def reset():
+	"""
+	Clears the cache, e.g. after changing the environment or redirecting.
+	"""
+
+	CACHE.clear()
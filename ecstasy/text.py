@@ -0,0 +1,835 @@
+"""
+Styled text as plain text plus runs of effective styles.
+"""
+
+import re
+import bisect
+
+import ecstasy.live as live
+import ecstasy.errors as errors
+import ecstasy.parser as parser
+import ecstasy.terminal as terminal
+
+# Matches the words (between whitespace) of a line (see StyledText.wrap())
+WORDS = re.compile(r"\S+")
+
+def wrap(text, width, *args, **kwargs):
+	"""
+	Wraps styled text to lines of at most a given width.
+
+	Arguments:
+		text: A StyledText, or a string to parse (see StyledText.parse()).
+		width (int): The maximum width of a line, in characters.
+		args (list): The positional arguments (for a string).
+		kwargs (dict): The keyword ('always') arguments (for a string).
+
+	Returns:
+		The list of lines, each beautified by itself (escape-codes are
+		rendered according to terminal.capabilities()).
+
+	Raises:
+		ValueError: If the width is not positive.
+	"""
+
+	if not isinstance(text, StyledText):
+		text = StyledText.parse(text, *args, **kwargs)
+
+	color = terminal.capabilities().color
+
+	return [line.render(color) for line in text.wrap(width)]
+
+def truncate(text, width, ellipsis=""):
+	"""
+	Cuts styled text to at most a given width, closing all open styles.
+
+	Beautified strings are scanned only up to the cut (plus one character,
+	to tell whether there is more), so the cost does not depend on the
+	length of what is cut off. Escape-codes count zero columns and every
+	other character one (as in live.cells()).
+
+	Arguments:
+		text: A StyledText, or a beautified string.
+		width (int): The maximum width (in characters).
+		ellipsis (str): Text to end truncated text with (within the width),
+						in the style in effect at the cut.
+
+	Returns:
+		The truncated text (of the same type), ending with a reset if any
+		style is open at the cut.
+
+	Raises:
+		ValueError: If the width is negative.
+	"""
+
+	if isinstance(text, StyledText):
+		return text.truncate(width, ellipsis)
+
+	if width < 0:
+		raise ValueError("Invalid width {0!r} (must be >= 0)".format(width))
+
+	keep = max(width - len(ellipsis), 0)
+
+	# The number of visible characters before the current code
+	count = 0
+
+	# The index of the cut, and whether any style is in effect there
+	cut = None
+	styled = False
+
+	last = 0
+
+	for code in live.CODE.finditer(text):
+		visible = code.start() - last
+
+		if cut is None and count + visible >= keep:
+			cut = (last + keep - count, styled)
+
+		count += visible
+
+		if count > width:
+			break
+
+		codes = code.group(1)
+
+		prefix = live.RESET + ";"
+
+		if not codes or codes == live.RESET or codes.startswith(prefix):
+			styled = bool(codes[len(prefix):])
+		else:
+			styled = True
+
+		last = code.end()
+	else:
+		visible = len(text) - last
+
+		if count + visible <= width:
+			return text
+
+		if cut is None:
+			cut = (last + keep - count, styled)
+
+	index, styled = cut
+
+	reset = "\033[0m" if styled else ""
+
+	return text[:index] + ellipsis[:width] + reset
+
+def pad(text, width, align="<", fill=" "):
+	"""
+	Pads styled text to at least a given width with (unstyled) fill.
+
+	Arguments:
+		text: A StyledText, or a beautified string.
+		width (int): The minimum width (in characters, not counting
+					 escape-codes).
+		align (str): Where to align the text, as in format specifications:
+					 "<" (left), ">" (right) or "^" (centered).
+		fill (str): The character to pad with.
+
+	Returns:
+		The padded text (of the same type).
+
+	Raises:
+		ValueError: If the alignment is invalid.
+	"""
+
+	if isinstance(text, StyledText):
+		return text.pad(width, align, fill)
+
+	codes = sum(len(code.group()) for code in live.CODE.finditer(text))
+
+	left, right = padding(len(text) - codes, width, align)
+
+	return fill * left + text + fill * right
+
+def padding(length, width, align):
+	"""
+	Arguments:
+		length (int): The width of the text.
+		width (int): The width to pad to.
+		align (str): The alignment ("<", ">" or "^").
+
+	Returns:
+		The amount of fill before and after the text.
+
+	Raises:
+		ValueError: If the alignment is invalid.
+	"""
+
+	missing = max(width - length, 0)
+
+	if align == "<":
+		return 0, missing
+	elif align == ">":
+		return missing, 0
+	elif align == "^":
+		# Like format(), with any odd fill character on the right
+		return missing // 2, missing - missing // 2
+
+	raise ValueError("Invalid alignment {0!r} (must be one of "
+					 "'<', '>' or '^')".format(align))
+
+def truncate_markup(string, width, ellipsis, *args, **kwargs):
+	"""
+	Parses markup into a StyledText of at most a given width.
+
+	The string is parsed as a whole and the styles of all phrases are
+	resolved (so that missing styles raise regardless of the width), but
+	the phrases are only flattened up to the cut.
+
+	Arguments:
+		string (str): The string to parse.
+		width (int): The maximum width (in characters).
+		ellipsis (str): Text to end truncated text with (see truncate()).
+		args (list): The positional arguments.
+		kwargs (dict): The keyword ('always') arguments.
+
+	Returns:
+		A new StyledText.
+
+	Raises:
+		errors.ParseError: If the string is ill-formed.
+
+		errors.ArgumentError: If the styles don't suffice for the string.
+
+		ValueError: If the width is negative.
+	"""
+
+	if width < 0:
+		raise ValueError("Invalid width {0!r} (must be >= 0)".format(width))
+
+	beautifier = parser.Parser(args, kwargs)
+
+	escaped, phrases = beautifier.parse(string)
+
+	beautifier.validate(phrases)
+
+	# One more character tells whether the text was cut
+	styled = StyledText.flatten(beautifier,
+								escaped,
+								phrases,
+								beautifier.source,
+								limit=width + 1)
+
+	return styled.truncate(width, ellipsis)
+
+class StyledText(object):
+	"""
+	An immutable string with a style (escape-codes) for every character.
+
+	Beautified strings interleave text with escape-codes, so that they can
+	be neither sliced nor measured nor searched without parsing the codes
+	again. A StyledText instead keeps the plain text apart from its styles,
+	which are stored run-length encoded: the text is divided into runs of
+	characters with the same effective style, i.e. the styles the
+	escape-codes of Parser.stringify() put into effect in the terminal: a
+	nested phrase adds its style to the styles in effect where it opens,
+	and after it closes, the style is reset to its parent's own. Runs are
+	located by binary search, so slicing costs O(log n) in the number of
+	runs (plus the copy of the result). Concatenation and joining merge the
+	runs at the seams, and only render() produces escape-codes again.
+
+	Attributes:
+		text (str): The plain text.
+		starts (tuple): The index at which each run starts in the text.
+		codes (tuple): The escape-codes of each run ("" for plain text).
+	"""
+
+	__slots__ = ("text", "starts", "codes")
+
+	def __init__(self, text="", code=""):
+		"""
+		Initializes a StyledText instance of a single style.
+
+		Arguments:
+			text (str): The plain text.
+			code (str): The escape-codes of the text (as returned by
+						Parser.code()), if any.
+		"""
+
+		self.text = text
+		self.starts = (0,) if text else ()
+		self.codes = (code,) if text else ()
+
+	@classmethod
+	def runs(cls, text, starts, codes):
+		"""
+		Creates a StyledText from existing runs.
+
+		Arguments:
+			text (str): The plain text.
+			starts (iterable): The start of each run (the first must be 0,
+							   empty runs are not allowed).
+			codes (iterable): The escape-codes of each run (adjacent runs
+							  must differ).
+
+		Returns:
+			A new StyledText.
+		"""
+
+		styled = cls.__new__(cls)
+
+		styled.text = text
+		styled.starts = tuple(starts)
+		styled.codes = tuple(codes)
+
+		return styled
+
+	@classmethod
+	def parse(cls, string, *args, **kwargs):
+		"""
+		Parses markup into a StyledText (like the package-level beautify()).
+
+		Arguments:
+			string (str): The string to parse.
+			args (list): The positional arguments.
+			kwargs (dict): The keyword ('always') arguments.
+
+		Returns:
+			A new StyledText.
+		"""
+
+		beautifier = parser.Parser(args, kwargs)
+
+		escaped, phrases = beautifier.parse(string)
+
+		return cls.flatten(beautifier, escaped, phrases, beautifier.source)
+
+	@classmethod
+	def flatten(cls,
+				beautifier,
+				string,
+				phrases,
+				origin=None,
+				counter=0,
+				limit=None):
+		"""
+		Flattens the result of Parser.parse() into runs of effective styles.
+
+		Styles are resolved exactly as by Parser.render() (in the same
+		order, so positional arguments are assigned to the same phrases),
+		but no escape-codes are rendered.
+
+		Arguments:
+			beautifier (Parser): The parser that parsed the string.
+			string (str): The escaped string returned by Parser.parse().
+			phrases (list): The list of phrases returned by Parser.parse().
+			origin (source.Source): The source of the parse, if known, to
+									report error positions relative to the
+									original string.
+			counter (int): The value to start the positional counter at.
+			limit (int): The length at which to stop, if any (phrases after
+						 it are not resolved, so their errors are not raised).
+
+		Returns:
+			A new StyledText.
+
+		Raises:
+			errors.ArgumentError if phrases were found, but not a single style
+			(flag combination) was supplied.
+		"""
+
+		if not phrases:
+			return cls(string[:limit])
+
+		if not (beautifier.positional or beautifier.always or beautifier.names):
+			raise errors.ArgumentError("Found phrases, but no styles "
+									   "were supplied!")
+
+		beautifier.counter = counter
+		beautifier.source = origin
+		beautifier.offset = 0
+
+		builder = Builder(limit)
+
+		builder.flatten(beautifier, string, phrases, "", "")
+
+		return builder.styled(cls)
+
+	def __len__(self):
+		return len(self.text)
+
+	def __str__(self):
+		return self.render(terminal.capabilities().color)
+
+	def __repr__(self):
+		return "StyledText({0!r}, {1!r})".format(self.text,
+												 list(zip(self.starts,
+														  self.codes)))
+
+	def __eq__(self, other):
+		if not isinstance(other, StyledText):
+			return NotImplemented
+
+		return (self.text == other.text 		and
+				self.starts == other.starts 	and
+				self.codes == other.codes)
+
+	def __ne__(self, other):
+		equal = self.__eq__(other)
+		return equal if equal is NotImplemented else not equal
+
+	def __hash__(self):
+		return hash((self.text, self.starts, self.codes))
+
+	def __contains__(self, sub):
+		return sub in self.text
+
+	def __getitem__(self, index):
+		"""
+		Slices the text along with its styles.
+
+		Arguments:
+			index (int or slice): The index of a character or a slice
+								  (without a step).
+
+		Returns:
+			A new StyledText.
+
+		Raises:
+			ValueError: If the slice has a step other than 1.
+		"""
+
+		if isinstance(index, slice):
+			if index.step not in (None, 1):
+				raise ValueError("StyledText slices cannot have a step")
+			start, stop, _ = index.indices(len(self.text))
+		else:
+			if index < 0:
+				index += len(self.text)
+			if index < 0 or index >= len(self.text):
+				raise IndexError("StyledText index out of range")
+			start, stop = index, index + 1
+
+		if start >= stop:
+			return StyledText()
+
+		if start == 0 and stop == len(self.text):
+			return self
+
+		# The runs containing the first and the last character
+		first = bisect.bisect_right(self.starts, start) - 1
+		last = bisect.bisect_left(self.starts, stop)
+
+		starts = [start] + list(self.starts[first + 1 : last])
+
+		return StyledText.runs(self.text[start:stop],
+							   [i - start for i in starts],
+							   self.codes[first:last])
+
+	def __add__(self, other):
+		if isinstance(other, str):
+			other = StyledText(other)
+		elif not isinstance(other, StyledText):
+			return NotImplemented
+
+		builder = Builder()
+
+		builder.extend(self)
+		builder.extend(other)
+
+		return builder.styled(StyledText)
+
+	def __radd__(self, other):
+		if not isinstance(other, str):
+			return NotImplemented
+
+		return StyledText(other) + self
+
+	def join(self, fragments):
+		"""
+		Concatenates fragments with this text between each of them.
+
+		Like str.join(), this takes linear time in the total length of the
+		fragments (whereas repeated addition copies the result every time).
+
+		Arguments:
+			fragments (iterable): StyledText or (unstyled) str fragments.
+
+		Returns:
+			A new StyledText.
+		"""
+
+		builder = Builder()
+
+		for n, fragment in enumerate(fragments):
+			if n:
+				builder.extend(self)
+			if isinstance(fragment, str):
+				builder.add(fragment, "")
+			else:
+				builder.extend(fragment)
+
+		return builder.styled(StyledText)
+
+	def find(self, sub, start=None, end=None):
+		"""
+		Finds a substring in the (plain) text, like str.find().
+
+		Returns:
+			The lowest index of the substring, or -1.
+		"""
+
+		return self.text.find(sub, start, end)
+
+	def index(self, sub, start=None, end=None):
+		"""
+		Finds a substring in the (plain) text, like str.index().
+
+		Returns:
+			The lowest index of the substring.
+
+		Raises:
+			ValueError: If the substring is not found.
+		"""
+
+		return self.text.index(sub, start, end)
+
+	def code(self, index):
+		"""
+		Gets the effective style of a single character.
+
+		Arguments:
+			index (int): The index of the character.
+
+		Returns:
+			The escape-codes of the character ("" if it is plain).
+		"""
+
+		if index < 0:
+			index += len(self.text)
+
+		if index < 0 or index >= len(self.text):
+			raise IndexError("StyledText index out of range")
+
+		return self.codes[bisect.bisect_right(self.starts, index) - 1]
+
+	def wrap(self, width):
+		"""
+		Breaks the text into lines of at most a given width.
+
+		Lines are filled greedily with whole words (like textwrap.wrap()),
+		where whitespace between words on the same line is kept and
+		whitespace at line breaks is dropped. The indentation (leading
+		whitespace) of every line of the text is kept, as long as it fits
+		with the first word. Newlines in the text always
+		break lines, and words longer than the width are broken up. Every
+		character is one column wide (as in live.cells()). Since the lines
+		keep their styles, each line renders the styles in effect at its
+		start and resets them at its end, so nested styles continue across
+		lines without escape-codes being split. The text is scanned once,
+		taking linear time.
+
+		Arguments:
+			width (int): The maximum width of a line.
+
+		Returns:
+			A list of StyledText lines.
+
+		Raises:
+			ValueError: If the width is not positive.
+		"""
+
+		if width < 1:
+			raise ValueError("Invalid width {0!r} (must be > 0)".format(width))
+
+		text = self.text
+
+		spans = []
+
+		end = -1
+
+		# Like str.splitlines(), a final newline ends the last line
+		while end + 1 < len(text):
+			start = end + 1
+
+			end = text.find("\n", start)
+
+			if end == -1:
+				end = len(text)
+
+			# The span of the current line, if any words are on it yet
+			first = last = None
+
+			# The indentation of the line, kept with its first word (as
+			# by textwrap) if both fit or the word is broken up anyway
+			indent = start
+
+			for word in WORDS.finditer(text, start, end):
+				left, right = word.span()
+
+				if indent is not None:
+					if (right - indent <= width or
+						right - left > width and left - indent < width):
+						left = indent
+					indent = None
+
+				if first is not None and right - first <= width:
+					last = right
+					continue
+
+				if first is not None:
+					# A long word starts in the rest of the line
+					if right - left > width and left - first < width:
+						last = left + width - (left - first)
+						left = last
+
+					spans.append((first, last))
+
+				while right - left > width:
+					spans.append((left, left + width))
+					left += width
+
+				first, last = left, right
+
+			if first is None:
+				spans.append((start, start))
+			else:
+				spans.append((first, last))
+
+		return [self[first:last] for first, last in spans]
+
+	def truncate(self, width, ellipsis=""):
+		"""
+		Cuts the text to at most a given width.
+
+		Arguments:
+			width (int): The maximum width (in characters).
+			ellipsis (str): Text to end truncated text with (within the
+							width), in the style of the last character kept.
+
+		Returns:
+			The truncated text (or the text itself if it fits).
+
+		Raises:
+			ValueError: If the width is negative.
+		"""
+
+		if width < 0:
+			raise ValueError("Invalid width {0!r} (must be >= 0)".format(width))
+
+		if len(self.text) <= width:
+			return self
+
+		keep = max(width - len(ellipsis), 0)
+
+		code = self.code(keep - 1 if keep else 0)
+
+		return self[:keep] + StyledText(ellipsis[:width], code)
+
+	def pad(self, width, align="<", fill=" "):
+		"""
+		Pads the text to at least a given width with (unstyled) fill.
+
+		Arguments:
+			width (int): The minimum width (in characters).
+			align (str): Where to align the text, as in format
+						 specifications: "<" (left), ">" (right) or
+						 "^" (centered).
+			fill (str): The character to pad with.
+
+		Returns:
+			The padded text (or the text itself if it is wide enough).
+
+		Raises:
+			ValueError: If the alignment is invalid.
+		"""
+
+		left, right = padding(len(self.text), width, align)
+
+		if not left and not right:
+			return self
+
+		builder = Builder()
+
+		builder.add(fill * left, "")
+		builder.extend(self)
+		builder.add(fill * right, "")
+
+		return builder.styled(StyledText)
+
+	def pieces(self):
+		"""
+		Returns:
+			A list of (escape-codes, text) pairs, one per run.
+		"""
+
+		ends = self.starts[1:] + (len(self.text),)
+
+		return [(code, self.text[start:end])
+				for start, end, code in zip(self.starts, ends, self.codes)]
+
+	def render(self, color=True):
+		"""
+		Renders the text with escape-codes, as Parser.beautify() would.
+
+		Every change of style resets the previous style (the output thus
+		differs from that of Parser.beautify() in its escape-codes, but not
+		in how it looks).
+
+		Arguments:
+			color (bool): Whether to render escape-codes (else the plain
+						  text is returned).
+
+		Returns:
+			The beautified string.
+		"""
+
+		if not color:
+			return self.text
+
+		output = []
+
+		previous = ""
+
+		for code, text in self.pieces():
+			if code:
+				reset = "0;" if previous else ""
+				output.append("\033[{0}{1}m".format(reset, code))
+			elif previous:
+				output.append("\033[0m")
+
+			output.append(text)
+
+			previous = code
+
+		if previous:
+			output.append("\033[0m")
+
+		return "".join(output)
+
+class Builder(object):
+	"""
+	Accumulates runs of styled text, merging adjacent runs of the same style.
+
+	Attributes:
+		text (list): The pieces of the text.
+		starts (list): The start of each run.
+		codes (list): The escape-codes of each run.
+		length (int): The length of the text so far.
+		limit (int): The length at which text stops being added, if any.
+	"""
+
+	def __init__(self, limit=None):
+		"""
+		Initializes an empty Builder.
+
+		Arguments:
+			limit (int): The length at which to stop adding text (by
+						 self.add() and self.flatten()), if any.
+		"""
+
+		self.text = []
+		self.starts = []
+		self.codes = []
+		self.length = 0
+		self.limit = limit
+
+	def add(self, text, code):
+		"""
+		Adds a piece of text of a single style.
+
+		Arguments:
+			text (str): The text.
+			code (str): The escape-codes of the text.
+		"""
+
+		if self.limit is not None:
+			text = text[:self.limit - self.length]
+
+		if not text:
+			return
+
+		if not self.codes or self.codes[-1] != code:
+			self.starts.append(self.length)
+			self.codes.append(code)
+
+		self.text.append(text)
+		self.length += len(text)
+
+	def extend(self, styled):
+		"""
+		Adds all runs of a StyledText.
+
+		Arguments:
+			styled (StyledText): The text to add.
+		"""
+
+		if not styled.text:
+			return
+
+		starts = styled.starts
+		codes = styled.codes
+
+		# Merge the seam, if both sides are of the same style
+		if self.codes and self.codes[-1] == codes[0]:
+			starts = starts[1:]
+			codes = codes[1:]
+
+		self.starts.extend(self.length + i for i in starts)
+		self.codes.extend(codes)
+
+		self.text.append(styled.text)
+		self.length += len(styled.text)
+
+	def flatten(self, beautifier, string, phrases, parent, state):
+		"""
+		Adds the runs of parsed phrases (see StyledText.flatten()).
+
+		This mirrors Parser.stringify(), including its tracking of the
+		scope for error positions, but stops at self.limit (without
+		resolving the styles of any further phrases). The style of every
+		run is the one the escape-codes of Parser.stringify() put into
+		effect: the code of a phrase is added to the styles in effect where
+		it opens, and after a phrase closes, the style is reset to the
+		scope's own code (not to the styles in effect where it opened).
+
+		Arguments:
+			beautifier (Parser): The parser that parsed the string.
+			string (str): The escaped string (of the current scope).
+			phrases (list): The phrases in the string.
+			parent (str): The own code of the scope's phrase (to which the
+						  style is reset after each phrase in the scope).
+			state (str): The styles in effect at the start of the scope.
+		"""
+
+		last_tag = 0
+
+		for phrase in phrases:
+			self.add(string[last_tag : phrase.opening], state)
+
+			if self.limit is not None and self.length >= self.limit:
+				return
+
+			code = beautifier.code(beautifier.resolve(phrase))
+
+			# An empty code (\033[m) resets the style in the terminal
+			inner = state + ";" + code if state and code else code
+
+			if phrase.nested:
+				beautifier.offset += phrase.opening + 1
+
+				self.flatten(beautifier,
+							 phrase.string,
+							 phrase.nested,
+							 code,
+							 inner)
+
+				beautifier.offset -= phrase.opening + 1
+			else:
+				self.add(phrase.string, inner)
+
+			# Parser.stringify() resets to the scope's own code
+			state = parent
+
+			last_tag = phrase.closing + 1
+
+		self.add(string[last_tag:], state)
+
+	def styled(self, cls):
+		"""
+		Returns:
+			A new StyledText (or instance of a subclass) of the runs.
+		"""
+
+		return cls.runs("".join(self.text), self.starts, self.codes)
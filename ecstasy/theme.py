@@ -0,0 +1,101 @@
+"""
+Reusable, pre-validated sets of styles (palettes) for many parsers.
+"""
+
+import ecstasy.flags as flags
+import ecstasy.errors as errors
+import ecstasy.parser as parser
+import ecstasy.terminal as terminal
+
+class Theme(object):
+	"""
+	A palette of positional, 'always' and named styles, validated once.
+
+	Constructing a Parser flattens and validates its arguments (see
+	Parser.get_flags()), and rendering codifies the style of every phrase.
+	A Theme does the former once, when it is built, along with codifying
+	all of its styles. Parsers created with the theme (see
+	Theme.beautifier() or the 'theme' argument of Parser) reference its
+	styles instead of flattening them again and share its cache of
+	escape-codes, to which combinations of styles are added as they are
+	first rendered by any of them.
+
+	Attributes:
+		positional (tuple): The positional styles.
+		always (dict): The 'always' styles, by phrase.
+		names (dict): The named styles, by name (see styles.split()).
+		codes (dict): The escape-codes of each flag-combination (shared).
+	"""
+
+	def __init__(self, *args, **kwargs):
+		"""
+		Initializes a Theme instance.
+
+		Arguments:
+			args (list): The positional styles, in any form accepted by
+						 beautify() (including dictionaries of 'always'
+						 styles).
+			kwargs (dict): The 'always' (and named) styles.
+
+		Raises:
+			errors.FlagError: If a style is out of range.
+
+			errors.EcstasyError: If a style is of invalid type.
+		"""
+
+		validator = parser.Parser(args, kwargs)
+
+		self.positional = tuple(validator.positional)
+		self.always = validator.always
+		self.names = validator.names
+
+		for style in (self.positional +
+					  tuple(self.always.values()) +
+					  tuple(self.names.values())):
+			if not isinstance(style, (flags.Flags, int)):
+				raise errors.EcstasyError("Style '{0}' is neither a flag nor "
+										  "a (bitwise) OR'd flag-combination "
+										  "!".format(style))
+			validator.code(style)
+
+		self.codes = validator.codes
+
+	def beautifier(self, diagnostics=None, color=True, limits=None):
+		"""
+		Creates a Parser using the theme.
+
+		Arguments:
+			diagnostics (str): How to handle un-escaped meta-characters
+							   (see Parser).
+			color (bool): Whether to render escape-codes.
+			limits (parser.Limits): The limits on the work done by parsing.
+
+		Returns:
+			A Parser sharing the theme's styles and escape-codes.
+		"""
+
+		return parser.Parser(None,
+							 None,
+							 diagnostics,
+							 color=color,
+							 limits=limits,
+							 theme=self)
+
+	def beautify(self, string, *args, **kwargs):
+		"""
+		Beautifies a string with the theme (like the package-level beautify()).
+
+		Arguments:
+			string (str): The string to beautify.
+			args (list): Further positional styles, after the theme's.
+			kwargs (dict): Further 'always' styles.
+
+		Returns:
+			The beautified string.
+		"""
+
+		color = terminal.capabilities().color
+
+		beautifier = parser.Parser(args, kwargs, color=color, theme=self)
+
+		return beautifier.beautify(string)
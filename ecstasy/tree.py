@@ -0,0 +1,286 @@
+"""
+Compact, array-backed storage for parsed phrase trees.
+"""
+
+from array import array
+
+import ecstasy.parser as parser
+
+OVERRIDE = 1
+INCREMENT = 2
+
+class PhraseTree(object):
+	"""
+	A flat, structure-of-arrays representation of a phrase tree.
+
+	Where Parser.parse() returns one Phrase object (with its own
+	string, argument list and list of children) per phrase, a PhraseTree
+	stores every phrase as a single row across a handful of array buffers.
+	Phrases are stored in pre-order, such that the descendants of a phrase
+	always directly follow it. Phrase strings are not stored at all but
+	sliced out of the escaped string on demand.
+
+	The tree is still exposed through the Phrase interface: indexing the
+	tree or calling phrases() materializes ordinary Phrase objects, which
+	can then be passed to Parser.stringify() as usual.
+
+	Note:
+		A PhraseTree is built from the Phrase objects Parser.parse()
+		returns (see compact()), so it does not lower the peak memory of
+		parsing itself, which still creates every Phrase. It only makes
+		trees that are kept (e.g. cached or serialized) smaller, once the
+		Phrase objects are dropped.
+
+	Attributes:
+		string (str): The escaped string returned by Parser.parse().
+		opening (array): The opening index of each phrase (scope-relative).
+		closing (array): The closing index of each phrase (scope-relative).
+		parent (array): The index of each phrase's parent, or -1.
+		style (array): The style (flag-combination) of each phrase.
+		options (array): The override and increment bits of each phrase.
+		offsets (array): The arguments of phrase i are stored at
+						 arguments[offsets[i] : offsets[i + 1]].
+		arguments (array): The positional arguments of all phrases.
+		names (dict): The style name of each named phrase, by index
+					  (named phrases are rare, so they are stored sparsely).
+	"""
+
+	__slots__ = ("string",
+				 "opening",
+				 "closing",
+				 "parent",
+				 "style",
+				 "options",
+				 "offsets",
+				 "arguments",
+				 "names")
+
+	def __init__(self, string=""):
+		"""
+		Initializes an empty PhraseTree.
+
+		Arguments:
+			string (str): The escaped string the phrases refer to.
+		"""
+
+		self.string = string
+
+		self.opening = array("l")
+		self.closing = array("l")
+		self.parent = array("l")
+		self.style = array("q")
+		self.options = array("B")
+		self.offsets = array("l", [0])
+		self.arguments = array("l")
+		self.names = {}
+
+	@classmethod
+	def compact(cls, string, phrases):
+		"""
+		Builds a PhraseTree from the result of Parser.parse().
+
+		The phrases must already exist in full, so memory only drops once
+		they are no longer referenced.
+
+		Arguments:
+			string (str): The escaped string returned by Parser.parse().
+			phrases (list): The list of phrases returned by Parser.parse().
+
+		Returns:
+			A new PhraseTree holding the same phrases.
+		"""
+
+		tree = cls(string)
+
+		# Explicit stack instead of recursion (pushed in
+		# reverse so that phrases are popped in order)
+		stack = [(phrase, -1) for phrase in reversed(phrases)]
+
+		while stack:
+			phrase, parent = stack.pop()
+			index = tree.append(phrase, parent)
+			stack.extend((child, index) for child in reversed(phrase.nested))
+
+		return tree
+
+	def append(self, phrase, parent=-1):
+		"""
+		Appends a single phrase (without its children) to the tree.
+
+		Arguments:
+			phrase (Phrase): The phrase to append.
+			parent (int): The index of the phrase's parent, or -1.
+
+		Returns:
+			The index of the new phrase in the tree.
+		"""
+
+		self.opening.append(phrase.opening)
+		self.closing.append(phrase.closing)
+		self.parent.append(parent)
+		self.style.append(int(phrase.style))
+
+		options = 0
+		if phrase.override:
+			options |= OVERRIDE
+		if phrase.increment:
+			options |= INCREMENT
+		self.options.append(options)
+
+		self.arguments.extend(phrase.arguments)
+		self.offsets.append(len(self.arguments))
+
+		index = len(self.opening) - 1
+
+		if phrase.name is not None:
+			self.names[index] = phrase.name
+
+		return index
+
+	def __len__(self):
+		return len(self.opening)
+
+	def __getitem__(self, index):
+		"""
+		Materializes a phrase (including all of its nested phrases).
+
+		Arguments:
+			index (int): The index of the phrase in the tree.
+
+		Returns:
+			A Phrase object.
+		"""
+
+		if index < 0:
+			index += len(self)
+
+		if index < 0 or index >= len(self):
+			raise IndexError("PhraseTree index out of range")
+
+		return self.materialize(index, self.scope(index))
+
+	def __eq__(self, other):
+		if not isinstance(other, PhraseTree):
+			return NotImplemented
+
+		return (self.string == other.string			and
+				self.opening == other.opening		and
+				self.closing == other.closing		and
+				self.parent == other.parent			and
+				self.style == other.style			and
+				self.options == other.options		and
+				self.offsets == other.offsets		and
+				self.arguments == other.arguments	and
+				self.names == other.names)
+
+	def __ne__(self, other):
+		equal = self.__eq__(other)
+		return equal if equal is NotImplemented else not equal
+
+	__hash__ = None
+
+	def roots(self):
+		"""
+		Returns:
+			The indices of all top-level phrases.
+		"""
+
+		return [i for i, parent in enumerate(self.parent) if parent == -1]
+
+	def end(self, index):
+		"""
+		Finds the end of a phrase's subtree.
+
+		Because phrases are stored in pre-order, the subtree of a phrase is
+		contiguous and ends at the first phrase whose parent precedes it.
+
+		Arguments:
+			index (int): The index of the phrase.
+
+		Returns:
+			One index past the last descendant of the phrase.
+		"""
+
+		end = index + 1
+		while end < len(self) and self.parent[end] >= index:
+			end += 1
+
+		return end
+
+	def scope(self, index):
+		"""
+		Retrieves the string a phrase's positions are relative to.
+
+		Arguments:
+			index (int): The index of the phrase.
+
+		Returns:
+			The string of the phrase's parent (or the escaped string
+			for top-level phrases).
+		"""
+
+		chain = []
+		parent = self.parent[index]
+
+		while parent != -1:
+			chain.append(parent)
+			parent = self.parent[parent]
+
+		string = self.string
+		for ancestor in reversed(chain):
+			string = string[self.opening[ancestor] + 1 : self.closing[ancestor]]
+
+		return string
+
+	def materialize(self, index, scope):
+		"""
+		Builds the Phrase object for a phrase and all of its descendants.
+
+		Arguments:
+			index (int): The index of the phrase.
+			scope (str): The string the phrase's positions are relative to.
+
+		Returns:
+			A Phrase object.
+		"""
+
+		end = self.end(index)
+
+		phrases = {}
+
+		for i in range(index, end):
+			if i == index:
+				string = scope
+			else:
+				string = phrases[self.parent[i]].string
+
+			string = string[self.opening[i] + 1 : self.closing[i]]
+
+			options = self.options[i]
+			arguments = self.arguments[self.offsets[i] : self.offsets[i + 1]]
+
+			phrase = parser.Phrase(self.opening[i],
+								   self.closing[i],
+								   string,
+								   self.style[i],
+								   list(arguments),
+								   override=bool(options & OVERRIDE),
+								   increment=bool(options & INCREMENT),
+								   name=self.names.get(i))
+
+			if i != index:
+				phrases[self.parent[i]].nested.append(phrase)
+
+			phrases[i] = phrase
+
+		return phrases[index]
+
+	def phrases(self):
+		"""
+		Materializes the tree into the format returned by Parser.parse().
+
+		Returns:
+			A list of top-level Phrase objects.
+		"""
+
+		return [self.materialize(i, self.string) for i in self.roots()]
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gc
+import os
+import sys
+import time
+import random
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.parser as parser
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+
+# Builds adversarial strings of a given size
+GENERATORS = {
+	"unmatched": lambda n: "<" * n,
+	"unmatched words": lambda n: "a<" * n,
+	"escaped tags": lambda n: "\\<" * n,
+	"double escaped tags": lambda n: "\\\\<" * n,
+	"escaped closing tags": lambda n: "<" + "\\>" * n + ">",
+	"un-escaped closing tags": lambda n: ">" * n,
+	"parantheses": lambda n: "<" + "(" * n + ">",
+	"arguments": lambda n: "<(" + "1," * n + ")a>",
+	"siblings": lambda n: "<a> " * n,
+	"nested": lambda n: "<" * n + "a" + ">" * n,
+	"newlines": lambda n: "\n>" * n
+}
+
+# Strings which broke (or nearly broke) earlier versions of the parser
+CORPUS = [
+	"",
+	"<",
+	">",
+	"(",
+	")",
+	"\\",
+	"<(",
+	"<()",
+	"<()>",
+	"<(>",
+	"<)>",
+	"<a>\\",
+	"<\\",
+	"\\<\\",
+	"\\\\<a>",
+	"<a\\\\>",
+	"<(0)(1)a>",
+	"<( 0 , 1 )a>",
+	"<(--1)a>",
+	"<(!+!)a>",
+	"<\\(0)a>",
+	"<a(0)>",
+	"<<<<>>>>",
+	"<<<<>>>",
+	"\\<<a>\\>",
+	"<\n(0)a>",
+	"\\" * 100 + "<a>",
+	"<" * 300 + ">" * 300
+]
+
+# The most precise clock available (Python 2 has no perf_counter())
+clock = getattr(time, "perf_counter", time.time)
+
+def measure(string, repeat=3):
+	"""
+	Returns the best time of parsing a string 'repeat' times, without
+	any limits (so that deep nesting is parsed in full) and without
+	garbage collections (whose pauses say nothing about the parser).
+	"""
+
+	best = None
+
+	limits = parser.Limits(depth=None)
+
+	for _ in range(repeat):
+		beautifier = parser.Parser(None, {}, errors.SILENT, limits=limits)
+
+		gc.collect()
+		gc.disable()
+
+		start = clock()
+
+		try:
+			beautifier.parse(string)
+		except errors.EcstasyError:
+			pass
+		finally:
+			elapsed = clock() - start
+			gc.enable()
+
+		if best is None or elapsed < best:
+			best = elapsed
+
+	return best
+
+class TestAdversarialCorpus(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.styles = [flags.Style.Bold] * 4
+
+	def assertParses(self, string):
+
+		beautifier = parser.Parser(self.styles, {}, errors.SILENT)
+
+		# Anything but an ecstasy error (e.g. an IndexError
+		# or a RecursionError) is a bug in the parser
+		try:
+			beautifier.beautify(string)
+		except errors.EcstasyError:
+			pass
+
+	def test_corpus(self):
+
+		for string in CORPUS:
+			self.assertParses(string)
+
+	def test_generators(self):
+
+		for generate in GENERATORS.values():
+			self.assertParses(generate(500))
+
+	def test_random(self):
+
+		rng = random.Random(1234)
+
+		alphabet = "<>()\\\n 01,!+-a"
+
+		for _ in range(2000):
+			length = rng.randint(0, 24)
+			string = "".join(rng.choice(alphabet) for _ in range(length))
+			self.assertParses(string)
+
+class TestAdversarialScaling(unittest2.TestCase):
+
+	def test_scales_linearly(self):
+
+		# Large enough to be timed without a floor on the base time
+		small, large = 10000, 80000
+
+		for name, generate in GENERATORS.items():
+			# Linear parsing takes about 8 times as long for 8 times the
+			# input (quadratic parsing 64 times), so twice that leaves
+			# room for caches and noisy machines, all the more since a
+			# slow measurement is repeated
+			for _ in range(3):
+				ratio = measure(generate(large)) / measure(generate(small))
+				if ratio < 16:
+					break
+
+			self.assertLess(ratio, 16, "{0} scaled by {1:.1f}".format(name,
+																	   ratio))
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import asyncio
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.aio as aio
+import ecstasy.parser as parser
+import ecstasy.flags as flags
+import ecstasy.errors as errors
+
+class Sink(object):
+
+	def __init__(self):
+		self.writes = []
+		self.drains = 0
+
+	def write(self, data):
+		self.writes.append(data)
+
+	async def drain(self):
+		self.drains += 1
+
+class TestAsyncWriter(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.parser = parser.Parser([flags.Color.Red, flags.Fill.Blue], {})
+
+		self.sink = Sink()
+
+	def run_async(self, coroutine):
+
+		loop = asyncio.new_event_loop()
+
+		try:
+			return loop.run_until_complete(coroutine)
+		finally:
+			loop.close()
+
+	def test_batches_small_writes(self):
+
+		writer = aio.AsyncWriter(self.sink, self.parser, threshold=1000)
+
+		async def write():
+			await writer.writeline("<a> <b>")
+			await writer.writeline("<c>")
+			self.assertEqual(self.sink.writes, [])
+			await writer.flush()
+
+		self.run_async(write())
+
+		expected = self.parser.beautify("<a> <b>\n")
+		expected += self.parser.beautify("<c>\n")
+
+		self.assertEqual(self.sink.writes, [expected.encode("utf-8")])
+
+		self.assertEqual(self.sink.drains, 1)
+
+	def test_flushes_at_threshold(self):
+
+		writer = aio.AsyncWriter(self.sink, self.parser,
+								 encoding=None, threshold=1)
+
+		async def write():
+			await writer.write("<a>")
+			await writer.write("<b>")
+
+		self.run_async(write())
+
+		self.assertEqual(self.sink.writes, [self.parser.beautify("<a>"),
+											self.parser.beautify("<b>")])
+
+		self.assertEqual(self.sink.drains, 2)
+
+	def test_flushes_after_interval(self):
+
+		writer = aio.AsyncWriter(self.sink, self.parser,
+								 encoding=None, interval=0.01)
+
+		async def write():
+			await writer.write("<a>")
+			await writer.write("<b>")
+			self.assertEqual(self.sink.writes, [])
+			await asyncio.sleep(0.05)
+			self.assertEqual(len(self.sink.writes), 1)
+			self.assertIsNone(writer.timer)
+			await writer.flush()
+
+		self.run_async(write())
+
+		expected = self.parser.beautify("<a>") + self.parser.beautify("<b>")
+
+		self.assertEqual(self.sink.writes, [expected])
+
+		self.assertEqual(self.sink.drains, 1)
+
+	def test_offloads_large_strings(self):
+
+		writer = aio.AsyncWriter(self.sink, self.parser,
+								 encoding=None, offload=10)
+
+		string = "<(0)abc> " * 100
+
+		async def write():
+			async with writer:
+				await writer.write(string)
+
+		self.run_async(write())
+
+		self.assertEqual(self.sink.writes, [self.parser.beautify(string)])
+
+	def test_offloaded_parsers_share_no_state(self):
+
+		beautifier = parser.Parser([flags.Color.Red], {}, errors.SILENT)
+
+		fork = aio.AsyncWriter(self.sink, beautifier).fork()
+
+		self.assertIsNot(fork.always, beautifier.always)
+
+		fork.beautify("<a> (x)")
+
+		self.assertEqual(fork.diagnostics.count, 2)
+		self.assertEqual(beautifier.diagnostics.count, 0)
+
+		self.assertEqual(beautifier.codes, {})
+
+	def test_awaits_asynchronous_sinks(self):
+
+		written = []
+
+		class AsyncSink(object):
+			async def write(self, data):
+				written.append(data)
+
+		writer = aio.AsyncWriter(AsyncSink(), self.parser, encoding=None)
+
+		async def write():
+			await writer.write("<a>")
+			await writer.close()
+
+		self.run_async(write())
+
+		self.assertEqual(written, [self.parser.beautify("<a>")])
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
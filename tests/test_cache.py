@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import sys
+import shutil
+import tempfile
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.cache as cache
+import ecstasy.parser as parser
+import ecstasy.flags as flags
+import ecstasy.terminal as terminal
+
+class TestSerialization(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.source = "<(1)a> \\<b <<c> (d)> <(+)e> <(warn)f>"
+
+		self.parser = parser.Parser(None, {})
+
+		self.string, self.phrases = self.parser.parse(self.source)
+
+	def test_round_trips_parse_results(self):
+
+		data = cache.dumps(self.string, self.phrases, self.source)
+
+		compact = cache.loads(data, self.source)
+
+		self.assertEqual(compact.string, self.string)
+
+		self.assertEqual(compact.phrases(), self.phrases)
+
+	def test_rejects_other_source(self):
+
+		data = cache.dumps(self.string, self.phrases, self.source)
+
+		self.assertIsNone(cache.loads(data, self.source + " "))
+
+	def test_rejects_other_version(self):
+
+		data = cache.dumps(self.string, self.phrases, self.source)
+
+		data = data.replace(cache.ecstasy.__version__, "0.0.0")
+
+		self.assertIsNone(cache.loads(data, self.source))
+
+	def test_rejects_malformed_data(self):
+
+		self.assertIsNone(cache.loads("{", self.source))
+
+		self.assertIsNone(cache.loads("[]", self.source))
+
+	def test_rejects_incomplete_documents(self):
+
+		header = {"format": cache.FORMAT,
+				  "version": cache.ecstasy.__version__,
+				  "hash": cache.digest(self.source)}
+
+		self.assertIsNone(cache.loads(json.dumps(header), self.source))
+
+		document = json.loads(cache.dumps(self.string,
+										  self.phrases,
+										  self.source))
+
+		for name, value in (("opening", "abc"), ("names", [1]), ("style", 1)):
+			broken = dict(document)
+			broken[name] = value
+
+			self.assertIsNone(cache.loads(json.dumps(broken), self.source))
+
+class TestCache(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+
+		self.styles = [flags.Color.Red, flags.Fill.Blue, flags.Style.Bold]
+
+		self.string = "<abc> <<def> ghi>"
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+	def test_beautifies_like_the_parser(self):
+
+		color = terminal.capabilities().color
+
+		expected = parser.Parser(self.styles, {}, color=color)\
+					     .beautify(self.string)
+
+		store = cache.Cache()
+
+		self.assertEqual(store.beautify(self.string, *self.styles), expected)
+
+		# The second time around the tree comes from the cache
+		self.assertEqual(store.beautify(self.string, *self.styles), expected)
+
+	def test_persists_trees_across_instances(self):
+
+		cache.Cache(self.directory).load(self.string)
+
+		self.assertEqual(len(os.listdir(self.directory)), 1)
+
+		class Unusable(object):
+			def parse(self, string):
+				raise AssertionError("Cached string was parsed again")
+
+		store = cache.Cache(self.directory, Unusable())
+
+		expected = parser.Parser(None, {}).parse(self.string)
+
+		self.assertEqual(store.parse(self.string), expected)
+
+	def test_replaces_stale_entries(self):
+
+		store = cache.Cache(self.directory)
+
+		key = cache.digest(self.string)
+
+		with open(store.path(key), "w") as stale:
+			stale.write("stale")
+
+		self.assertEqual(cache.Cache(self.directory).parse(self.string),
+						 parser.Parser(None, {}).parse(self.string))
+
+		# An entry with a valid header only
+		with open(store.path(key), "w") as truncated:
+			json.dump({"format": cache.FORMAT,
+					   "version": cache.ecstasy.__version__,
+					   "hash": key},
+					  truncated)
+
+		self.assertEqual(cache.Cache(self.directory).parse(self.string),
+						 parser.Parser(None, {}).parse(self.string))
+
+		with open(store.path(key)) as fresh:
+			self.assertIsNotNone(cache.loads(fresh.read(), self.string))
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
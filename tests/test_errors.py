@@ -51,6 +51,49 @@ class TestErrors(unittest2.TestCase):
 		self.assertEqual(errors.position("abc\ndef\nghi", 8), "2:0")
 
 
+	def test_line_index_is_lazy_and_correct(self):
+
+		lines = errors.Lines("abc\ndef\nghi")
+
+		self.assertIsNone(lines.offsets)
+
+		self.assertEqual(lines.position(5), "1:1")
+
+		self.assertEqual(list(lines.offsets), [0, 4, 8])
+
+		self.assertEqual(lines.position(3), "0:3")
+
+		self.assertEqual(lines.position(8), "2:0")
+
+		self.assertRaises(errors.InternalError, lines.position, 11)
+
+	def test_diagnostics_reject_invalid_mode(self):
+
+		self.assertRaises(errors.EcstasyError,
+						  errors.Diagnostics,
+						  "loud")
+
+	def test_diagnostics_collect_entries(self):
+
+		diagnostics = errors.Diagnostics(errors.COLLECT)
+
+		diagnostics.report("Bad", 5, "1:1")
+
+		self.assertEqual(diagnostics.entries,
+						 [errors.Diagnostic("Bad", 5, "1:1")])
+
+		diagnostics.reset()
+
+		self.assertEqual(diagnostics.entries, [])
+
+	def test_diagnostics_raise_in_strict_mode(self):
+
+		diagnostics = errors.Diagnostics(errors.STRICT)
+
+		self.assertRaises(errors.ParseError,
+						  diagnostics.report,
+						  "Bad", 1, "1")
+
 	def test_spoken_word_number_retrieval(self):
 
 		self.assertEqual(errors.number(0), "a 0th")
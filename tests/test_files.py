@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.files as files
+import ecstasy.parser as parser
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+
+class TestBoundaries(unittest2.TestCase):
+
+	def test_splits_at_newlines(self):
+
+		data = b"ab\ncd\nef\ngh"
+
+		self.assertEqual(list(files.boundaries(data, 4)), [6, 11])
+
+	def test_does_not_split_phrases(self):
+
+		data = b"<a\nb>\nc\n<d\n\\>\ne>\nf"
+
+		self.assertEqual(list(files.boundaries(data, 1)), [6, 8, 17, 18])
+
+	def test_respects_escapes(self):
+
+		data = b"\\<a\nb\\\\<c\nd>\ne"
+
+		self.assertEqual(list(files.boundaries(data, 1)), [4, 13, 14])
+
+class TestBeautify(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+
+		self.path = os.path.join(self.directory, "report.txt")
+
+		self.styles = [flags.Color.Red, flags.Fill.Blue, flags.Style.Bold]
+
+		self.always = {u"\u00e9t\u00e9": flags.Style.Underline}
+
+		text = (u"<caf\u00e9> \\<not a tag\\>\n"
+				u"<(1)multi\nline> <\u00e9t\u00e9>\n"
+				u"<a> <(+)b>\n"
+				u"<outer <inner>\n"
+				u"still outer>\n") * 20
+
+		self.data = text.encode("utf-8")
+
+		with open(self.path, "wb") as source:
+			source.write(self.data)
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+	def test_matches_beautifying_the_whole_file(self):
+
+		for size in (1, 16, 1 << 20):
+			destination = io.BytesIO()
+
+			written = files.beautify(self.path,
+									 destination,
+									 self.styles * 40,
+									 self.always,
+									 size=size,
+									 color=True)
+
+			self.assertEqual(written, len(destination.getvalue()))
+
+			whole = parser.Parser(self.styles * 40, dict(self.always))
+
+			self.assertEqual(destination.getvalue(), whole.beautify(self.data))
+
+	def test_accepts_open_files_and_parsers(self):
+
+		destination = io.BytesIO()
+
+		beautifier = parser.Parser(self.styles * 40, dict(self.always))
+
+		with open(self.path, "rb") as source:
+			files.beautify(source, destination, beautifier, size=64)
+
+		expected = parser.Parser(self.styles * 40, dict(self.always))
+
+		self.assertEqual(destination.getvalue(), expected.beautify(self.data))
+
+		self.assertIn(u"\u00e9t\u00e9", beautifier.always)
+
+	def test_strips_without_color(self):
+
+		destination = io.BytesIO()
+
+		files.beautify(self.path,
+					   destination,
+					   self.styles * 40,
+					   self.always,
+					   color=False)
+
+		plain = parser.Parser(self.styles * 40,
+							  dict(self.always),
+							  color=False)
+
+		self.assertEqual(destination.getvalue(), plain.beautify(self.data))
+
+	def test_handles_empty_files(self):
+
+		open(self.path, "wb").close()
+
+		destination = io.BytesIO()
+
+		self.assertEqual(files.beautify(self.path, destination), 0)
+
+		self.assertEqual(destination.getvalue(), b"")
+
+	def test_raises_for_unclosed_phrases(self):
+
+		with open(self.path, "ab") as source:
+			source.write(b"<unclosed\n")
+
+		self.assertRaises(errors.ParseError,
+						  files.beautify,
+						  self.path,
+						  io.BytesIO(),
+						  self.styles * 40,
+						  size=16)
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import warnings
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.formatting as formatting
+import ecstasy.parser as parser
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+
+class TestFormatter(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.styles = [flags.Color.Red, flags.Fill.Blue]
+
+		self.formatter = formatting.Formatter(ok=flags.Style.Bold,
+											  *self.styles)
+
+		self.formatter.parser.color = True
+
+		self.parser = parser.Parser(self.styles, {"ok": flags.Style.Bold})
+
+	def test_formats_like_str_format(self):
+
+		string = "<{}> <ok> <(1){name!r:{width}}> {number.real:+} {{x}}"
+
+		result = self.formatter.format(string,
+									   "a",
+									   name="b",
+									   width=6,
+									   number=3)
+
+		expected = self.parser.beautify("<a> <ok> <(1)'b'   > +3 {x}")
+
+		self.assertEqual(result, expected)
+
+	def test_inserts_values_as_plain_text(self):
+
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter("always")
+
+			result = self.formatter.format("<{}> {}", "<a>", "(b)\\")
+
+		self.assertEqual(caught, [])
+
+		expected = self.parser.beautify("<\\<a\\>> \\(b\\)\\")
+
+		self.assertEqual(result, expected)
+
+	def test_caches_parsed_strings(self):
+
+		for i in range(3):
+			self.formatter.format("<{}>", i)
+
+		self.assertEqual(len(self.formatter.templates), 1)
+		self.assertEqual(len(self.formatter.functions), 1)
+
+	def test_renders_without_color(self):
+
+		self.formatter.parser.color = False
+
+		self.assertEqual(self.formatter.format("<{}> <{}> {}", 1, 2, 3),
+						 "1 2 3")
+
+	def test_bounds_caches(self):
+
+		self.formatter.size = 2
+
+		for i in range(4):
+			self.formatter.format("<{{}}> {0}".format(i), "x")
+
+		self.formatter.format("<{}> 2", "x")
+
+		self.assertEqual(list(self.formatter.templates),
+						 ["<{}> 3", "<{}> 2"])
+
+		self.assertEqual(len(self.formatter.functions), 2)
+
+	def test_raises_errors(self):
+
+		for color in (True, False):
+			self.formatter.parser.color = color
+
+			self.assertRaises(errors.ArgumentError,
+							  self.formatter.format,
+							  "<{}> <{}> <{}>",
+							  1, 2, 3)
+
+		self.formatter.parser.color = True
+
+		self.assertRaises(KeyError, self.formatter.format, "<{x}>")
+
+		self.assertRaises(IndexError, self.formatter.format, "<{}>")
+
+		self.assertRaises(ValueError, self.formatter.format, "{} {0}", 1)
+
+		self.assertRaises(ValueError, self.formatter.format, "{0} {}", 1, 2)
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
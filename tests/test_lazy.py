@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.lazy as lazy
+import ecstasy.parser as parser
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+import ecstasy.terminal as terminal
+
+class TestBeautifiedString(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.styles = [flags.Color.Red, {"ok": flags.Color.Green}]
+
+		self.string = "<a> <ok>"
+
+		self.lazy = lazy.BeautifiedString(self.string, *self.styles)
+
+		# Detect colors as in a plain environment (FORCE_COLOR colors any stream)
+		self.force = os.environ.pop("FORCE_COLOR", None)
+		terminal.reset()
+
+	def tearDown(self):
+
+		if self.force is not None:
+			os.environ["FORCE_COLOR"] = self.force
+
+		terminal.reset()
+
+	def test_renders_like_parser(self):
+
+		beautifier = parser.Parser(self.styles, {})
+
+		self.assertEqual(self.lazy.render(), beautifier.beautify(self.string))
+
+		self.assertEqual(self.lazy.render(color=False), "a ok")
+
+	def test_caches_result(self):
+
+		first = self.lazy.render()
+
+		self.assertIs(self.lazy.render(), first)
+
+		self.assertEqual(sorted(self.lazy.results), [True])
+
+		# The styles are not modified by rendering
+		self.assertEqual(self.lazy.render(color=False), "a ok")
+
+		self.assertEqual(self.lazy.kwargs, {})
+
+	def test_defers_errors(self):
+
+		deferred = lazy.BeautifiedString("<a> <b>", flags.Color.Red)
+
+		self.assertRaises(errors.ArgumentError, deferred.render)
+
+		invalid = lazy.BeautifiedString("<a>", flags.LIMIT)
+
+		self.assertRaises(errors.FlagError, invalid.render)
+
+	def test_renders_when_consumed(self):
+
+		expected = self.lazy.render(color=False)
+
+		# Output that isn't a terminal gets no escape-codes
+		stream = io.StringIO()
+
+		self.lazy.write(stream)
+
+		self.assertEqual(stream.getvalue(), expected)
+
+		self.assertIn(str(self.lazy), [expected, self.lazy.render()])
+
+		self.assertEqual("{0:>12}".format(self.lazy), str(self.lazy).rjust(12))
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
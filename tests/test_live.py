@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.live as live
+import ecstasy.parser as parser
+import ecstasy.flags as flags
+
+class TestCells(unittest2.TestCase):
+
+	def test_tracks_styles(self):
+
+		beautifier = parser.Parser([flags.Color.Red, flags.Fill.Blue], {})
+
+		rows = live.cells(beautifier.beautify("a <b <c>>\nd"))
+
+		red = str(flags.Color.Red)
+		both = red + ";" + str(flags.Fill.Blue)
+
+		self.assertEqual(rows, [
+			[("", "a"), ("", " "), (red, "b"), (red, " "), (both, "c")],
+			[("", "d")]
+		])
+
+	def test_plain(self):
+
+		self.assertEqual(live.cells("ab"), [[("", "a"), ("", "b")]])
+
+class TestDiff(unittest2.TestCase):
+
+	def test_finds_changed_runs(self):
+
+		old = live.cells("0123456789abcdef")[0]
+		new = live.cells("x123456789abcdxf")[0]
+
+		self.assertEqual(live.diff(old, new), [[0, 1], [14, 15]])
+
+	def test_merges_close_runs(self):
+
+		old = live.cells("0123456789")[0]
+		new = live.cells("x12x456789")[0]
+
+		self.assertEqual(live.diff(old, new), [[0, 4]])
+
+	def test_longer_rows(self):
+
+		old = live.cells("abc")[0]
+		new = live.cells("abcde")[0]
+
+		self.assertEqual(live.diff(old, new), [[3, 5]])
+
+class TestRegion(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.stream = io.StringIO()
+
+		self.styles = [flags.Color.Red]
+
+		self.region = live.Region(self.stream, self.styles, rate=None)
+
+	def output(self):
+
+		data = self.stream.getvalue()
+
+		self.stream.seek(0)
+		self.stream.truncate()
+
+		return data
+
+	def test_draws_first_frame(self):
+
+		self.region.update("one\ntwo")
+
+		self.assertEqual(self.output(), "\033[1Gone\n\033[1Gtwo\n\r")
+
+	def test_redraws_only_changes(self):
+
+		self.region.update("progress: 10%\nstatus")
+		self.output()
+
+		self.region.update("progress: 20%\nstatus")
+
+		self.assertEqual(self.output(), "\033[2A\033[11G2\033[2B\r")
+
+	def test_skips_identical_frames(self):
+
+		self.region.update("same")
+		self.output()
+
+		self.region.update("same")
+
+		self.assertEqual(self.output(), "")
+
+	def test_clears_shorter_lines(self):
+
+		self.region.update("longer")
+		self.output()
+
+		self.region.update("long")
+
+		self.assertEqual(self.output(), "\033[1A\033[5G\033[K\033[1B\r")
+
+	def test_grows_and_shrinks(self):
+
+		self.region.update("a")
+		self.output()
+
+		self.region.update("a\nb")
+
+		self.assertEqual(self.output(), "\033[1Gb\n\r")
+
+		self.region.update("a")
+
+		self.assertEqual(self.output(), "\033[1A\r\033[J\r")
+
+	def test_emits_style_codes(self):
+
+		region = live.Region(self.stream, self.styles, rate=None, color=True)
+
+		region.update("a<b>")
+
+		red = str(flags.Color.Red)
+
+		expected = "\033[1Ga\033[0;{0}mb\033[0m\n\r".format(red)
+
+		self.assertEqual(self.output(), expected)
+
+	def test_caps_frame_rate(self):
+
+		region = live.Region(self.stream, self.styles, rate=1e-9)
+
+		self.assertTrue(region.update("a"))
+		self.assertFalse(region.update("b"))
+		self.assertFalse(region.update("c"))
+
+		self.output()
+
+		region.close()
+
+		self.assertEqual(self.output(), "\033[1A\033[1Gc\033[1B\r")
+
+	def test_forces_frames(self):
+
+		region = live.Region(self.stream, self.styles, rate=1e-9)
+
+		region.update("a")
+
+		self.assertTrue(region.update("b", force=True))
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
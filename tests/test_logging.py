@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import logging
+import warnings
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.logging as ecstasy_logging
+import ecstasy.flags as flags
+import ecstasy.terminal as terminal
+
+class TestFormatter(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.levels = {
+			logging.INFO: flags.Color.Blue,
+			logging.ERROR: [flags.Color.Red, flags.Style.Bold]
+		}
+
+		self.formatter = ecstasy_logging.Formatter("<%(levelname)s> "
+												   "<%(name)s>: %(message)s",
+												   levels=self.levels,
+												   fields={"name": flags.Fill.Gray},
+												   color=True)
+
+		# Detect colors as in a plain environment (FORCE_COLOR colors any stream)
+		self.force = os.environ.pop("FORCE_COLOR", None)
+		terminal.reset()
+
+	def tearDown(self):
+
+		if self.force is not None:
+			os.environ["FORCE_COLOR"] = self.force
+
+		terminal.reset()
+
+	def record(self, level, message):
+
+		return logging.LogRecord("test", level, __file__, 1, message, (), None)
+
+	def test_renders_level_styles(self):
+
+		result = self.formatter.format(self.record(logging.INFO, "a < b"))
+
+		expected = "\033[{0}mINFO\033[0;m \033[{1}mtest\033[0;m: a < b"
+		expected = expected.format(flags.codify(flags.Color.Blue),
+								   flags.codify(flags.Fill.Gray))
+
+		self.assertEqual(result, expected)
+
+	def test_uses_closest_lower_level(self):
+
+		result = self.formatter.format(self.record(logging.WARNING, "x"))
+
+		self.assertTrue(result.startswith("\033[{0}mWARNING".format(
+						flags.codify(flags.Color.Blue))))
+
+		result = self.formatter.format(self.record(logging.CRITICAL, "x"))
+
+		self.assertTrue(result.startswith("\033[{0}mCRITICAL".format(
+						flags.codify(flags.Color.Red))))
+
+	def test_compiles_each_level_once(self):
+
+		self.formatter.format(self.record(logging.INFO, "a"))
+		self.formatter.format(self.record(logging.INFO, "b"))
+
+		self.assertEqual(list(self.formatter.formatters), [logging.INFO])
+
+	def test_does_not_warn_about_record_fields(self):
+
+		formatter = ecstasy_logging.Formatter(color=True)
+
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter("always")
+
+			for level in (logging.DEBUG, logging.INFO, logging.ERROR):
+				formatter.format(self.record(level, "(x)"))
+
+		self.assertEqual(caught, [])
+
+	def test_renders_plain_for_non_tty_streams(self):
+
+		formatter = ecstasy_logging.Formatter(stream=io.StringIO())
+
+		self.assertFalse(formatter.color)
+
+		result = formatter.format(self.record(logging.ERROR, "(pid 123)"))
+
+		self.assertEqual(result, "ERROR: (pid 123)")
+
+	def test_stream_handler_formats_records(self):
+
+		stream = io.StringIO()
+
+		logger = logging.getLogger("ecstasy.test")
+		logger.propagate = False
+		logger.addHandler(ecstasy_logging.StreamHandler(stream))
+
+		logger.warning("<not> markup")
+
+		self.assertEqual(stream.getvalue(), "WARNING: <not> markup\n")
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
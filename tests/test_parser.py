@@ -4,6 +4,7 @@
 import os
 import sys
 import unittest2
+import warnings
 import collections
 
 sys.path.insert(0, os.path.abspath('..'))
@@ -162,6 +163,126 @@ class TestBeautify(unittest2.TestCase):
 		self.assertEqual(self.parser.beautify("batman spiderman"),
 						 "batman spiderman")
 
+class TestEscape(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.parser = parser.Parser([flags.Color.Red], {}, errors.STRICT)
+
+		self.texts = ["a<b>(c)d", "x\\(y)", "<<>>", "C:\\path\\", "", "()"]
+
+	def test_escaped_text_is_parsed_as_is(self):
+
+		for text in self.texts:
+			escaped = parser.escape(text)
+
+			if not text.endswith("\\"):
+				self.assertEqual(self.parser.beautify(escaped), text)
+
+			self.assertEqual(self.parser.beautify("<!" + escaped + ">"),
+							 self.parser.beautify("<!x>").replace("x", text))
+
+	def test_unescape_is_inverse(self):
+
+		for text in self.texts:
+			self.assertEqual(parser.unescape(parser.escape(text)), text)
+
+	def test_removes_escape_characters_before_tags(self):
+
+		for text in ["x\\<y", "x\\\\>y"]:
+			escaped = parser.escape(text)
+
+			self.assertEqual(self.parser.beautify(escaped),
+							 text.replace("\\", ""))
+
+	def test_escaped_text_cannot_change_tags_around_it(self):
+
+		expected = self.parser.beautify("<(0)path: x>")
+
+		for text in ["C:\\temp\\", "\\\\", "(\\", "a\\<b"]:
+			markup = "<(0)path: " + parser.escape(text) + ">"
+
+			self.assertEqual(self.parser.beautify(markup),
+							 expected.replace("x", text.replace("\\<", "<")))
+
+			markup = parser.escape(text) + "<(0)path: x>"
+
+			self.assertEqual(self.parser.beautify(markup),
+							 text.replace("\\<", "<") + expected)
+
+	def test_keeps_the_escape_grammar(self):
+
+		red = "\033[{0}m".format(flags.Color.Red)
+
+		# One escape character is removed before a tag, which is real
+		# if it is still preceded by one
+		self.assertEqual(self.parser.beautify("\\\\<a>"),
+						 "\\" + red + "a\033[0;m")
+
+		self.assertEqual(self.parser.beautify("\\\\\\<a>"),
+						 "\\\\" + red + "a\033[0;m")
+
+		self.assertEqual(self.parser.beautify("x\\\\"), "x\\\\")
+
+	def test_escapes_bytes(self):
+
+		self.assertEqual(parser.escape(b"a<b>\\<"), b"a\\<b\\>\\<")
+
+		self.assertEqual(parser.escape(b"a\\"), b"a\\\\")
+
+		self.assertEqual(parser.escape(bytearray(b"(x)")), b"\\(x\\)")
+
+		self.assertEqual(parser.unescape(memoryview(b"\\<a\\>")), b"<a>")
+
+class TestBeautifyBytes(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.parser = parser.Parser([flags.Color.Red,
+									 flags.Fill.White],
+									{"\u00e9t\u00e9": flags.Style.Bold})
+
+		self.string = u"caf\u00e9 <cr\u00e8me> <(1)br\u00fbl\u00e9e> <\u00e9t\u00e9>"
+
+	def test_returns_bytes(self):
+
+		expected = self.parser.beautify(self.string).encode("utf-8")
+
+		data = self.string.encode("utf-8")
+
+		self.assertEqual(self.parser.beautify(data), expected)
+		self.assertEqual(self.parser.beautify(bytearray(data)), expected)
+		self.assertEqual(self.parser.beautify(memoryview(data)), expected)
+
+	def test_handles_empty_data(self):
+
+		self.assertEqual(self.parser.beautify(memoryview(b"")), b"")
+
+	def test_restores_always_arguments(self):
+
+		self.parser.beautify(self.string.encode("utf-8"))
+
+		self.assertIn(u"\u00e9t\u00e9", self.parser.always)
+
+	def test_reports_byte_positions(self):
+
+		with self.assertRaises(errors.ParseError) as context:
+			self.parser.beautify(u"\u00e9 <a".encode("utf-8"))
+
+		self.assertEqual(context.exception.position, "3")
+
+class TestPhrase(unittest2.TestCase):
+
+	def test_has_no_instance_dictionary(self):
+
+		self.assertFalse(hasattr(parser.Phrase(), "__dict__"))
+
+	def test_compares_unequal_to_other_types(self):
+
+		self.assertNotEqual(parser.Phrase(0, 4, "abc"), "abc")
+
+		self.assertNotEqual(parser.Phrase(0, 4, "abc"), parser.Phrase(0, 4))
+
 class TestParserParse(unittest2.TestCase):
 
 	def setUp(self):
@@ -288,6 +409,22 @@ class TestParserParse(unittest2.TestCase):
 						  "<abc <def <ghi>>")
 
 
+	def test_reports_original_positions_of_parse_errors(self):
+
+		try:
+			self.parser.parse("a\\<b\n  <(0)cd <e>")
+		except errors.ParseError as error:
+			self.assertEqual(error.position, "1:2")
+		else:
+			self.fail("No ParseError raised")
+
+		try:
+			self.parser.parse("x\n <(1z)a>")
+		except errors.ParseError as error:
+			self.assertEqual(error.position, "1:2")
+		else:
+			self.fail("No ParseError raised")
+
 	def test_parser_escapes_meta_characters(self):
 		pass
 
@@ -313,7 +450,7 @@ class TestParserParse(unittest2.TestCase):
 
 		self.assertRaises(errors.ParseError,
 						  self.parser.parse,
-						  "<(nonsense)asdf>")
+						  "<(non-sense)asdf>")
 
 		self.assertRaises(errors.ParseError,
 						  self.parser.parse,
@@ -323,6 +460,242 @@ class TestParserParse(unittest2.TestCase):
 						  self.parser.parse,
 						  "<(?)asdf>")
 
+class TestParserDiagnostics(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.string = "a > b\n\\<x (pid) <(0)y (z)>"
+
+	def test_silent_mode_only_counts(self):
+
+		silent = parser.Parser(None, {}, errors.SILENT)
+
+		with warnings.catch_warnings():
+			warnings.simplefilter("error")
+			silent.parse(self.string)
+
+		self.assertEqual(silent.diagnostics.count, 5)
+
+		self.assertEqual(silent.diagnostics.entries, [])
+
+	def test_collect_mode_reports_original_positions(self):
+
+		collecting = parser.Parser(None, {}, errors.COLLECT)
+
+		collecting.parse(self.string)
+
+		entries = collecting.diagnostics.entries
+
+		self.assertEqual([i.index for i in entries], [2, 10, 14, 22, 24])
+
+		self.assertEqual([i.position for i in entries],
+						 ["0:2", "1:4", "1:8", "1:16", "1:18"])
+
+		for entry in entries:
+			self.assertIn(self.string[entry.index], "()<>")
+
+	def test_collect_mode_resets_for_every_parse(self):
+
+		collecting = parser.Parser(None, {}, errors.COLLECT)
+
+		collecting.parse(self.string)
+		collecting.parse("(")
+
+		self.assertEqual(len(collecting.diagnostics.entries), 1)
+
+	def test_strict_mode_raises(self):
+
+		strict = parser.Parser(None, {}, errors.STRICT)
+
+		self.assertRaises(errors.ParseError, strict.parse, self.string)
+
+		self.assertEqual(strict.parse("\\<a\\>"), ("<a>", []))
+
+class TestNamedStyles(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.always = {"(error)": flags.Color.Red, "(note)": flags.Style.Dim}
+
+		self.parser = parser.Parser([flags.Fill.Blue, flags.Fill.Green],
+									self.always)
+
+	def test_parses_names(self):
+
+		phrases = self.parser.parse("<( error )a> <(0)b>")[1]
+
+		self.assertEqual(phrases[0].name, "error")
+		self.assertEqual(phrases[0].arguments, [])
+		self.assertEqual(phrases[0].string, "a")
+
+		self.assertIsNone(phrases[1].name)
+
+	def test_resolves_named_styles(self):
+
+		expected = "\033[{0}ma\033[0;m \033[{1}mb\033[0;m".format(
+			flags.codify(flags.Color.Red),
+			flags.codify(flags.Fill.Blue))
+
+		self.assertEqual(self.parser.beautify("<(error)a> <b>"), expected)
+
+	def test_keeps_names_apart_from_always_styles(self):
+
+		beautifier = parser.Parser([flags.Fill.Blue],
+								   {"(error)": flags.Color.Red,
+									"error": flags.Style.Bold})
+
+		expected = "\033[{0}mx\033[0;m \033[{1}merror\033[0;m".format(
+			flags.codify(flags.Color.Red),
+			flags.codify(flags.Style.Bold))
+
+		self.assertEqual(beautifier.beautify("<(error)x> <error>"), expected)
+
+		# Named styles don't style phrases by their text, nor vice versa
+		self.assertEqual(self.parser.beautify("<error>"),
+						 self.parser.beautify("<a>").replace("a", "error"))
+
+		textual = parser.Parser(None, {"error": flags.Color.Red})
+
+		self.assertRaises(errors.ArgumentError, textual.beautify, "<(error)x>")
+
+	def test_names_do_not_consume_positionals(self):
+
+		first = self.parser.beautify("<(note)x> <a> <b>")
+		second = self.parser.beautify("<a> <(note)x> <b>")
+
+		self.assertIn("\033[{0}ma".format(flags.codify(flags.Fill.Blue)), first)
+		self.assertIn("\033[{0}mb".format(flags.codify(flags.Fill.Green)), first)
+		self.assertIn("\033[{0}mb".format(flags.codify(flags.Fill.Green)), second)
+
+	def test_raises_for_unknown_names(self):
+
+		with self.assertRaises(errors.ArgumentError) as context:
+			self.parser.beautify("ab <(fatal)c>")
+
+		self.assertEqual(context.exception.position, "3")
+
+	def test_checks_names(self):
+
+		summary = parser.check("<(error)a> <(note)b> <(error)c> <d>", ["d"])
+
+		self.assertEqual(summary.names, ["error", "note"])
+		self.assertEqual(summary.required, 0)
+		self.assertEqual(summary.phrases, ["d"])
+
+class TestParserLimits(unittest2.TestCase):
+
+	def test_limits_size(self):
+
+		limited = parser.Parser(None, {}, limits=parser.Limits(size=4))
+
+		self.assertEqual(limited.parse("<ab>")[0], "<ab>")
+
+		self.assertRaises(errors.LimitError, limited.parse, "<abc>")
+
+	def test_limits_depth(self):
+
+		limited = parser.Parser(None, {}, limits=parser.Limits(depth=2))
+
+		self.assertEqual(len(limited.parse("<<a>> <<b>>")[1]), 2)
+
+		with self.assertRaises(errors.LimitError) as context:
+			limited.parse("<<\n<a>>>")
+
+		self.assertEqual(context.exception.position, "1:0")
+
+	def test_limits_phrases(self):
+
+		limited = parser.Parser(None, {}, limits=parser.Limits(phrases=2))
+
+		self.assertRaises(errors.LimitError, limited.parse, "<a><b><c>")
+
+	def test_limits_arguments(self):
+
+		limited = parser.Parser(None, {}, limits=parser.Limits(arguments=3))
+
+		self.assertEqual(limited.parse("<(1,2)a>")[1][0].arguments, [1, 2])
+
+		self.assertRaises(errors.LimitError, limited.parse, "<(1,2,3)a>")
+
+	def test_limit_errors_are_parse_errors(self):
+
+		limited = parser.Parser(None, {}, limits=parser.Limits(depth=1))
+
+		self.assertRaises(errors.ParseError, limited.parse, "<<a>>")
+
+	def test_handles_deep_nesting_without_recursion(self):
+
+		unlimited = parser.Parser(None, {}, limits=parser.Limits(depth=None))
+
+		depth = 5000
+
+		string, phrases = unlimited.parse("<" * depth + "a" + ">" * depth)
+
+		self.assertEqual(len(string), 2 * depth + 1)
+
+		self.assertEqual(phrases[0].closing, 2 * depth)
+
+	def test_handles_argument_at_end(self):
+
+		self.assertRaises(errors.ParseError,
+						  parser.Parser(None, {}, errors.SILENT).parse,
+						  "<(")
+
+	def test_handles_tag_at_start_after_trailing_escape(self):
+
+		string, phrases = parser.Parser(None, {}).parse("<a>\\")
+
+		self.assertEqual(string, "<a>\\")
+		self.assertEqual(phrases[0].string, "a")
+
+class TestCheck(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.string = "<a> <(0,-3)b> <(!)c> <(+)d> <<e> f> \\(x)"
+
+		self.summary = parser.check(self.string, always=["d", "e"])
+
+	def test_counts_positionals_and_options(self):
+
+		self.assertEqual(self.summary.positionals, 3)
+
+		self.assertEqual(self.summary.indices, [-3, 0])
+
+		self.assertEqual(self.summary.overrides, 1)
+
+		self.assertEqual(self.summary.increments, 1)
+
+	def test_lists_phrases_always_keys_could_match(self):
+
+		self.assertEqual(self.summary.phrases, ["a", "b", "d", "<e> f", "e"])
+
+	def test_computes_required_styles(self):
+
+		self.assertEqual(self.summary.required, 3)
+
+		styles = [flags.Color.Red, flags.Fill.Blue, flags.Style.Bold]
+
+		always = {"d": flags.Style.Dim, "e": flags.Style.Dim}
+
+		parser.Parser(styles, always).beautify(self.string)
+
+		self.assertRaises(errors.ArgumentError,
+						  parser.Parser(styles[:2], always).beautify,
+						  self.string)
+
+	def test_reports_errors_and_diagnostics(self):
+
+		self.assertEqual(self.summary.errors, [])
+
+		summary = parser.check("<a> (b) <c")
+
+		self.assertEqual(len(summary.errors), 1)
+
+		self.assertIsInstance(summary.errors[0], errors.ParseError)
+
+		self.assertEqual([i.index for i in summary.diagnostics], [4, 6])
+
 class TestParserStringify(unittest2.TestCase):
 
 	def setUp(self):
@@ -443,6 +816,38 @@ class TestParserStringify(unittest2.TestCase):
 
 		self.assertEqual(result, expected)
 
+	def test_reports_original_positions_of_argument_errors(self):
+
+		try:
+			self.parser.beautify("a\n\\< <<b> <c>> <d>")
+		except errors.ArgumentError as error:
+			self.assertEqual(error.position, "1:13")
+		else:
+			self.fail("No ArgumentError raised")
+
+		try:
+			self.parser.beautify("a\n<(+)b> <(5)c>")
+		except errors.ArgumentError as error:
+			self.assertEqual(error.position, "1:7")
+		else:
+			self.fail("No ArgumentError raised")
+
+	def test_strips_phrases_without_formatting(self):
+
+		string, phrases = self.parser.parse("<abc> <(0)<def> ghi>")
+
+		self.assertEqual(self.parser.strip(string, phrases), "abc def ghi")
+
+	def test_renders_parsed_phrases_repeatedly(self):
+
+		string, phrases = self.parser.parse("<abc> <<def> ghi>")
+
+		first = self.parser.render(string, phrases)
+
+		self.assertEqual(self.parser.render(string, phrases), first)
+
+		self.assertEqual(self.parser.beautify("<abc> <<def> ghi>"), first)
+
 def main():
 	unittest2.main()
 
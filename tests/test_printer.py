@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.printer as printer
+import ecstasy.parser as parser
+import ecstasy.flags as flags
+import ecstasy.terminal as terminal
+
+class Stream(io.StringIO):
+
+	def __init__(self):
+		super(Stream, self).__init__()
+		self.writes = 0
+
+	def write(self, data):
+		self.writes += 1
+		return super(Stream, self).write(data)
+
+class TestPrinter(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.stream = Stream()
+
+		self.styles = [flags.Color.Red, flags.Fill.Blue]
+
+		self.parser = parser.Parser(self.styles, {})
+
+		# Detect colors as in a plain environment (FORCE_COLOR colors any stream)
+		self.force = os.environ.pop("FORCE_COLOR", None)
+		terminal.reset()
+
+	def tearDown(self):
+
+		if self.force is not None:
+			os.environ["FORCE_COLOR"] = self.force
+
+		terminal.reset()
+
+	def test_batches_lines_into_one_write(self):
+
+		with printer.Printer(self.stream, self.styles, color=True) as output:
+			for _ in range(100):
+				output.print("<a> <b>")
+
+			self.assertEqual(self.stream.writes, 0)
+
+		self.assertEqual(self.stream.writes, 1)
+
+		expected = (self.parser.beautify("<a> <b>") + "\n") * 100
+
+		self.assertEqual(self.stream.getvalue(), expected)
+
+	def test_flushes_at_size(self):
+
+		output = printer.Printer(self.stream, self.parser, size=20)
+
+		output.print("<a> <b>")
+
+		self.assertEqual(self.stream.writes, 1)
+
+	def test_flushes_after_interval(self):
+
+		output = printer.Printer(self.stream, self.parser, interval=0)
+
+		output.write("<a>")
+
+		self.assertEqual(self.stream.getvalue(), self.parser.beautify("<a>"))
+
+	def test_detects_plain_streams(self):
+
+		with printer.Printer(self.stream, self.styles) as output:
+			output.print("<a> <(0)b>", end="")
+
+		self.assertEqual(self.stream.getvalue(), "a b")
+
+	def test_uses_always_styles(self):
+
+		always = {"x": flags.Style.Bold}
+
+		with printer.Printer(self.stream, always=always, color=True) as output:
+			output.write("<x>")
+
+		expected = parser.Parser(None, always).beautify("<x>")
+
+		self.assertEqual(self.stream.getvalue(), expected)
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
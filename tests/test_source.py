@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import os
+import sys
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.source as source
+import ecstasy.parser as parser
+import ecstasy.flags as flags
+
+class TestSource(unittest2.TestCase):
+
+	def setUp(self):
+
+		# "a\<b<(0)c>" -> "a<b<c>"
+		self.source = source.Source("a\\<b<(0)c>")
+
+		self.source.remove(1)
+		self.source.remove(4, 3)
+
+	def test_maps_escaped_to_original_indices(self):
+
+		originals = [self.source.original(i) for i in range(6)]
+
+		self.assertEqual(originals, [0, 2, 3, 4, 8, 9])
+
+	def test_maps_indices_without_removals(self):
+
+		self.assertEqual(source.Source("abc").original(2), 2)
+
+	def test_describes_positions(self):
+
+		self.assertEqual(self.source.position(4), "8")
+
+class TestSourceMap(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.string = "ab \\<x <(1)c\\>d <<e> f>> g\n<h>"
+
+		self.parser = parser.Parser([flags.Color.Red,
+									 flags.Fill.Blue,
+									 flags.Style.Bold], {})
+
+		self.sourcemap = source.SourceMap()
+
+		self.beauty = self.parser.beautify(self.string, self.sourcemap)
+
+		self.codes = set()
+
+		for code in re.finditer(r"\033\[[\d;]*m", self.beauty):
+			self.codes.update(range(code.start(), code.end()))
+
+	def test_maps_every_visible_character_both_ways(self):
+
+		for offset, character in enumerate(self.beauty):
+			if offset in self.codes:
+				continue
+
+			index = self.sourcemap.original(offset)
+
+			self.assertEqual(self.string[index], character)
+
+			self.assertEqual(self.sourcemap.rendered(index), offset)
+
+	def test_maps_removed_characters_to_following_text(self):
+
+		# The escape character before "<x"
+		offset = self.sourcemap.rendered(3)
+
+		self.assertEqual(self.beauty[offset], "<")
+
+		# The argument sequence "(1)"
+		offset = self.sourcemap.rendered(9)
+
+		self.assertEqual(self.beauty[offset], "c")
+
+	def test_maps_escape_codes_to_following_text(self):
+
+		offset = self.beauty.index("\033")
+
+		self.assertEqual(self.string[self.sourcemap.original(offset)], "c")
+
+	def test_stores_runs_compactly(self):
+
+		self.assertLessEqual(len(self.sourcemap), 10)
+
+	def test_maps_strings_without_phrases(self):
+
+		sourcemap = source.SourceMap()
+
+		self.parser.beautify("a\\>b", sourcemap)
+
+		self.assertEqual(sourcemap.original(1), 2)
+
+		self.assertEqual(sourcemap.rendered(0), 0)
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
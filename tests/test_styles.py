@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy
+import ecstasy.styles as styles
+import ecstasy.parser as parser
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+import ecstasy.terminal as terminal
+
+class TestFlatten(unittest2.TestCase):
+
+	def test_flattens_nested_arguments(self):
+
+		always = {}
+
+		positional = styles.flatten([flags.Color.Red,
+									 [[flags.Fill.Blue], (flags.Style.Bold,)],
+									 {("a", "b"): flags.Style.Dim}],
+									always)
+
+		self.assertEqual(positional, [flags.Color.Red,
+									  flags.Fill.Blue,
+									  flags.Style.Bold])
+
+		self.assertEqual(always, {"a": flags.Style.Dim, "b": flags.Style.Dim})
+
+	def test_rejects_strings(self):
+
+		self.assertRaises(errors.EcstasyError, styles.flatten, ["red"], {})
+
+class TestStyleSet(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.styles = styles.StyleSet([flags.Color.Red, [flags.Fill.Blue]],
+									  {("ok", "done"): flags.Color.Green},
+									  error=flags.Color.Red | flags.Style.Bold)
+
+	def test_normalizes_styles(self):
+
+		self.assertEqual(self.styles.positional, (int(flags.Color.Red),
+												  int(flags.Fill.Blue)))
+
+		self.assertEqual(self.styles.always["ok"], int(flags.Color.Green))
+		self.assertEqual(self.styles.always["done"], int(flags.Color.Green))
+
+	def test_validates_up_front(self):
+
+		self.assertRaises(errors.FlagError, styles.StyleSet, flags.LIMIT)
+
+		self.assertRaises(errors.FlagError, styles.StyleSet, a=flags.LIMIT)
+
+		self.assertRaises(errors.EcstasyError, styles.StyleSet, a="red")
+
+	def test_is_immutable(self):
+
+		with self.assertRaises(AttributeError):
+			self.styles.positional = ()
+
+		with self.assertRaises(TypeError):
+			self.styles.always["new"] = flags.Style.Dim
+
+	def test_is_hashable(self):
+
+		same = styles.StyleSet(flags.Color.Red,
+							   int(flags.Fill.Blue),
+							   ok=flags.Color.Green,
+							   done=flags.Color.Green,
+							   error=flags.Style.Bold | flags.Color.Red)
+
+		self.assertEqual(self.styles, same)
+
+		self.assertEqual(hash(self.styles), hash(same))
+
+		self.assertEqual(len(set([self.styles, same])), 1)
+
+		self.assertNotEqual(self.styles, styles.StyleSet(flags.Color.Red))
+
+	def test_is_used_by_parsers_directly(self):
+
+		beautifier = parser.Parser(self.styles, None)
+
+		self.assertIs(beautifier.positional, self.styles.positional)
+		self.assertIs(beautifier.always, self.styles.always)
+
+		string = "<a> <ok> <(1)b> <error>"
+
+		expected = parser.Parser([flags.Color.Red, flags.Fill.Blue],
+								 {"ok": flags.Color.Green,
+								  "error": flags.Color.Red | flags.Style.Bold})
+
+		self.assertEqual(beautifier.beautify(string), expected.beautify(string))
+
+	def test_can_be_extended(self):
+
+		beautifier = parser.Parser([self.styles, flags.Style.Dim],
+								   {"x": flags.Style.Blink})
+
+		self.assertEqual(beautifier.positional[2], flags.Style.Dim)
+
+		self.assertIn("x", beautifier.always)
+		self.assertIn("ok", beautifier.always)
+
+		self.assertNotIn("x", self.styles.always)
+
+	def test_keeps_named_styles_apart(self):
+
+		named = styles.StyleSet({"(error)": flags.Color.Red}, ok=flags.Style.Dim)
+
+		self.assertEqual(dict(named.always), {"ok": int(flags.Style.Dim)})
+		self.assertEqual(dict(named.names), {"error": int(flags.Color.Red)})
+
+		self.assertNotEqual(named, styles.StyleSet({"error": flags.Color.Red},
+												   ok=flags.Style.Dim))
+
+		extended = parser.Parser([named, {"(note)": flags.Fill.Blue}], {})
+
+		self.assertEqual(sorted(extended.names), ["error", "note"])
+		self.assertEqual(list(extended.always), ["ok"])
+
+	def test_is_accepted_by_beautify(self):
+
+		# Render escape-codes even if stdout is no terminal
+		force = os.environ.get("FORCE_COLOR")
+		os.environ["FORCE_COLOR"] = "1"
+		terminal.reset()
+
+		try:
+			beautified = ecstasy.beautify("<a> <ok> <(error)b>",
+										  self.styles,
+										  {"(error)": flags.Color.Red |
+													  flags.Style.Bold})
+		finally:
+			if force is None:
+				del os.environ["FORCE_COLOR"]
+			else:
+				os.environ["FORCE_COLOR"] = force
+			terminal.reset()
+
+		expected = "\033[{0}ma\033[0;m \033[{1}mok\033[0;m \033[{2}mb\033[0;m"
+
+		self.assertEqual(beautified, expected.format(
+			flags.codify(flags.Color.Red),
+			flags.codify(flags.Color.Green),
+			flags.codify(flags.Color.Red | flags.Style.Bold)))
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import io
+import unittest2
+
+from array import array
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.template as template
+import ecstasy.parser as parser
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+
+class TestTemplate(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.string = ("a <b <c> d> <ok> <(1)x> <(!)ok> <(+!)ok> "
+					   "<(-1)z> \\<e\\> <f<g<h>>> <(warn)w>")
+
+		self.template = template.Template(self.string)
+
+		self.styles = [flags.Color.Red,
+					   flags.Fill.Blue,
+					   flags.Style.Dim,
+					   flags.Style.Blink,
+					   flags.Color.Green,
+					   flags.Style.Underline,
+					   flags.Fill.Red,
+					   flags.Color.Yellow]
+
+		self.always = {"ok": flags.Style.Bold, "(warn)": flags.Color.Magenta}
+
+	def test_renders_like_parser(self):
+
+		beautifier = parser.Parser(self.styles, self.always)
+
+		self.assertEqual(self.template.render(beautifier),
+						 beautifier.beautify(self.string))
+
+	def test_compiles_per_set_of_always_keys(self):
+
+		for always in ({"(warn)": flags.Color.Red}, self.always):
+			beautifier = parser.Parser(self.styles, dict(always))
+
+			self.assertEqual(self.template.render(beautifier),
+							 beautifier.beautify(self.string))
+
+		# Named styles are looked up whatever the 'always' keys
+		self.assertEqual(sorted(self.template.functions), [(), ("ok",)])
+
+		# Other values of the same keys reuse the function
+		beautifier = parser.Parser(self.styles[::-1], {"(warn)": flags.Fill.Red})
+
+		self.assertEqual(self.template.render(beautifier),
+						 beautifier.beautify(self.string))
+
+		self.assertEqual(len(self.template.functions), 2)
+
+	def test_reports_errors_like_parser(self):
+
+		beautifier = parser.Parser(self.styles[:2], self.always)
+
+		with self.assertRaises(errors.ArgumentError) as context:
+			self.template.render(beautifier)
+
+		with self.assertRaises(errors.ArgumentError) as expected:
+			beautifier.beautify(self.string)
+
+		self.assertEqual(str(context.exception), str(expected.exception))
+
+		beautifier = parser.Parser(self.styles, {"ok": flags.Style.Bold})
+
+		with self.assertRaises(errors.ArgumentError) as context:
+			self.template.render(beautifier)
+
+		self.assertIn("No style named 'warn'", str(context.exception))
+
+	def test_renders_without_color(self):
+
+		beautifier = parser.Parser(self.styles, self.always, color=False)
+
+		self.assertEqual(self.template.render(beautifier),
+						 beautifier.beautify(self.string))
+
+	def test_renders_plain_strings(self):
+
+		plain = template.Template("no phrases")
+
+		self.assertEqual(plain.beautify(), "no phrases")
+
+		self.assertEqual(template.Template("").beautify(), "")
+
+class TestTemplateRows(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.template = template.Template("<{id:4}> <ok> <(1){name!r}> "
+										  "<{{x}}>")
+
+		self.parser = parser.Parser(None, {})
+
+		self.colors = [flags.Color.Red, flags.Color.Green, flags.Color.Blue]
+
+		self.values = {"id": [1, 22, 333], "name": ["a", "<b>", "c"]}
+
+	def test_renders_named_styles_in_columns(self):
+
+		named = template.Template("<(warn)x> <warn>")
+
+		greens = [flags.Color.Green, flags.Color.Blue]
+
+		rows = named.rows([], {"(warn)": greens, "warn": flags.Style.Bold},
+						  parser=self.parser)
+
+		for row, green in zip(rows, greens):
+			beautifier = parser.Parser(None, {"(warn)": green,
+											  "warn": flags.Style.Bold})
+
+			self.assertEqual(row, beautifier.beautify("<(warn)x> <warn>"))
+
+	def test_renders_rows_like_parser(self):
+
+		rows = self.template.rows([self.colors, flags.Fill.Blue],
+								  {"ok": flags.Style.Bold},
+								  self.values,
+								  parser=self.parser)
+
+		self.assertEqual(len(rows), 3)
+
+		for i, row in enumerate(rows):
+			beautifier = parser.Parser([self.colors[i], flags.Fill.Blue],
+									   {"ok": flags.Style.Bold})
+
+			string = "<{0:4}> <ok> <(1){1}> <{{x}}>"
+			string = string.format(self.values["id"][i],
+								   repr(self.values["name"][i])
+								   .replace("<", "\\<")
+								   .replace(">", "\\>"))
+
+			self.assertEqual(row, beautifier.beautify(string))
+
+	def test_takes_always_columns(self):
+
+		rows = self.template.rows([flags.Color.Red, flags.Fill.Blue],
+								  {"ok": [flags.Style.Bold, flags.Style.Dim,
+										  flags.Style.Bold]},
+								  self.values,
+								  parser=self.parser)
+
+		self.assertIn("\033[1mok", rows[0])
+		self.assertIn("\033[2mok", rows[1])
+
+		self.assertEqual(len(self.template.bulk), 1)
+
+		red = array("q", [int(flags.Color.Red)] * 3)
+
+		self.assertEqual(rows, self.template.rows([red, flags.Fill.Blue],
+												  {"ok": [flags.Style.Bold,
+														  flags.Style.Dim,
+														  flags.Style.Bold]},
+												  self.values,
+												  parser=self.parser))
+
+	def test_writes_to_output(self):
+
+		output = io.StringIO()
+
+		result = self.template.rows([self.colors, flags.Fill.Blue],
+									{"ok": flags.Style.Bold},
+									self.values,
+									parser=parser.Parser(None, {}, color=False),
+									output=output,
+									end="\n")
+
+		self.assertIsNone(result)
+
+		self.assertEqual(output.getvalue(), "   1 ok 'a' {x}\n"
+											"  22 ok '<b>' {x}\n"
+											" 333 ok 'c' {x}\n")
+
+	def test_reports_errors(self):
+
+		for color in (True, False):
+			self.assertRaises(errors.ArgumentError,
+							  self.template.rows,
+							  [self.colors],
+							  values=self.values,
+							  parser=parser.Parser(None, {}, color=color))
+
+		self.assertRaises(KeyError,
+						  self.template.rows,
+						  [self.colors, flags.Fill.Blue],
+						  values={"id": [1, 2, 3]},
+						  parser=self.parser)
+
+		self.assertRaises(ValueError,
+						  self.template.rows,
+						  [self.colors[:2], flags.Fill.Blue],
+						  values=self.values,
+						  parser=self.parser)
+
+		self.assertRaises(ValueError,
+						  self.template.rows,
+						  [flags.Color.Red, flags.Fill.Blue],
+						  parser=self.parser)
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
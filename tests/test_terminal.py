@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import tempfile
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.terminal as terminal
+import ecstasy.parser as parser
+import ecstasy.flags as flags
+import ecstasy.errors as errors
+
+class Terminal(object):
+
+	def __init__(self):
+		self.calls = 0
+
+	def isatty(self):
+		self.calls += 1
+		return True
+
+class Descriptor(Terminal):
+
+	def fileno(self):
+		return 1
+
+class TestProbe(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.tty = Terminal()
+
+	def test_detects_color_depth(self):
+
+		self.assertEqual(terminal.probe(self.tty, {}).depth, terminal.BASIC)
+
+		self.assertEqual(terminal.probe(self.tty, {"TERM": "xterm-256color"}),
+						 terminal.Capabilities(True, terminal.EXTENDED))
+
+		self.assertEqual(terminal.probe(self.tty, {"COLORTERM": "truecolor",
+												   "TERM": "xterm-256color"}),
+						 terminal.Capabilities(True, terminal.TRUECOLOR))
+
+	def test_disables_color(self):
+
+		self.assertFalse(terminal.probe(io.StringIO(), {}).color)
+
+		self.assertFalse(terminal.probe(self.tty, {"NO_COLOR": "1"}).color)
+
+		self.assertFalse(terminal.probe(self.tty, {"TERM": "dumb"}).color)
+
+		self.assertFalse(terminal.probe(self.tty, {"FORCE_COLOR": "0"}).color)
+
+	def test_forces_color(self):
+
+		capabilities = terminal.probe(io.StringIO(), {"FORCE_COLOR": "1",
+													  "NO_COLOR": "1"})
+
+		self.assertEqual(capabilities, terminal.Capabilities(False,
+															 terminal.BASIC))
+
+		capabilities = terminal.probe(io.StringIO(), {"FORCE_COLOR": "3"})
+
+		self.assertEqual(capabilities.depth, terminal.TRUECOLOR)
+
+class TestCapabilities(unittest2.TestCase):
+
+	def setUp(self):
+
+		terminal.reset()
+
+	def tearDown(self):
+
+		terminal.reset()
+
+	def test_caches_streams_with_file_descriptors(self):
+
+		with tempfile.TemporaryFile() as stream:
+
+			first = terminal.capabilities(stream)
+
+			self.assertIn(stream, terminal.CACHE)
+
+			self.assertIs(terminal.capabilities(stream), first)
+
+	def test_probes_new_streams_with_reused_descriptors(self):
+
+		first, second = Descriptor(), Descriptor()
+
+		terminal.capabilities(first)
+		terminal.capabilities(first)
+		terminal.capabilities(second)
+
+		self.assertEqual((first.calls, second.calls), (1, 1))
+
+	def test_probes_streams_without_descriptors(self):
+
+		tty = Terminal()
+
+		terminal.capabilities(tty)
+		terminal.capabilities(tty)
+
+		self.assertEqual(tty.calls, 2)
+
+		self.assertEqual(len(terminal.CACHE), 0)
+
+class TestPlainRendering(unittest2.TestCase):
+
+	def test_parser_strips_tags_without_color(self):
+
+		plain = parser.Parser([flags.Color.Red], {}, color=False)
+
+		self.assertEqual(plain.beautify("<a> \\<b\\>"), "a <b>")
+
+	def test_parser_resolves_styles_without_color(self):
+
+		plain = parser.Parser([flags.Color.Red], {}, color=False)
+
+		self.assertRaises(errors.ArgumentError, plain.beautify, "<a> <b>")
+
+		self.assertRaises(errors.ArgumentError, plain.beautify, "<(error)a>")
+
+		empty = parser.Parser(None, {}, color=False)
+
+		self.assertRaises(errors.ArgumentError, empty.beautify, "<a>")
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
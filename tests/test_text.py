@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import textwrap
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.text as text
+from ecstasy.text import truncate, truncate_markup, pad
+import ecstasy.live as live
+import ecstasy.parser as parser
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+
+class TestStyledText(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.styles = [flags.Color.Red, flags.Fill.Blue, flags.Style.Bold]
+
+		self.string = "a <b <c> d> e <f> <(2)g>"
+
+		self.styled = text.StyledText.parse(self.string, self.styles)
+
+		self.red = str(flags.Color.Red)
+		self.blue = str(flags.Fill.Blue)
+		self.bold = str(flags.Style.Bold)
+
+	def test_flattens_effective_styles(self):
+
+		self.assertEqual(self.styled.text, "a b c d e f g")
+
+		nested = self.red + ";" + self.blue
+
+		self.assertEqual(self.styled.pieces(), [("", "a "),
+												(self.red, "b "),
+												(nested, "c"),
+												(self.red, " d"),
+												("", " e "),
+												(self.bold, "f"),
+												("", " "),
+												(self.bold, "g")])
+
+	def test_renders_like_stringify(self):
+
+		beautifier = parser.Parser(self.styles, {})
+
+		self.assertEqual(live.cells(self.styled.render()),
+						 live.cells(beautifier.beautify(self.string)))
+
+		self.assertEqual(self.styled.render(color=False), self.styled.text)
+
+	def test_resets_nested_styles_like_stringify(self):
+
+		string = "x<a<b<c>y>z>w"
+
+		styles = [flags.Color.Red, flags.Color.Blue, flags.Color.Green]
+
+		styled = text.StyledText.parse(string, styles)
+
+		beautified = parser.Parser(styles, {}).beautify(string)
+
+		self.assertEqual(live.cells(styled.render()),
+						 live.cells(beautified))
+
+		# After <c>, stringify() resets to the style of <b...> alone
+		self.assertEqual(styled.code(styled.text.index("y")),
+						 str(flags.Color.Blue))
+
+	def test_slices(self):
+
+		self.assertEqual(self.styled[4:7].pieces(), [(self.red + ";" +
+													  self.blue, "c"),
+													 (self.red, " d")])
+
+		self.assertEqual(self.styled[-1].pieces(), [(self.bold, "g")])
+
+		self.assertEqual(self.styled[:], self.styled)
+
+		self.assertEqual(len(self.styled[5:5]), 0)
+
+		self.assertRaises(ValueError, self.styled.__getitem__, slice(0, 4, 2))
+
+		self.assertRaises(IndexError, self.styled.__getitem__, 13)
+
+	def test_slices_and_concatenation_are_inverse(self):
+
+		for i in range(len(self.styled) + 1):
+			self.assertEqual(self.styled[:i] + self.styled[i:], self.styled)
+
+	def test_concatenates(self):
+
+		red = text.StyledText("x", self.red)
+
+		combined = "<" + red + red + "> "
+
+		self.assertEqual(combined.pieces(), [("", "<"),
+											 (self.red, "xx"),
+											 ("", "> ")])
+
+		self.assertEqual(len(combined), 5)
+
+	def test_joins(self):
+
+		red = text.StyledText("x", self.red)
+
+		joined = text.StyledText(", ").join([red, "y", red])
+
+		self.assertEqual(joined.text, "x, y, x")
+
+		self.assertEqual(joined, red + ", y, " + red)
+
+		self.assertEqual(text.StyledText().join([]), text.StyledText())
+
+	def test_searches(self):
+
+		self.assertEqual(self.styled.find("d"), 6)
+		self.assertEqual(self.styled.find("z"), -1)
+		self.assertEqual(self.styled.index("f", 2), 10)
+
+		self.assertIn("c d", self.styled)
+
+		self.assertEqual(self.styled.code(4), self.red + ";" + self.blue)
+		self.assertEqual(self.styled.code(-1), self.bold)
+
+	def test_is_hashable(self):
+
+		same = text.StyledText.parse(self.string, self.styles)
+
+		self.assertEqual(hash(same), hash(self.styled))
+
+		self.assertEqual(len(set([same, self.styled])), 1)
+
+	def test_resolves_like_render(self):
+
+		self.assertRaises(errors.ArgumentError,
+						  text.StyledText.parse,
+						  "<a> <b>",
+						  flags.Color.Red)
+
+		self.assertRaises(errors.ArgumentError, text.StyledText.parse, "<a>")
+
+		plain = text.StyledText.parse("no phrases")
+
+		self.assertEqual(plain.pieces(), [("", "no phrases")])
+
+		always = text.StyledText.parse("<ok> <a>", self.styles,
+									   ok=flags.Color.Green)
+
+		self.assertEqual(always.code(0), str(flags.Color.Green))
+		self.assertEqual(always.code(3), self.red)
+
+class TestWrap(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.styles = [flags.Color.Red, flags.Style.Bold, flags.Fill.Blue]
+
+		self.string = ("Lorem <ipsum <dolor sit> amet, consectetur> "
+					   "adipiscing <elit>, sed do eiusmod tempor")
+
+		self.styled = text.StyledText.parse(self.string, self.styles)
+
+	def test_wraps_like_textwrap(self):
+
+		# (textwrap keeps whitespace around broken words in some cases)
+		longest = max(len(word) for word in self.styled.text.split())
+
+		for width in range(longest, 40):
+			lines = [line.text for line in self.styled.wrap(width)]
+
+			self.assertEqual(lines, textwrap.wrap(self.styled.text, width))
+
+	def test_keeps_indentation_like_textwrap(self):
+
+		string = "  <ab> cd ef\n    <gh ij> kl\n<mn>"
+
+		styled = text.StyledText.parse(string, self.styles)
+
+		for width in range(5, 12):
+			lines = [line.text for line in styled.wrap(width)]
+
+			expected = [wrapped for line in styled.text.split("\n")
+						for wrapped in textwrap.wrap(line, width)]
+
+			self.assertEqual(lines, expected)
+
+		self.assertEqual(styled.wrap(9)[2].pieces(), [("", "    "),
+													  (str(flags.Style.Bold),
+													   "gh ij")])
+
+	def test_keeps_styles_across_lines(self):
+
+		expected = [cell for row in live.cells(self.styled.render())
+				    for cell in row]
+
+		cells = []
+
+		for line in self.styled.wrap(12):
+			for row in live.cells(line.render()):
+				cells += row
+
+			# The whitespace at the break
+			while len(cells) < len(expected) and expected[len(cells)][1] == " ":
+				cells.append(expected[len(cells)])
+
+		self.assertEqual(cells, expected)
+
+		# Every line ends without an open style (whatever the environment)
+		for line in self.styled.wrap(12):
+			codes = re.findall("\033\\[[\\d;]*m", line.render())
+			self.assertTrue(not codes or codes[-1] == "\033[0m")
+
+	def test_keeps_nested_styles_like_beautify(self):
+
+		string = "aa <bb <cc <dd> ee> ff> gg"
+
+		styles = [flags.Color.Red, flags.Color.Blue, flags.Color.Green]
+
+		expected = live.cells(parser.Parser(styles, {}).beautify(string))[0]
+
+		lines = text.StyledText.parse(string, styles).wrap(2)
+
+		cells = [cell for line in lines
+				 for row in live.cells(line.render())
+				 for cell in row]
+
+		self.assertEqual(cells, [cell for cell in expected if cell[1] != " "])
+
+	def test_breaks_lines_and_long_words(self):
+
+		styled = text.StyledText.parse("<abcdefgh>\n\nij kl\n", self.styles)
+
+		lines = styled.wrap(3)
+
+		self.assertEqual([line.text for line in lines],
+						 ["abc", "def", "gh", "", "ij", "kl"])
+
+		self.assertEqual(lines[1].pieces(), [(self.styled.code(6), "def")])
+
+		long = text.StyledText("ab cdefgh").wrap(4)
+
+		self.assertEqual([line.text for line in long], ["ab c", "defg", "h"])
+
+		self.assertEqual(text.StyledText().wrap(3), [])
+
+		self.assertRaises(ValueError, styled.wrap, 0)
+
+class TestTruncate(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.styles = [flags.Color.Red, flags.Style.Bold]
+
+		self.string = "ab <cd <ef> gh> ij"
+
+		self.styled = text.StyledText.parse(self.string, self.styles)
+
+		self.beautified = parser.Parser(self.styles, {}).beautify(self.string)
+
+	def test_truncates_beautified_strings_like_styled_text(self):
+
+		for width in range(len(self.styled) + 2):
+			for ellipsis in ("", "~", "..."):
+				truncated = truncate(self.beautified, width, ellipsis)
+
+				expected = self.styled.truncate(width, ellipsis)
+
+				self.assertEqual(live.cells(truncated),
+								 live.cells(expected.render()))
+
+				self.assertLessEqual(len(expected), width)
+
+	def test_closes_open_styles(self):
+
+		truncated = truncate(self.beautified, 8, "~")
+
+		self.assertTrue(truncated.endswith("~\033[0m"))
+
+		self.assertEqual(live.cells(truncated + "x")[0][-1], ("", "x"))
+
+	def test_keeps_text_that_fits(self):
+
+		self.assertIs(truncate(self.beautified, 14), self.beautified)
+
+		self.assertIs(self.styled.truncate(14, "~"), self.styled)
+
+	def test_resolves_styles_past_the_cut(self):
+
+		styled = truncate_markup(self.string + " <k>", 7, "~", self.styles * 2)
+
+		self.assertEqual(styled, self.styled.truncate(7, "~"))
+
+		# Missing styles raise, even after the cut
+		for width in (7, 20):
+			self.assertRaises(errors.ArgumentError,
+							  truncate_markup,
+							  self.string + " <k> <l>", width, "~", self.styles)
+
+	def test_rejects_negative_widths(self):
+
+		self.assertRaises(ValueError, self.styled.truncate, -1, "..")
+
+		self.assertRaises(ValueError, truncate, self.styled.render(), -1)
+
+		self.assertRaises(ValueError, truncate_markup, "a", -1, "", self.styles)
+
+		self.assertEqual(self.styled.truncate(0, "..").text, "")
+
+	def test_pads(self):
+
+		padded = pad(self.beautified, 18, "^", ".")
+
+		self.assertTrue(padded.startswith(".."))
+		self.assertTrue(padded.endswith(".."))
+
+		self.assertEqual(live.cells(padded),
+						 live.cells(self.styled.pad(18, "^", ".").render()))
+
+		self.assertEqual(self.styled.pad(16, ">").text, "  " + self.styled.text)
+
+		self.assertEqual(self.styled.pad(3), self.styled)
+
+		self.assertRaises(ValueError, pad, self.beautified, 20, "=")
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.theme as theme
+import ecstasy.parser as parser
+import ecstasy.errors as errors
+import ecstasy.flags as flags
+
+class TestTheme(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.styles = [flags.Color.Red, flags.Fill.Blue | flags.Style.Bold]
+
+		self.always = {("ok", "done"): flags.Color.Green}
+
+		self.theme = theme.Theme(flags.Color.Red,
+								 flags.Fill.Blue | flags.Style.Bold,
+								 self.always,
+								 error=flags.Color.Red)
+
+		self.string = "<a> <ok> <(1)b> <error> <(0,1)c>"
+
+	def test_flattens_and_validates_styles(self):
+
+		self.assertEqual(self.theme.positional,
+						 (flags.Color.Red, flags.Fill.Blue | flags.Style.Bold))
+
+		self.assertEqual(self.theme.always, {"ok": flags.Color.Green,
+											 "done": flags.Color.Green,
+											 "error": flags.Color.Red})
+
+		self.assertRaises(errors.FlagError, theme.Theme, flags.LIMIT)
+
+		self.assertRaises(errors.EcstasyError, theme.Theme, wrong="red")
+
+	def test_precomputes_codes(self):
+
+		self.assertEqual(self.theme.codes[int(flags.Color.Green)],
+						 str(flags.Color.Green))
+
+		self.assertEqual(len(self.theme.codes), 3)
+
+	def test_renders_like_plain_parsers(self):
+
+		expected = parser.Parser(self.styles,
+								 {"ok": flags.Color.Green,
+								  "error": flags.Color.Red}).beautify(self.string)
+
+		beautifier = self.theme.beautifier()
+
+		self.assertEqual(beautifier.beautify(self.string), expected)
+
+	def test_shares_codes_with_parsers(self):
+
+		beautifier = self.theme.beautifier()
+
+		self.assertIs(beautifier.codes, self.theme.codes)
+		self.assertIs(beautifier.always, self.theme.always)
+
+		beautifier.beautify(self.string)
+
+		combination = flags.Color.Red | flags.Fill.Blue | flags.Style.Bold
+
+		self.assertIn(combination, self.theme.codes)
+
+	def test_extends_styles(self):
+
+		beautifier = parser.Parser([flags.Color.Yellow],
+								   {"new": flags.Style.Dim},
+								   theme=self.theme)
+
+		self.assertEqual(beautifier.positional[2], flags.Color.Yellow)
+
+		self.assertIn("new", beautifier.always)
+		self.assertNotIn("new", self.theme.always)
+
+	def test_beautifies(self):
+
+		expected = parser.beautify("<a> <(2)b>",
+								   flags.Color.Red,
+								   flags.Fill.Blue | flags.Style.Bold,
+								   flags.Color.Blue)
+
+		self.assertEqual(self.theme.beautify("<a> <(2)b>", flags.Color.Blue),
+						 expected)
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import unittest2
+
+sys.path.insert(0, os.path.abspath('..'))
+
+import ecstasy.parser as parser
+import ecstasy.tree as tree
+import ecstasy.flags as flags
+
+class TestPhraseTree(unittest2.TestCase):
+
+	def setUp(self):
+
+		self.parser = parser.Parser([flags.Color.Red], {})
+
+		self.string, self.phrases = self.parser.parse("jkl <(+) <(0) "
+													  "<(-1!)abc> <def> ghi> >"
+													  " <(1,2)mno>")
+
+		self.tree = tree.PhraseTree.compact(self.string, self.phrases)
+
+	def test_stores_phrases_in_pre_order(self):
+
+		self.assertEqual(len(self.tree), 5)
+
+		self.assertEqual(list(self.tree.parent), [-1, 0, 1, 1, -1])
+
+		self.assertEqual(self.tree.roots(), [0, 4])
+
+	def test_round_trips_phrases(self):
+
+		self.assertEqual(self.tree.phrases(), self.phrases)
+
+	def test_stores_names(self):
+
+		string, phrases = self.parser.parse("<a <(warn)b>> <(error)c>")
+
+		compact = tree.PhraseTree.compact(string, phrases)
+
+		self.assertEqual(compact.names, {1: "warn", 2: "error"})
+
+		self.assertEqual(compact.phrases(), phrases)
+
+	def test_materializes_single_phrases(self):
+
+		self.assertEqual(self.tree[1], self.phrases[0].nested[0])
+
+		self.assertEqual(self.tree[-1], self.phrases[1])
+
+		self.assertRaises(IndexError, lambda: self.tree[5])
+
+	def test_stores_arguments_and_options(self):
+
+		phrase = self.tree[2]
+
+		self.assertEqual(phrase.arguments, [-1])
+
+		self.assertTrue(phrase.override)
+
+		self.assertFalse(phrase.increment)
+
+		self.assertTrue(self.tree[0].increment)
+
+		self.assertEqual(self.tree[4].arguments, [1, 2])
+
+	def test_materialized_phrases_stringify_identically(self):
+
+		positional = [flags.Color.Red, flags.Fill.Blue, flags.Style.Bold]
+
+		expected = parser.Parser(positional, {}).stringify(self.string,
+														   self.phrases)
+
+		result = parser.Parser(positional, {}).stringify(self.tree.string,
+														 self.tree.phrases())
+
+		self.assertEqual(result, expected)
+
+def main():
+	unittest2.main()
+
+if __name__ == "__main__":
+	main()